@@ -0,0 +1,141 @@
+"""log_requests middleware'inin istek başına maliyeti.
+
+Gerçek middleware (app.main.log_requests) boş bir endpoint önüne takılır ve ASGI
+seviyesinde (ağ olmadan) ardışık istek gönderilir. Senaryolar:
+  - none:           middleware yok (referans)
+  - sync-*:         eski kurulum, stdout'a senkron StreamHandler
+  - queue-*:        QueueHandler/QueueListener (yazma ayrı thread'de)
+  - queue-DEBUG@10%: DEBUG + faqstudio.access için %10 örnekleme
+
+Uygulamanın env'i (DATABASE_URL, ...) gerekir; app.main import edilir ama
+startup çalıştırılmaz. Loglar --sink dosyasına yazılır (varsayılan /dev/null);
+--sink-latency-us ile yavaş bir stdout (dolu pipe, journald) taklit edilir.
+
+Kullanım:
+    python benchmarks/bench_logging.py [--requests 20000] [--sink /tmp/bench.log] [--json]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "debian" / "opt" / "faq-studio"))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.responses import PlainTextResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app import logger as log_module  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.main import log_requests  # noqa: E402
+
+
+class SlowStream:
+    """Her write'ta bekleyen akış (bloklayan stdout taklidi)"""
+
+    def __init__(self, stream, latency_us: float):
+        self.stream = stream
+        self.latency = latency_us / 1e6
+
+    def write(self, data):
+        time.sleep(self.latency)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+async def ping(request):
+    return PlainTextResponse("ok")
+
+
+def make_app(with_middleware: bool) -> Starlette:
+    app = Starlette(routes=[Route("/ping", ping)])
+    if with_middleware:
+        app.middleware("http")(log_requests)
+    return app
+
+
+async def call(app, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+async def run(app, n: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench"), (b"user-agent", b"bench-logging")],
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+    }
+    for _ in range(min(500, n)):
+        await call(app, dict(scope))
+    started = time.perf_counter()
+    for _ in range(n):
+        await call(app, dict(scope))
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def configure(mode: str, level: str, sink, sample_rate: float = None):
+    """Logger'ı senaryoya göre yeniden kurar"""
+    settings.LOG_LEVEL = level
+    settings.LOG_SAMPLE_RATES = {"faqstudio.access": sample_rate} if sample_rate is not None else {}
+    logger = log_module.setup_logger(stream=sink)
+    if mode == "sync":
+        # user-033 öncesi kurulum: isteği işleyen thread'de senkron yazma
+        log_module._listener.stop()
+        log_module._listener = None
+        logger.handlers.clear()
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(log_module.JsonFormatter() if settings.LOG_JSON else logging.Formatter(settings.LOG_FORMAT))
+        handler.addFilter(log_module.RequestContextFilter())
+        logger.addHandler(handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sink", default=os.devnull)
+    parser.add_argument("--sink-latency-us", type=float, default=0, help="Simulated cost of each write")
+    parser.add_argument("--json", action="store_true", help="Use the JSON formatter")
+    args = parser.parse_args()
+    settings.LOG_JSON = args.json
+
+    sink_file = open(args.sink, "a", encoding="utf-8")
+    sink = SlowStream(sink_file, args.sink_latency_us) if args.sink_latency_us else sink_file
+    scenarios = [
+        ("sync-INFO", "sync", "INFO", None),
+        ("sync-DEBUG", "sync", "DEBUG", None),
+        ("queue-INFO", "queue", "INFO", None),
+        ("queue-DEBUG", "queue", "DEBUG", None),
+        ("queue-DEBUG@10%", "queue", "DEBUG", 0.1),
+    ]
+
+    base = asyncio.run(run(make_app(False), args.requests))
+    print(f"{'scenario':<18} {'us/req':>9} {'overhead us':>12}")
+    print(f"{'none':<18} {base:9.1f} {0:12.1f}")
+    app = make_app(True)
+    for name, mode, level, rate in scenarios:
+        configure(mode, level, sink, rate)
+        per_req = asyncio.run(run(app, args.requests))
+        print(f"{name:<18} {per_req:9.1f} {per_req - base:12.1f}")
+
+    if log_module._listener is not None:
+        log_module._listener.stop()
+        log_module._listener = None
+    sink_file.close()
+
+
+if __name__ == "__main__":
+    main()
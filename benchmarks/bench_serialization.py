@@ -0,0 +1,80 @@
+"""Liste endpoint'leri için JSON serileştirme benchmark'ı.
+
+FastAPI'nin varsayılan yolu (jsonable_encoder + json.dumps) ile
+app.utils.serialization.dumps (orjson) karşılaştırılır; gzip maliyeti de ölçülür.
+
+Kullanım:
+    python benchmarks/bench_serialization.py [--rows 1000] [--answer-len 1500] [--repeat 20]
+"""
+import argparse
+import datetime
+import gzip
+import json
+import pathlib
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "debian" / "opt" / "faq-studio"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from app.utils.serialization import dumps  # noqa: E402
+
+
+def make_rows(n: int, answer_len: int):
+    """dict_row çıktısına benzeyen satırlar üretir"""
+    rnd = random.Random(42)
+    words = ["".join(rnd.choices(string.ascii_lowercase + "çğıöşü", k=rnd.randint(3, 10))) for _ in range(500)]
+    now = datetime.datetime.now()
+    rows = []
+    for i in range(n):
+        answer = " ".join(rnd.choices(words, k=answer_len // 7))[:answer_len]
+        rows.append({
+            "id": n - i,
+            "question": " ".join(rnd.choices(words, k=12)) + "?",
+            "answer": answer,
+            "keywords": ", ".join(rnd.choices(words, k=5)),
+            "category": rnd.choice(["tahakkuk", "tahsilat", "diger"]),
+            "created_at": now - datetime.timedelta(minutes=i),
+            "created_by": "anonymous",
+        })
+    return rows
+
+
+def bench(fn, repeat: int) -> float:
+    """En iyi çalıştırmanın süresini (ms) döndürür"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--answer-len", type=int, default=1500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--gzip-level", type=int, default=5, help="GZIP_LEVEL ayarıyla aynı tutun")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows, args.answer_len)
+    scale = 1000 / args.rows
+
+    stdlib_ms = bench(lambda: json.dumps(jsonable_encoder(rows)).encode("utf-8"), args.repeat)
+    fast_ms = bench(lambda: dumps(rows), args.repeat)
+    body = dumps(rows)
+    gzipped = gzip.compress(body, compresslevel=args.gzip_level)
+    gzip_ms = bench(lambda: gzip.compress(body, compresslevel=args.gzip_level), args.repeat)
+
+    print(f"rows={args.rows} answer_len={args.answer_len} body={len(body) / 1024:.0f} KiB "
+          f"gzip={len(gzipped) / 1024:.0f} KiB")
+    print(f"jsonable_encoder + json : {stdlib_ms * scale:8.2f} ms / 1k rows")
+    print(f"orjson (dumps)          : {fast_ms * scale:8.2f} ms / 1k rows  ({stdlib_ms / fast_ms:.1f}x)")
+    print(f"gzip level {args.gzip_level}            : {gzip_ms * scale:8.2f} ms / 1k rows")
+
+
+if __name__ == "__main__":
+    main()
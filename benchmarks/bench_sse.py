@@ -0,0 +1,240 @@
+"""Canlı olay akışının (/events) sunucu maliyeti: bağlı istemci sayısına göre.
+
+Her istemci sayısı için (--clients, örn. 0,100,200,400):
+  1. N adet SSE bağlantısı açılır (hepsi "hello" olayını alana kadar beklenir),
+  2. --idle saniye boşta beklenir (heartbeat maliyeti),
+  3. --writes adet /add gönderilir; her olayın tüm istemcilere ulaşma gecikmesi ölçülür,
+  4. uygulama süreç ağacının CPU süresi (/proc) ve RSS farkı kaydedilir.
+
+Rapor, 0 istemciye göre farkı "100 istemci başına" maliyet olarak da verir.
+WORKERS > 1 ile olaylar Postgres LISTEN/NOTIFY üzerinden worker'lar arasında dağıtılır.
+
+UYARI: --database-url ile verilen veritabanındaki questions tabloları silinir
+(adında "bench" olmalı).
+
+Kullanım:
+    createdb faqbench
+    python benchmarks/bench_sse.py --database-url postgresql://localhost/faqbench \\
+        --clients 0,100,200,400 --workers 2 --writes 50 --out sse-report.json
+"""
+import argparse
+import json
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import psycopg
+import requests
+
+from loadtest import CATEGORIES, WORDS, make_question, reset_db, start_fake_ollama, start_app, stop, wait_healthy
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def process_tree(pid: int) -> list:
+    """pid ve tüm alt süreçleri (worker'lar, vektör index sahibi)"""
+    pids, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        pids.append(current)
+        for task in pathlib.Path(f"/proc/{current}/task").glob("*"):
+            try:
+                stack.extend(int(c) for c in (task / "children").read_text().split())
+            except OSError:
+                pass
+    return pids
+
+
+def tree_usage(pid: int) -> tuple:
+    """(CPU saniyesi, RSS byte) süreç ağacı toplamı"""
+    cpu = rss = 0
+    for p in process_tree(pid):
+        try:
+            fields = pathlib.Path(f"/proc/{p}/stat").read_text().rsplit(")", 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / CLK_TCK
+            rss += int(pathlib.Path(f"/proc/{p}/statm").read_text().split()[1]) * PAGE_SIZE
+        except OSError:
+            pass
+    return cpu, rss
+
+
+class Listener(threading.Thread):
+    """Tek SSE istemcisi: olay id'si -> alınma zamanı"""
+
+    def __init__(self, base_url: str):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.ready = threading.Event()
+        self.received = {}
+        self.response = None
+        self.rejected = False
+
+    def run(self):
+        try:
+            self.response = requests.get(self.base_url + "/events", stream=True, timeout=(10, None))
+            if self.response.status_code != 200:
+                self.rejected = True
+                self.ready.set()
+                return
+            event = None
+            for line in self.response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    if event == "hello":
+                        self.ready.set()
+                    elif event == "change":
+                        self.received[json.loads(line[6:])["id"]] = time.perf_counter()
+        except (requests.RequestException, AttributeError):
+            pass
+        finally:
+            self.ready.set()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+
+
+def measure(base_url: str, app_pid: int, clients: int, args) -> dict:
+    listeners = [Listener(base_url) for _ in range(clients)]
+    for listener in listeners:
+        listener.start()
+    for listener in listeners:
+        listener.ready.wait(30)
+    rejected = sum(l.rejected for l in listeners)
+    active = [l for l in listeners if not l.rejected]
+
+    cpu0, rss0 = tree_usage(app_pid)
+    time.sleep(args.idle)
+    cpu_idle, _ = tree_usage(app_pid)
+
+    rng = random.Random(args.seed)
+    session = requests.Session()
+    sent = {}
+    nonce = uuid.uuid4().hex[:8]
+    for i in range(args.writes):
+        started = time.perf_counter()
+        r = session.post(base_url + "/add", data={
+            "question": make_question(rng, f" sse-{nonce}-{i}"),
+            "answer": "SSE benchmark", "keywords": ", ".join(rng.sample(WORDS, 3)),
+            "category": rng.choice(CATEGORIES), "created_by": "bench_sse",
+        }, timeout=60)
+        r.raise_for_status()
+        sent[r.json()["id"]] = started
+        time.sleep(args.write_interval)
+    time.sleep(2)  # son olaylar ulaşsın
+    cpu1, rss1 = tree_usage(app_pid)
+
+    delays = [
+        (listener.received[qid] - started) * 1000
+        for listener in active for qid, started in sent.items() if qid in listener.received
+    ]
+    expected = len(active) * len(sent)
+    for listener in listeners:
+        listener.close()
+
+    result = {
+        "clients": clients,
+        "connected": len(active),
+        "rejected": rejected,
+        "idle_cpu_s": round(cpu_idle - cpu0, 3),
+        "idle_cpu_pct": round((cpu_idle - cpu0) / args.idle * 100, 2),
+        "write_phase_cpu_s": round(cpu1 - cpu_idle, 3),
+        "rss_mb": round(rss1 / 2**20, 1),
+        "rss_delta_mb": round((rss1 - rss0) / 2**20, 1),
+        "delivered": len(delays),
+        "expected": expected,
+    }
+    if delays:
+        p50, p95, p99 = np.percentile(delays, [50, 95, 99])
+        result.update(delivery_p50_ms=round(float(p50), 2), delivery_p95_ms=round(float(p95), 2),
+                      delivery_p99_ms=round(float(p99), 2))
+    return result
+
+
+def per_hundred(results: list) -> list:
+    """0 istemciye göre fark, 100 istemci başına"""
+    base = next((r for r in results if r["clients"] == 0), None)
+    if base is None:
+        return []
+    rows = []
+    for r in results:
+        if r["clients"] == 0:
+            continue
+        scale = 100 / r["clients"]
+        rows.append({
+            "clients": r["clients"],
+            "idle_cpu_pct_per_100": round((r["idle_cpu_pct"] - base["idle_cpu_pct"]) * scale, 3),
+            "write_cpu_s_per_100": round((r["write_phase_cpu_s"] - base["write_phase_cpu_s"]) * scale, 3),
+            "rss_mb_per_100": round((r["rss_mb"] - base["rss_mb"]) * scale, 2),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"), required=False)
+    parser.add_argument("--clients", default="0,100,200,400")
+    parser.add_argument("--workers", type=int, default=2, help="App WORKERS setting")
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--write-interval", type=float, default=0.05)
+    parser.add_argument("--idle", type=float, default=10, help="Seconds with connected but idle clients")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--ollama-port", type=int, default=11502)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="sse-report.json")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCH_DATABASE_URL) is required")
+    if "bench" not in psycopg.conninfo.conninfo_to_dict(args.database_url).get("dbname", ""):
+        parser.error("refusing to drop tables (database name must contain 'bench')")
+
+    counts = [int(c) for c in args.clients.split(",")]
+    # start_app/start_fake_ollama'nın beklediği alanlar
+    args.database_read_url = ""
+    args.ollama_latency_ms = 0
+    args.ollama_jitter_ms = 0
+    reset_db(args.database_url)
+
+    # İstemci sayısı worker başına sınırı aşmasın
+    os.environ["SSE_MAX_CLIENTS"] = str(max(counts) + 10)
+    os.environ["SSE_HEARTBEAT"] = "5"
+    ollama = start_fake_ollama(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="faq-sse-") as tmp:
+            workdir = pathlib.Path(tmp)
+            with open(workdir / "app.log", "wb") as log_file:
+                app = start_app(args, workdir, log_file)
+                try:
+                    wait_healthy(base_url + "/health", 120, app)
+                    for clients in counts:
+                        result = measure(base_url, app.pid, clients, args)
+                        print(json.dumps(result), flush=True)
+                        results.append(result)
+                except BaseException:
+                    log_file.flush()
+                    sys.stderr.write((workdir / "app.log").read_text(errors="replace")[-4000:])
+                    raise
+                finally:
+                    stop(app)
+    finally:
+        stop(ollama)
+
+    report = {"workers": args.workers, "writes": args.writes, "results": results, "per_100_clients": per_hundred(results)}
+    pathlib.Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    for row in report["per_100_clients"]:
+        print(json.dumps(row))
+    print(f"report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
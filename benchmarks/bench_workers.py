@@ -0,0 +1,111 @@
+"""WORKERS=1..N için throughput ölçümü.
+
+Her worker sayısı için `python -m app.serve` başlatılır, birden çok istemci süreci
+sabit süre boyunca okuma ağırlıklı bir karışımla istek gönderir ve saniyedeki
+istek sayısı raporlanır. Uygulamanın env'i (DATABASE_URL, OLLAMA_BASE_URL, ...)
+çalıştıran shell'den alınır.
+
+Kullanım:
+    python benchmarks/bench_workers.py --max-workers 4 --clients 16 --duration 15
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import requests
+
+APP_DIR = pathlib.Path(__file__).resolve().parent.parent / "debian" / "opt" / "faq-studio"
+
+# (yol, ağırlık): önbellek dışı DB işi de içersin diye arama ağırlıklı
+MIX = [
+    ("/questions/search?query=a&limit=50", 5),
+    ("/questions?limit=50", 2),
+    ("/stats/summary", 2),
+    ("/health", 1),
+]
+
+
+def _client(base_url: str, duration: float, out):
+    session = requests.Session()
+    paths = [p for p, w in MIX for _ in range(w)]
+    done = errors = 0
+    deadline = time.monotonic() + duration
+    i = os.getpid()
+    while time.monotonic() < deadline:
+        try:
+            r = session.get(base_url + paths[i % len(paths)], timeout=30)
+            if r.status_code >= 500:
+                errors += 1
+        except requests.RequestException:
+            errors += 1
+        done += 1
+        i += 1
+    out.put((done, errors))
+
+
+def _wait_healthy(base_url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/health", timeout=2).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become healthy")
+
+
+def run(workers: int, args) -> dict:
+    env = dict(os.environ, WORKERS=str(workers), PORT=str(args.port), PYTHONPATH=str(APP_DIR))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.serve"], cwd=APP_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_healthy(base_url)
+        out = multiprocessing.Queue()
+        clients = [multiprocessing.Process(target=_client, args=(base_url, args.duration, out))
+                   for _ in range(args.clients)]
+        for c in clients:
+            c.start()
+        results = [out.get() for _ in clients]
+        for c in clients:
+            c.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        time.sleep(1)
+    total = sum(r[0] for r in results)
+    return {
+        "workers": workers,
+        "requests": total,
+        "errors": sum(r[1] for r in results),
+        "rps": round(total / args.duration, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    report = []
+    for workers in range(1, args.max_workers + 1):
+        row = run(workers, args)
+        row["speedup"] = round(row["rps"] / report[0]["rps"], 2) if report else 1.0
+        report.append(row)
+        print(f"workers={row['workers']:2d} rps={row['rps']:8.1f} speedup={row['speedup']:.2f}x errors={row['errors']}")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
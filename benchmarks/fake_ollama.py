@@ -0,0 +1,92 @@
+"""Benchmark'lar için Ollama yerine geçen sahte embedding sunucusu.
+
+Embedding'ler deterministiktir: her kelime hash'inden türetilen rastgele bir
+vektörün toplamı normalize edilir, böylece ortak kelimesi çok olan metinler
+birbirine benzer çıkar. Gecikme ve jitter ayarlanabilir.
+
+Kullanım:
+    python benchmarks/fake_ollama.py --port 11500 --latency-ms 25 --jitter-ms 10
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+DIM = 1024
+
+
+@lru_cache(maxsize=50000)
+def _word_vector(model: str, word: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(f"{model}:{word}".encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def embedding(text: str, model: str = "bge-m3") -> np.ndarray:
+    """Metin için deterministik, normalize 1024 boyutlu vektör"""
+    words = text.lower().split() or [""]
+    vec = np.zeros(DIM, dtype=np.float32)
+    for word in words:
+        vec += _word_vector(model, word)
+    return vec / np.linalg.norm(vec)
+
+
+def make_handler(latency_ms: float, jitter_ms: float, model_name: str):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, payload: dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._send({"models": [{"name": f"{model_name}:latest"}]})
+            else:
+                self._send({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            req = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/api/embeddings":
+                self._send({"error": "not found"}, 404)
+                return
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000
+            if delay:
+                time.sleep(delay)
+            vec = embedding(req.get("prompt", ""), req.get("model", model_name))
+            self._send({"embedding": vec.tolist()})
+
+    return Handler
+
+
+def serve(port: int, latency_ms: float = 0.0, jitter_ms: float = 0.0, model_name: str = "bge-m3"):
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency_ms, jitter_ms, model_name))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--model", default="bge-m3")
+    args = parser.parse_args()
+    print(f"fake ollama on 127.0.0.1:{args.port} latency={args.latency_ms}±{args.jitter_ms}ms", flush=True)
+    serve(args.port, args.latency_ms, args.jitter_ms, args.model)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""Uçtan uca yük testi: sahte Ollama + yerel Postgres/pgvector.
+
+Her veri boyutu (--sizes) için:
+  1. benchmark veritabanındaki tablolar silinip schema.sql ile yeniden kurulur,
+  2. N soru (sahte Ollama ile aynı deterministik embedding'lerle) COPY ile yüklenir,
+  3. `python -m app.serve` geçici JSON/Chroma dizinleriyle başlatılır,
+  4. --concurrency istemci --duration saniye boyunca gerçekçi bir karışım gönderir
+     (/check-duplicate, /add, /questions, /questions/search, /stats/*),
+  5. uç nokta başına p50/p95/p99 ve throughput JSON rapora yazılır.
+
+Raporlar commit'ler arasında karşılaştırılabilir: --baseline eski raporu okuyup
+farkları yazdırır.
+
+UYARI: --database-url ile verilen veritabanındaki questions tabloları silinir.
+Adında "bench" geçmeyen veritabanları için --force gerekir.
+
+Kullanım:
+    createdb faqbench
+    python benchmarks/loadtest.py --database-url postgresql://localhost/faqbench \\
+        --sizes 1000,10000,100000 --concurrency 16 --duration 30 \\
+        --ollama-latency-ms 25 --out bench-report.json --baseline old-report.json
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+import psycopg
+import requests
+from pgvector.psycopg import register_vector
+
+from fake_ollama import embedding
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+APP_DIR = REPO_DIR / "debian" / "opt" / "faq-studio"
+
+CATEGORIES = ["tahakkuk", "tahsilat", "diger", "hesap", "fatura", "iade", "kampanya", "teslimat"]
+WORDS = (
+    "fatura ödeme iade hesap şifre kart kargo teslimat sipariş iptal kampanya indirim "
+    "abonelik tahsilat tahakkuk borç taksit limit adres telefon e-posta bildirim mobil "
+    "uygulama giriş kayıt güncelleme belge sözleşme müşteri destek süre ücret vergi "
+    "dekont havale eft banka kredi puan hediye stok ürün garanti servis arıza"
+).split()
+STEMS = ["nasıl", "neden", "ne zaman", "nereden", "kaç günde", "hangi durumda"]
+STATS_PATHS = ["/stats/summary", "/stats/categories", "/stats/total", "/stats/recent", "/stats/by-date"]
+
+# (işlem, ağırlık): okuma ağırlıklı, yazmalar ~%10
+MIX = [
+    ("check_duplicate", 25),
+    ("add", 10),
+    ("questions", 25),
+    ("search", 20),
+    ("stats", 20),
+]
+
+
+def make_question(rng: random.Random, suffix: str = "") -> str:
+    words = " ".join(rng.sample(WORDS, rng.randint(3, 6)))
+    return f"{words} {rng.choice(STEMS)} yapılır{suffix}?"
+
+
+# ---------------------------------------------------------------------------
+# Veritabanı hazırlığı
+# ---------------------------------------------------------------------------
+
+def reset_db(database_url: str):
+    """schema.sql'deki tüm tabloları silip şemayı yeniden uygular
+
+    Tablo listesi schema.sql'den okunur: sonradan eklenen tablolar (category_centroids,
+    reembed_jobs, ...) önceki koşunun verisini bir sonrakine taşımasın.
+    """
+    sql = (APP_DIR / "app" / "schema.sql").read_text(encoding="utf-8-sig")
+    tables = re.findall(r"CREATE\s+(?:UNLOGGED\s+)?TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)", sql, re.IGNORECASE)
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        conn.execute(f"DROP TABLE IF EXISTS {', '.join(tables)} CASCADE")
+        conn.execute(sql)
+
+
+def seed_db(database_url: str, size: int, seed: int) -> float:
+    """size adet soruyu binary COPY ile yükler, süreyi döndürür"""
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+    started = time.perf_counter()
+    with psycopg.connect(database_url) as conn:
+        register_vector(conn)
+        with conn.cursor() as cur:
+            with cur.copy(
+                "COPY questions (question, answer, keywords, category, embedding, created_at) "
+                "FROM STDIN WITH (FORMAT BINARY)"
+            ) as copy:
+                copy.set_types(["text", "text", "text", "text", "vector", "timestamp"])
+                for i in range(size):
+                    question = make_question(rng, f" #{i}")
+                    copy.write_row([
+                        question,
+                        f"Cevap {i}: " + " ".join(rng.sample(WORDS, 12)),
+                        ", ".join(rng.sample(WORDS, 3)),
+                        rng.choice(CATEGORIES),
+                        embedding(question),
+                        now - datetime.timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+                    ])
+            cur.execute("ANALYZE questions")
+        conn.commit()
+    return time.perf_counter() - started
+
+
+# ---------------------------------------------------------------------------
+# Süreçler
+# ---------------------------------------------------------------------------
+
+def wait_healthy(base_url: str, timeout: float, proc: subprocess.Popen = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"process exited early with code {proc.returncode}")
+        try:
+            if requests.get(base_url, timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{base_url} did not become healthy in {timeout}s")
+
+
+def start_fake_ollama(args) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, str(BENCH_DIR / "fake_ollama.py"), "--port", str(args.ollama_port),
+         "--latency-ms", str(args.ollama_latency_ms), "--jitter-ms", str(args.ollama_jitter_ms)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_healthy(f"http://127.0.0.1:{args.ollama_port}/api/tags", 30, proc)
+    return proc
+
+
+def start_app(args, workdir: pathlib.Path, log_file) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        DATABASE_READ_URL=args.database_read_url or "",
+        OLLAMA_BASE_URL=f"http://127.0.0.1:{args.ollama_port}",
+        JSON_PATH=str(workdir / "questions.json"),
+        CATEGORIES_PATH=str(workdir / "categories.json"),
+        CHROMA_DB_PATH=str(workdir / "chroma"),
+        VECTOR_SOCKET_PATH=str(workdir / "vector.sock"),
+        HOST="127.0.0.1",
+        PORT=str(args.port),
+        WORKERS=str(args.workers),
+        LOG_LEVEL="WARNING",
+        ANONYMIZED_TELEMETRY="False",
+        PYTHONPATH=str(APP_DIR),
+    )
+    env.pop("CACHE_GENERATION_PATH", None)
+    return subprocess.Popen(
+        [sys.executable, "-m", "app.serve"], cwd=APP_DIR, env=env,
+        stdout=log_file, stderr=subprocess.STDOUT,
+    )
+
+
+def stop(proc: subprocess.Popen):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+# ---------------------------------------------------------------------------
+# Yük üretimi
+# ---------------------------------------------------------------------------
+
+class Worker(threading.Thread):
+    """Kapalı döngü istemci: bir yanıt gelmeden yeni istek göndermez"""
+
+    def __init__(self, index: int, base_url: str, size: int, deadline: float, seed: int, nonce: str):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.size = size
+        self.deadline = deadline
+        self.rng = random.Random(seed * 1000 + index)
+        self.tag = f"{nonce}-{index}"
+        self.session = requests.Session()
+        self.ops = [op for op, weight in MIX for _ in range(weight)]
+        self.samples = []  # (işlem, saniye, başarılı mı)
+        self._added = 0
+
+    def _request(self, op: str) -> requests.Response:
+        rng = self.rng
+        if op == "check_duplicate":
+            return self.session.post(self.base_url + "/check-duplicate",
+                                     data={"question": make_question(rng)}, timeout=60)
+        if op == "add":
+            self._added += 1
+            return self.session.post(self.base_url + "/add", data={
+                "question": make_question(rng, f" {self.tag}-{self._added}"),
+                "answer": "Benchmark cevabı " + " ".join(rng.sample(WORDS, 8)),
+                "keywords": ", ".join(rng.sample(WORDS, 3)),
+                "category": rng.choice(CATEGORIES),
+                "created_by": "loadtest",
+            }, timeout=60)
+        if op == "questions":
+            offset = rng.randint(0, max(0, self.size - 50))
+            return self.session.get(self.base_url + "/questions",
+                                    params={"limit": 50, "offset": offset}, timeout=60)
+        if op == "search":
+            return self.session.get(self.base_url + "/questions/search",
+                                    params={"query": rng.choice(WORDS), "limit": 50}, timeout=60)
+        return self.session.get(self.base_url + rng.choice(STATS_PATHS), timeout=60)
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            op = self.rng.choice(self.ops)
+            started = time.perf_counter()
+            try:
+                ok = self._request(op).status_code < 400
+            except requests.RequestException:
+                ok = False
+            self.samples.append((op, time.perf_counter() - started, ok))
+
+
+def summarize(samples: list, duration: float) -> dict:
+    latencies = np.array([s[1] for s in samples if s[2]]) * 1000
+    errors = sum(1 for s in samples if not s[2])
+    if not len(latencies):
+        return {"count": 0, "errors": errors, "rps": 0.0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "count": int(len(latencies)),
+        "errors": errors,
+        "rps": round(len(latencies) / duration, 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(latencies.max()), 2),
+    }
+
+
+def drive(base_url: str, size: int, args) -> dict:
+    # Isınma: bağlantılar, önbellekler, JIT'siz ilk import maliyetleri
+    warm = Worker(0, base_url, size, time.monotonic() + args.warmup, args.seed + 1, "warmup")
+    warm.run()
+
+    nonce = uuid.uuid4().hex[:8]
+    deadline = time.monotonic() + args.duration
+    workers = [Worker(i, base_url, size, deadline, args.seed, nonce) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [s for w in workers for s in w.samples]
+    return {
+        "overall": summarize(samples, elapsed),
+        "endpoints": {op: summarize([s for s in samples if s[0] == op], elapsed) for op, _ in MIX},
+    }
+
+
+def run_size(size: int, args) -> dict:
+    print(f"[{size}] resetting and seeding...", flush=True)
+    reset_db(args.database_url)
+    seed_seconds = seed_db(args.database_url, size, args.seed)
+
+    with tempfile.TemporaryDirectory(prefix=f"faq-bench-{size}-") as tmp:
+        workdir = pathlib.Path(tmp)
+        with open(workdir / "app.log", "wb") as log_file:
+            app = start_app(args, workdir, log_file)
+            base_url = f"http://127.0.0.1:{args.port}"
+            try:
+                started = time.perf_counter()
+                wait_healthy(base_url + "/health", args.startup_timeout, app)
+                startup_seconds = time.perf_counter() - started
+                print(f"[{size}] seeded in {seed_seconds:.1f}s, app ready in {startup_seconds:.1f}s; "
+                      f"driving {args.concurrency} clients for {args.duration}s", flush=True)
+                result = drive(base_url, size, args)
+            except Exception:
+                log_file.flush()
+                sys.stderr.write((workdir / "app.log").read_text(errors="replace")[-4000:])
+                raise
+            finally:
+                stop(app)
+
+    result["seed_seconds"] = round(seed_seconds, 2)
+    result["startup_seconds"] = round(startup_seconds, 2)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Rapor
+# ---------------------------------------------------------------------------
+
+def git_info() -> dict:
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=REPO_DIR, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_table(report: dict, baseline: dict = None):
+    w = 15 if baseline else 9
+    header = f"{'size':>7} {'endpoint':<16} {'rps':>{w}} {'p50':>{w}} {'p95':>{w}} {'p99':>{w}} {'err':>5}"
+    print(header)
+    print("-" * len(header))
+    for size, run in report["runs"].items():
+        base_run = (baseline or {}).get("runs", {}).get(size, {})
+        rows = [("overall", run["overall"], base_run.get("overall"))]
+        rows += [(op, stats, base_run.get("endpoints", {}).get(op)) for op, stats in run["endpoints"].items()]
+        for name, stats, base in rows:
+            cells = []
+            for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                value = stats.get(key)
+                cell = "-" if value is None else f"{value:.1f}"
+                if base and base.get(key) and value is not None:
+                    cell += f" ({(value - base[key]) / base[key] * 100:+.0f}%)"
+                cells.append(cell)
+            print(f"{size:>7} {name:<16} " + " ".join(f"{c:>{w}}" for c in cells) + f" {stats['errors']:>5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"),
+                        help="Benchmark database (tables are dropped!), default: $BENCH_DATABASE_URL")
+    parser.add_argument("--database-read-url", default=os.environ.get("BENCH_DATABASE_READ_URL"),
+                        help="Streaming replica of --database-url for read routing (DATABASE_READ_URL)")
+    parser.add_argument("--force", action="store_true", help="Allow a database name without 'bench'")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="App WORKERS setting")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ollama-port", type=int, default=11500)
+    parser.add_argument("--ollama-latency-ms", type=float, default=20)
+    parser.add_argument("--ollama-jitter-ms", type=float, default=5)
+    parser.add_argument("--startup-timeout", type=float, default=1800,
+                        help="Seconds to wait for startup (Chroma warm-up of large seeds is slow)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="bench-report.json")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+    if "bench" not in psycopg.conninfo.conninfo_to_dict(args.database_url).get("dbname", "") and not args.force:
+        parser.error("refusing to drop tables in a database without 'bench' in its name (use --force)")
+
+    report = {
+        "meta": {
+            **git_info(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "workers": args.workers,
+            "read_replica": bool(args.database_read_url),
+            "ollama_latency_ms": args.ollama_latency_ms,
+            "ollama_jitter_ms": args.ollama_jitter_ms,
+            "mix": dict(MIX),
+            "seed": args.seed,
+        },
+        "runs": {},
+    }
+
+    ollama = start_fake_ollama(args)
+    try:
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            report["runs"][str(size)] = run_size(size, args)
+    finally:
+        stop(ollama)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"baseline: {baseline['meta'].get('commit')}  current: {report['meta']['commit']}")
+    print_table(report, baseline)
+    print(f"report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""PATCH /questions/{id} uçtan uca kontrolü: metadata değişikliği vektörü değiştirmemeli.
+
+Varsayılan (CHROMA_SLIM=false) düzende:
+  1. sadece cevap/keyword/kategori değişen PATCH embedding hesaplamaz,
+  2. sadece boşlukları değişen soru metni de yeniden embed edilmez (doküman güncellenir),
+  3. büyük/küçük harf değişikliği yeniden embed edilir,
+  4. başka bir sorunun metnine çevirme embedding hesaplamadan 409 + existing_id döner,
+  5. kategori içi arama (scope=only) soruyu yeni kategorisinde aynı vektörle bulur,
+  6. uygulama durduktan sonra Chroma'daki kayıt okunur: vektör Postgres'teki embedding
+     ile birebir aynı (1024 boyut), metadata ve doküman güncel olmalı.
+
+UYARI: --database-url ile verilen veritabanındaki tablolar silinir (adında "bench" olmalı).
+
+Kullanım:
+    createdb faqbench
+    python benchmarks/patch_check.py --database-url postgresql://localhost/faqbench
+"""
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import uuid
+
+import chromadb
+import numpy as np
+import psycopg
+import requests
+from pgvector.psycopg import register_vector
+
+from loadtest import reset_db, start_fake_ollama, start_app, stop, wait_healthy
+from replica_check import check
+
+
+def db_embedding(database_url: str, qid: int) -> np.ndarray:
+    with psycopg.connect(database_url) as conn:
+        register_vector(conn)
+        value = conn.execute("SELECT embedding FROM questions WHERE id = %s", (qid,)).fetchone()[0]
+    if hasattr(value, "to_numpy"):
+        value = value.to_numpy()
+    return np.asarray(value, dtype=np.float32)
+
+
+def patch(session: requests.Session, base_url: str, qid: int, **fields) -> dict:
+    r = session.patch(f"{base_url}/questions/{qid}", data=fields)
+    r.raise_for_status()
+    return r.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--ollama-port", type=int, default=11503)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url (or BENCH_DATABASE_URL) is required")
+    if "bench" not in psycopg.conninfo.conninfo_to_dict(args.database_url).get("dbname", ""):
+        parser.error("refusing to drop tables (database name must contain 'bench')")
+
+    # start_app/start_fake_ollama'nın beklediği alanlar
+    args.database_read_url = ""
+    args.workers = 1
+    args.ollama_latency_ms = 0
+    args.ollama_jitter_ms = 0
+    reset_db(args.database_url)
+
+    os.environ["CHROMA_SLIM"] = "false"
+    ollama = start_fake_ollama(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        with tempfile.TemporaryDirectory(prefix="faq-patch-") as tmp:
+            workdir = pathlib.Path(tmp)
+            with open(workdir / "app.log", "wb") as log_file:
+                app = start_app(args, workdir, log_file)
+                try:
+                    wait_healthy(base_url + "/health", 120, app)
+                    session = requests.Session()
+                    nonce = uuid.uuid4().hex[:12]
+                    text = f"yama kontrol {nonce} nasıl yapılır?"
+                    r = session.post(base_url + "/add", data={
+                        "question": text, "answer": "eski cevap", "keywords": "eski", "category": "diger",
+                    })
+                    r.raise_for_status()
+                    qid = r.json()["id"]
+                    before = db_embedding(args.database_url, qid)
+
+                    result = patch(session, base_url, qid, answer="yeni cevap", keywords="yeni, kelime",
+                                   category="patch-kontrol")
+                    check(not result["reembedded"] and set(result["changed"]) == {"answer", "keywords", "category"},
+                          f"metadata-only PATCH does not re-embed: {result}")
+                    spaced = text.replace(" ", "  ")
+                    result = patch(session, base_url, qid, question=spaced)
+                    check(not result["reembedded"], "whitespace-only question change does not re-embed")
+                    check(np.array_equal(db_embedding(args.database_url, qid), before),
+                          "Postgres embedding unchanged after metadata-only PATCHes")
+
+                    r = session.post(base_url + "/add", data={
+                        "question": f"harf kontrol {nonce}", "answer": "x", "keywords": "x", "category": "diger",
+                    })
+                    r.raise_for_status()
+                    other_id = r.json()["id"]
+                    result = patch(session, base_url, other_id, question=f"Harf kontrol {nonce}")
+                    check(result["reembedded"], "case-only question change is re-embedded")
+
+                    r = session.patch(f"{base_url}/questions/{other_id}", data={"question": f" {spaced} "})
+                    check(r.status_code == 409 and r.json().get("existing_id") == qid,
+                          f"PATCH to another question's text returns 409 with existing_id: {r.status_code} {r.text}")
+
+                    r = session.post(base_url + "/check-duplicate", data={"question": text},
+                                     params={"category": "patch-kontrol", "scope": "only", "k": 1})
+                    r.raise_for_status()
+                    hits = r.json()["results"]
+                    check(bool(hits) and hits[0]["id"] == qid and hits[0]["sim"] > 0.999,
+                          f"found in its new category partition with the same vector: {hits}")
+                except BaseException:
+                    log_file.flush()
+                    sys.stderr.write((workdir / "app.log").read_text(errors="replace")[-4000:])
+                    raise
+                finally:
+                    stop(app)
+
+            # Uygulama durdu: Chroma kaydını doğrudan oku
+            client = chromadb.PersistentClient(path=str(workdir / "chroma"))
+            stored = client.get_collection("faq_questions").get(
+                ids=[str(qid)], include=["embeddings", "metadatas", "documents"]
+            )
+            check(stored["ids"] == [str(qid)], "question still in the Chroma index")
+            vector = np.asarray(stored["embeddings"][0], dtype=np.float32)
+            check(vector.shape == before.shape == (1024,), f"stored vector has 1024 dims: {vector.shape}")
+            check(np.allclose(vector, before, atol=1e-6), "stored Chroma vector identical to the original embedding")
+            metadata = stored["metadatas"][0]
+            check(metadata["answer"] == "yeni cevap" and metadata["category"] == "patch-kontrol",
+                  f"Chroma metadata updated: {metadata}")
+            check(stored["documents"][0] == spaced, "Chroma document updated")
+    finally:
+        stop(ollama)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Read replica yönlendirmesinin uçtan uca kontrolü: iki yerel Postgres örneği.
+
+İkinci örnek bilerek replika DEĞİLDİR (birbirinden bağımsız iki veritabanı): uygulama
+onu DATABASE_READ_URL olarak görür ama yazmalar oraya hiç ulaşmaz. Böylece bir okumanın
+hangi veritabanından geldiği sonuçtan anlaşılır:
+  1. yazma yapan istemci (çerezli) kendi yazmasını hemen görür (read-your-writes),
+  2. yazmadan hemen sonra dolan paylaşılan önbellek primary'den okunur,
+  3. çerezsiz bir istemcinin araması replikaya gider ve yeni kaydı görmez,
+  4. READ_STICKY_SECONDS dolunca yazan istemci de replikaya döner,
+  5. --stop-replica-cmd verilirse replika durdurulur: gecikme ölçümü beklenmeden
+     (havuzdaki bağlantılar kopukken) ilk okuma 500 vermeden primary'ye düşmeli ve
+     replika aynı istekte rotasyondan çıkmalıdır.
+
+UYARI: iki veritabanındaki questions tabloları silinir (adlarında "bench" olmalı).
+
+Kullanım:
+    createdb -p 5432 faqbench && createdb -p 5433 faqbench_replica
+    python benchmarks/replica_check.py \\
+        --database-url postgresql://localhost:5432/faqbench \\
+        --database-read-url postgresql://localhost:5433/faqbench_replica \\
+        --stop-replica-cmd "pg_ctl -D /tmp/pg5433 stop -m fast"
+"""
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import psycopg
+import requests
+
+from loadtest import reset_db, start_fake_ollama, start_app, stop, wait_healthy
+
+STICKY_SECONDS = 3
+
+
+def check(condition: bool, message: str):
+    print(("ok   " if condition else "FAIL ") + message, flush=True)
+    if not condition:
+        raise SystemExit(1)
+
+
+def found(session: requests.Session, base_url: str, nonce: str) -> bool:
+    r = session.get(f"{base_url}/questions/search", params={"query": nonce})
+    r.raise_for_status()
+    return any(nonce in row["question"] for row in r.json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--database-read-url", required=True, help="A second, independent instance")
+    parser.add_argument("--stop-replica-cmd", help="Shell command that stops the read instance (optional step)")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--ollama-port", type=int, default=11501)
+    args = parser.parse_args()
+    for url in (args.database_url, args.database_read_url):
+        if "bench" not in psycopg.conninfo.conninfo_to_dict(url).get("dbname", ""):
+            parser.error(f"refusing to drop tables in {url} (database name must contain 'bench')")
+
+    # start_app/start_fake_ollama'nın beklediği alanlar
+    args.workers = 1
+    args.ollama_latency_ms = 0
+    args.ollama_jitter_ms = 0
+    reset_db(args.database_url)
+    reset_db(args.database_read_url)
+
+    ollama = start_fake_ollama(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        with tempfile.TemporaryDirectory(prefix="faq-replica-") as tmp:
+            workdir = pathlib.Path(tmp)
+            with open(workdir / "app.log", "wb") as log_file:
+                os.environ["READ_STICKY_SECONDS"] = str(STICKY_SECONDS)
+                # Replika düşüşünü gecikme ölçümü değil istek yolu fark etmeli
+                os.environ["READ_LAG_CHECK_INTERVAL"] = "3600"
+                app = start_app(args, workdir, log_file)
+                try:
+                    wait_healthy(base_url + "/health", 120, app)
+                    replicas = requests.get(base_url + "/health").json().get("read_replicas") or []
+                    check(len(replicas) == 1 and replicas[0]["usable"], f"replica in rotation: {replicas}")
+
+                    writer, reader = requests.Session(), requests.Session()
+                    nonce = uuid.uuid4().hex[:12]
+                    r = writer.post(base_url + "/add", data={
+                        "question": f"replika kontrol {nonce} nasıl yapılır?", "answer": "test",
+                        "keywords": "test", "category": "diger",
+                    })
+                    r.raise_for_status()
+                    qid = r.json()["id"]
+                    check("faq_primary_until" in writer.cookies, "write response sets the sticky cookie")
+                    check(found(writer, base_url, nonce), "writer sees its own write (primary)")
+                    check(reader.get(f"{base_url}/questions/{qid}").status_code == 200,
+                          "shared cache filled from the primary right after the write")
+                    check(not found(reader, base_url, nonce), "other client's search goes to the replica")
+
+                    time.sleep(STICKY_SECONDS + 0.5)
+                    check(not found(writer, base_url, nonce), "writer returns to the replica after the window")
+
+                    if args.stop_replica_cmd:
+                        subprocess.run(args.stop_replica_cmd, shell=True, check=True)
+                        check(found(reader, base_url, nonce), "first read after the stop falls back to the primary")
+                        replicas = requests.get(base_url + "/health").json()["read_replicas"]
+                        check(not replicas[0]["usable"] and replicas[0]["error"],
+                              f"stopped replica leaves rotation on the failed read: {replicas}")
+                        check(found(reader, base_url, nonce), "later reads go to the primary")
+                except BaseException:
+                    log_file.flush()
+                    sys.stderr.write((workdir / "app.log").read_text(errors="replace")[-4000:])
+                    raise
+                finally:
+                    stop(app)
+    finally:
+        stop(ollama)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,16 +15,32 @@ class Settings(BaseSettings):
     
     # Database Settings
     DATABASE_URL: str = Field(..., description="PostgreSQL database connection URL")
+    DATABASE_READ_URL: str = Field(default="", description="Space-separated read replica URLs (empty = read from primary)")
+    READ_MAX_LAG: float = Field(default=2.0, ge=0, description="Replicas lagging more than this many seconds get no reads")
+    READ_LAG_CHECK_INTERVAL: float = Field(default=1.0, gt=0, description="Seconds between replica lag checks")
+    READ_STICKY_SECONDS: float = Field(default=5.0, ge=0, description="Reads go to the primary this long after a write (keep above READ_MAX_LAG)")
+    DB_POOL_MIN: int = Field(default=1, ge=0, description="Connections kept open per worker")
+    DB_POOL_MAX: int = Field(default=10, ge=1, description="Max pooled connections per worker")
+    DB_POOL_TIMEOUT: float = Field(default=10.0, gt=0, description="Seconds to wait for a pooled connection")
+    DB_SLOW_QUERY_MS: float = Field(default=500.0, gt=0, description="Log queries slower than this many milliseconds")
+    DB_PREPARE: bool = Field(default=True, description="Use server-side prepared statements (disable behind transaction-mode PgBouncer)")
     
     # File Paths
     JSON_PATH: str = Field(default="/app/data/questions.json", description="JSON backup file path")
     CATEGORIES_PATH: str = Field(default="/app/data/categories.json", description="Categories file path")
     CHROMA_DB_PATH: str = Field(default="./chroma_db", description="ChromaDB persistence path")
+    CHROMA_SLIM: bool = Field(default=False, description="Store only id and category in ChromaDB; hydrate other fields from PostgreSQL")
     
     # Server Settings
     HOST: str = Field(default="0.0.0.0", description="Server host")
     PORT: int = Field(default=8000, ge=1, le=65535, description="Server port")
     WORKERS: int = Field(default=1, ge=1, description="Number of worker processes")
+
+    # Multi-worker Settings (app.serve launcher sets these for the workers)
+    VECTOR_MODE: str = Field(default="local", description="local: in-process ChromaDB, remote: use the index owner process")
+    VECTOR_SOCKET_PATH: str = Field(default="/tmp/faq-studio-vector.sock", description="Unix socket of the vector index owner")
+    CACHE_GENERATION_PATH: str = Field(default="", description="Shared cache generation file (empty = per process)")
+    BOOT_ID: str = Field(default="", description="Launch id shared by all workers; startup tasks run once per id (empty = every start)")
     
     # Logging Settings
     LOG_LEVEL: str = Field(default="INFO", description="Logging level")
@@ -32,12 +48,63 @@ class Settings(BaseSettings):
         default="%(asctime)s %(levelname)s %(name)s :: %(message)s",
         description="Log message format"
     )
+    LOG_JSON: bool = Field(default=False, description="Emit one JSON object per log record instead of LOG_FORMAT")
+    LOG_QUEUE_SIZE: int = Field(default=10000, ge=1, description="Max buffered log records; extra records are dropped")
+    LOG_SAMPLE_RATES: dict[str, float] = Field(
+        default={},
+        description='Fraction of DEBUG records kept per logger, e.g. {"faqstudio.access": 0.1}'
+    )
     
     # Security & Performance
     CORS_ORIGINS: list[str] = Field(default=["*"], description="CORS allowed origins")
     REQUEST_TIMEOUT: int = Field(default=30, ge=1, description="Request timeout in seconds")
     MAX_EMBEDDING_LENGTH: int = Field(default=1000, ge=1, description="Maximum text length for embedding")
-    
+
+    # Ollama Client Settings
+    OLLAMA_CONNECT_TIMEOUT: float = Field(default=3.0, gt=0, description="Ollama connect timeout in seconds")
+    OLLAMA_READ_TIMEOUT: float = Field(default=30.0, gt=0, description="Ollama read timeout in seconds")
+    OLLAMA_POOL_SIZE: int = Field(default=10, ge=1, description="Max keep-alive connections to Ollama")
+    OLLAMA_MAX_RETRIES: int = Field(default=2, ge=0, description="Retries for transient Ollama errors")
+    OLLAMA_RETRY_BACKOFF: float = Field(default=0.2, ge=0, description="Base backoff (seconds) between retries")
+    OLLAMA_RETRY_BACKOFF_MAX: float = Field(default=2.0, ge=0, description="Max backoff (seconds) between retries")
+    OLLAMA_CIRCUIT_THRESHOLD: int = Field(default=5, ge=1, description="Consecutive failures before the circuit opens")
+    OLLAMA_CIRCUIT_RESET: float = Field(default=30.0, gt=0, description="Seconds the circuit stays open before a trial call")
+    OLLAMA_HEDGE_DELAY: float = Field(default=0.0, ge=0, description="Send a hedged duplicate request after this many seconds (0 = off)")
+
+    # Caching
+    STATS_CACHE_TTL: int = Field(default=5, ge=0, description="Stats response cache TTL in seconds")
+    RESPONSE_CACHE_SIZE: int = Field(default=256, ge=1, description="Max cached read responses (LRU)")
+    GZIP_MIN_SIZE: int = Field(default=1024, ge=0, description="Compress responses larger than this many bytes")
+    GZIP_LEVEL: int = Field(default=5, ge=1, le=9, description="gzip compression level")
+    TEMPLATE_CACHE_DIR: str = Field(default="", description="Jinja bytecode cache directory (empty = system temp dir)")
+    EXPORT_BATCH_SIZE: int = Field(default=1000, ge=1, description="Rows fetched per round trip by /export")
+
+    # Admission control (embedding gerektiren endpoint'ler, süreç başına)
+    EMBED_CONCURRENCY: int = Field(default=4, ge=1, description="Concurrent embedding calls per worker")
+    EMBED_QUEUE_INTERACTIVE: int = Field(default=32, ge=0, description="Max queued duplicate checks before shedding")
+    EMBED_QUEUE_WRITE: int = Field(default=16, ge=0, description="Max queued add/update embeddings before shedding")
+    EMBED_QUEUE_BULK: int = Field(default=8, ge=0, description="Max queued background embeddings before shedding")
+    EMBED_BULK_CONCURRENCY: int = Field(default=1, ge=1, description="Slots background embedding work may hold at once")
+    EMBED_QUEUE_TIMEOUT: float = Field(default=5.0, gt=0, description="Max seconds a request waits for an embedding slot")
+
+    # Admin & background jobs
+    ADMIN_TOKEN: str = Field(default="", description="Token for /admin endpoints (X-Admin-Token); empty disables them")
+    DUPLICATE_SCAN_THRESHOLD: float = Field(default=0.92, ge=0.0, le=1.0, description="Similarity for corpus-wide duplicate pairs")
+    DUPLICATE_SCAN_BLOCK: int = Field(default=2048, ge=64, description="Rows per block in the duplicate scan matmul")
+    DUPLICATE_SCAN_WORKERS: int = Field(default=0, ge=0, description="Threads for the duplicate scan (0 = CPU count)")
+    DUPLICATE_SCAN_KEEP: int = Field(default=5, ge=1, description="Finished duplicate scans kept in the database")
+    REEMBED_AUTO: bool = Field(default=True, description="Re-embed automatically when EMBED_MODEL differs from the indexed model")
+    REEMBED_BATCH_SIZE: int = Field(default=32, ge=1, description="Questions re-embedded per checkpointed batch")
+    REEMBED_PAUSE: float = Field(default=0.0, ge=0, description="Seconds to sleep between re-embedding batches (throttle)")
+    PROFILE_MAX_SECONDS: float = Field(default=60.0, gt=0, description="Longest CPU profile /admin/profile/cpu may take")
+    PROFILE_KEEP_REQUESTS: int = Field(default=20, ge=1, description="Per-request profiles kept in memory")
+    LOOP_LAG_THRESHOLD_MS: float = Field(default=250.0, ge=0, description="Log event loop stalls longer than this (0 = off)")
+    IDEMPOTENCY_TTL: float = Field(default=3600.0, gt=0, description="Seconds an Idempotency-Key result is kept for replay")
+    IDEMPOTENCY_WAIT: float = Field(default=10.0, ge=0, description="Seconds a retry waits for the original request holding the same key")
+    SSE_MAX_CLIENTS: int = Field(default=200, ge=0, description="Live event (/events) connections allowed per worker")
+    SSE_QUEUE_SIZE: int = Field(default=100, ge=1, description="Undelivered events buffered per client before it must resync")
+    SSE_HEARTBEAT: float = Field(default=15.0, gt=0, description="Seconds between keep-alive comments on idle /events streams")
+
     # Optional Development Settings
     DEBUG: bool = Field(default=False, description="Debug mode")
     RELOAD: bool = Field(default=False, description="Auto-reload on code changes")
@@ -59,6 +126,13 @@ class Settings(BaseSettings):
             raise ValueError('DATABASE_URL must be a PostgreSQL connection string')
         return v
     
+    @validator('VECTOR_MODE')
+    def validate_vector_mode(cls, v):
+        """Validate vector index mode"""
+        if v not in ('local', 'remote'):
+            raise ValueError('VECTOR_MODE must be one of: local, remote')
+        return v
+    
     @validator('OLLAMA_BASE_URL')
     def validate_ollama_url(cls, v):
         """Validate Ollama URL format"""
@@ -1,23 +1,267 @@
-﻿import os, psycopg
+﻿import os, hashlib, threading, itertools, contextvars, psycopg
+from contextlib import contextmanager
+from typing import List, Optional
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 from pgvector.psycopg import register_vector
 from app.config import settings
+from app.logger import logger
 
-def get_conn():
-    conn = psycopg.connect(settings.DATABASE_URL, row_factory=dict_row)
+def _configure(conn):
     # Timezone ayarını yap
     with conn.cursor() as cur:
         try:
             cur.execute("SET TIME ZONE 'Europe/Istanbul'")
             conn.commit()
         except Exception as e:
-            print(f"Timezone ayarı yapılamadı: {e}")
+            logger.warning("Timezone ayarı yapılamadı: %s", e)
             # Hata olsa bile devam et
     # Register pgvector adapter so we can pass Vector() objects
     register_vector(conn)
+
+def get_conn():
+    """Kısa ömürlü tekil bağlantı (arka plan işleri, advisory lock'lar)"""
+    conn = psycopg.connect(settings.DATABASE_URL, row_factory=dict_row)
+    _configure(conn)
     return conn
 
 
+def _make_pool(url: str, name: str) -> ConnectionPool:
+    pool = ConnectionPool(
+        url,
+        min_size=settings.DB_POOL_MIN,
+        max_size=settings.DB_POOL_MAX,
+        kwargs={"row_factory": dict_row},
+        configure=_configure,
+        name=name,
+        open=False,
+    )
+    pool.open()
+    logger.info("DB pool %s opened min=%s max=%s", name, settings.DB_POOL_MIN, settings.DB_POOL_MAX)
+    return pool
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """İstek yolundaki sorgular için süreç başına bağlantı havuzu (ilk kullanımda açılır)
+
+    Bağlantılar uzun ömürlü olduğu için sunucu tarafı prepared statement'lar tekrar kullanılır.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _make_pool(settings.DATABASE_URL, "faq-studio")
+    return _pool
+
+def close_pool():
+    global _pool, _read_router
+    if _read_router is not None:
+        _read_router.close()
+        _read_router = None
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+@contextmanager
+def pooled_conn():
+    """Havuzdan bağlantı; blok hatasız biterse commit, hata olursa rollback edilir"""
+    with get_pool().connection(timeout=settings.DB_POOL_TIMEOUT) as conn:
+        yield conn
+
+
+# --- Read replica yönlendirmesi ---
+
+# Replica değilse (pg_is_in_recovery() false) gecikme 0 sayılır
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END::float8 AS lag
+"""
+
+# İstek başına yönlendirme durumu; middleware kurar. Dict paylaşıldığı için
+# thread havuzunda çalışan kod da aynı nesneyi günceller.
+_route_state: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("db_route_state", default=None)
+
+
+class ReplicaError(psycopg.OperationalError):
+    """Replikadaki sorgu bağlantı koptuğu için düştü; replika rotasyondan çıkarıldı"""
+
+
+class Replica:
+    """Tek bir okuma replikası: havuzu ve son ölçülen gecikmesi"""
+
+    def __init__(self, url: str, index: int):
+        self.url = url
+        self.name = f"replica-{index}"
+        self.pool: Optional[ConnectionPool] = None
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def usable(self) -> bool:
+        return self.pool is not None and self.error is None and self.lag is not None \
+            and self.lag <= settings.READ_MAX_LAG
+
+    def check(self):
+        """Gecikmeyi ölçer; bağlantı hatasında replika kullanım dışı kalır"""
+        was_usable = self.usable
+        try:
+            if self.pool is None:
+                self.pool = _make_pool(self.url, f"faq-studio-{self.name}")
+            elif self.error is not None:
+                # Replika düşüp döndüyse havuzdaki kopuk bağlantıları at
+                self.pool.check()
+            with self.pool.connection(timeout=settings.DB_POOL_TIMEOUT) as conn:
+                self.lag = conn.execute(REPLICA_LAG_SQL).fetchone()["lag"]
+            self.error = None
+        except Exception as e:
+            self.error = str(e)[:200]
+        if was_usable != self.usable:
+            logger.warning("Read %s %s (lag=%s error=%s)", self.name,
+                           "back in rotation" if self.usable else "out of rotation", self.lag, self.error)
+
+
+class ReadRouter:
+    """Salt okunur sorguları gecikmesi kabul edilebilir replikalara dağıtır
+
+    Gecikme arka planda READ_LAG_CHECK_INTERVAL aralıklarla ölçülür; kullanılabilir
+    replika yoksa okumalar primary'ye gider.
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url, i) for i, url in enumerate(urls, start=1)]
+        self._next = itertools.count()
+        self._stop = threading.Event()
+        for replica in self.replicas:
+            replica.check()
+        threading.Thread(target=self._monitor, name="db-replica-monitor", daemon=True).start()
+
+    def _monitor(self):
+        while not self._stop.wait(settings.READ_LAG_CHECK_INTERVAL):
+            for replica in self.replicas:
+                replica.check()
+
+    def pick(self) -> Optional[Replica]:
+        """Kullanılabilir replikalar arasında sırayla seçer"""
+        usable = [r for r in self.replicas if r.usable]
+        if not usable:
+            return None
+        return usable[next(self._next) % len(usable)]
+
+    def status(self) -> List[dict]:
+        return [{"name": r.name, "usable": r.usable, "lag": r.lag, "error": r.error} for r in self.replicas]
+
+    def close(self):
+        self._stop.set()
+        for replica in self.replicas:
+            if replica.pool is not None:
+                replica.pool.close()
+
+
+_read_router = None
+
+def get_read_router() -> Optional[ReadRouter]:
+    """DATABASE_READ_URL tanımlıysa süreç başına replika yönlendiricisi"""
+    global _read_router
+    if _read_router is None and settings.DATABASE_READ_URL.strip():
+        with _pool_lock:
+            if _read_router is None:
+                _read_router = ReadRouter(settings.DATABASE_READ_URL.split())
+    return _read_router
+
+def begin_request(sticky: bool):
+    """İstek başında çağrılır; sticky: istemci kısa süre önce yazma yaptı, okumalar primary'den"""
+    return _route_state.set({"primary": sticky, "wrote": False})
+
+def end_request(token) -> bool:
+    """İstek sonunda çağrılır; istek yazma yaptıysa True"""
+    state = _route_state.get()
+    _route_state.reset(token)
+    return bool(state and state["wrote"])
+
+def mark_write():
+    state = _route_state.get()
+    if state is not None:
+        state["wrote"] = True
+
+@contextmanager
+def prefer_primary(enabled: bool = True):
+    """Bu blokta okumalar primary'ye gider (ör. paylaşılan önbellek yeni bir yazmadan hemen sonra doluyorsa)"""
+    state = _route_state.get()
+    if not enabled:
+        yield
+        return
+    if state is None:
+        token = _route_state.set({"primary": True, "wrote": False})
+        try:
+            yield
+        finally:
+            _route_state.reset(token)
+        return
+    previous = state["primary"]
+    state["primary"] = True
+    try:
+        yield
+    finally:
+        state["primary"] = previous
+
+def _read_replica() -> Optional[Replica]:
+    state = _route_state.get()
+    if state is not None and state["primary"]:
+        return None
+    router = get_read_router()
+    return router.pick() if router is not None else None
+
+@contextmanager
+def read_conn():
+    """Salt okunur sorgular için havuz bağlantısı: uygun replika varsa ondan, yoksa primary'den
+
+    Replikanın bağlantısı sorgu sırasında koparsa replika rotasyondan çıkarılır ve
+    ReplicaError fırlatılır; çağıran sorguyu bir kez primary'de tekrarlar.
+    """
+    replica = _read_replica()
+    if replica is not None:
+        try:
+            conn = replica.pool.getconn(timeout=settings.DB_POOL_TIMEOUT)
+        except Exception as e:
+            # Replika erişilemez: bir sonraki ölçüme kadar rotasyondan çıkar, primary'ye düş
+            replica.error = str(e)[:200]
+            logger.warning("Read %s unavailable, falling back to primary: %s", replica.name, e)
+        else:
+            try:
+                with conn.transaction():
+                    yield conn
+            except psycopg.OperationalError as e:
+                # Sadece bağlantı hataları (ör. statement_timeout replikayı düşürmez)
+                if not conn.broken:
+                    raise
+                replica.error = str(e)[:200]
+                logger.warning("Read %s failed mid-query, out of rotation: %s", replica.name, e)
+                raise ReplicaError(str(e)) from e
+            finally:
+                replica.pool.putconn(conn)
+            return
+    with get_pool().connection(timeout=settings.DB_POOL_TIMEOUT) as conn:
+        yield conn
+
+def get_read_conn():
+    """Kısa ömürlü tekil okuma bağlantısı (warm-up gibi uzun taramalar); replika yoksa primary"""
+    replica = _read_replica()
+    if replica is not None:
+        try:
+            conn = psycopg.connect(replica.url, row_factory=dict_row)
+            _configure(conn)
+            return conn
+        except Exception as e:
+            logger.warning("Read %s unavailable, falling back to primary: %s", replica.name, e)
+    return get_conn()
+
+
 def init_db():
     from os.path import dirname, join
     path = join(dirname(__file__), "schema.sql")
@@ -44,8 +288,50 @@ def init_db():
         with conn.cursor() as cur:
             cur.execute("SHOW TIMEZONE")
             result = cur.fetchone()
-            print(f"PostgreSQL Timezone: {result}")
+            logger.info("PostgreSQL Timezone: %s", result)
         
             cur.execute("SELECT NOW() as current_time")
             time_result = cur.fetchone()
-            print(f"PostgreSQL Current Time: {time_result['current_time']}")
\ No newline at end of file
+            logger.info("PostgreSQL Current Time: %s", time_result['current_time'])
+
+
+@contextmanager
+def leader_lock(name: str, boot_id: str = ""):
+    """Startup görevleri için advisory lock ile lider seçimi.
+
+    Kilidi ilk alan worker lider olur (True). Diğerleri lider bitirene kadar bekler
+    ve False alır; böylece şema hazır olmadan istek kabul edilmez.
+
+    boot_id verilirse (launcher tüm worker'lara aynı değeri verir) başarılı bitiş
+    startup_runs tablosuna yazılır. Aynı açılışta sonradan yeniden doğan bir worker
+    (çökme, max_requests) kilidi boşta bulsa da lider olmaz: canlı trafik altında
+    init_db() (trigger'lar ACCESS EXCLUSIVE alır) ve ısınma tekrar çalışmaz.
+    """
+    key = int.from_bytes(hashlib.sha1(name.encode("utf-8")).digest()[:8], "big", signed=True)
+    conn = psycopg.connect(settings.DATABASE_URL, autocommit=True)
+    try:
+        is_leader = conn.execute("SELECT pg_try_advisory_lock(%s)", (key,)).fetchone()[0]
+        if not is_leader:
+            conn.execute("SELECT pg_advisory_lock(%s)", (key,))
+        elif boot_id and _startup_done(conn, name, boot_id):
+            is_leader = False
+        yield is_leader
+        if is_leader and boot_id:
+            conn.execute(
+                "INSERT INTO startup_runs (name, boot_id) VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                (name, boot_id),
+            )
+            conn.execute("DELETE FROM startup_runs WHERE finished_at < NOW() - INTERVAL '30 days'")
+    finally:
+        # Session kapanınca kilit bırakılır
+        conn.close()
+
+
+def _startup_done(conn, name: str, boot_id: str) -> bool:
+    # İlk kurulumda tablo henüz yok: init_db() onu oluşturacak
+    if conn.execute("SELECT to_regclass('startup_runs') IS NOT NULL").fetchone()[0] is not True:
+        return False
+    row = conn.execute(
+        "SELECT 1 FROM startup_runs WHERE name = %s AND boot_id = %s", (name, boot_id)
+    ).fetchone()
+    return row is not None
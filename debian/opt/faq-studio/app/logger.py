@@ -1,20 +1,180 @@
+import atexit
+import contextvars
+import copy
+import datetime
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+import zlib
 
-def setup_logger():
+from app.config import settings
+
+# Middleware her istek için set eder; log kayıtlarına otomatik eklenir
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+
+class RequestContextFilter(logging.Filter):
+    """Kayda request_id ekler (kuyruğa girmeden, isteğin kendi context'inde)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Logger başına DEBUG kayıtlarının yalnızca bir kısmını geçirir
+
+    Aynı isteğe ait kayıtlar (REQ/RES) birlikte tutulsun diye karar request_id
+    hash'ine göre verilir. INFO ve üstü her zaman geçer.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def _rate(self, name: str):
+        # En uzun eşleşen logger adı (faqstudio.access > faqstudio)
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id == "-":
+            return random.random() < rate
+        return zlib.crc32(request_id.encode("utf-8")) / 0xFFFFFFFF < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Her kaydı tek satırlık JSON olarak yazar"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Kuyruk doluysa beklemez, kaydı atar ve sayar
+
+    Kuyrukta yer açılınca atılan kayıt sayısı bir WARNING kaydıyla bildirilir;
+    toplam /health'te görünür.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Varsayılan prepare kaydı kopyalayıp formatlar; burada sadece mesajı birleştir,
+        # formatlama listener thread'inde yapılır. Kopya: diğer handler/filtreler
+        # orijinal kaydı değişmemiş görür
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # Handler kilidi altında çağrılır: sayaçlar thread-safe
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            return
+        if self._unreported:
+            self._report_dropped(record.name)
+
+    def _report_dropped(self, name: str):
+        record = logging.LogRecord(
+            name, logging.WARNING, __file__, 0,
+            f"Log queue full: {self._unreported} records dropped (LOG_QUEUE_SIZE={settings.LOG_QUEUE_SIZE})",
+            None, None,
+        )
+        record.request_id = "-"
+        try:
+            self.queue.put_nowait(record)
+            self._unreported = 0
+        except queue.Full:
+            pass
+
+    def stats(self) -> dict:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
+
+_listener = None
+_queue_handler = None
+
+
+def setup_logger(stream=None):
+    """Kayıtlar istek thread'inde kuyruğa atılır, stdout'a yazma QueueListener thread'inde yapılır"""
+    global _listener, _queue_handler
     logger = logging.getLogger("faqstudio")
-    logger.setLevel(logging.INFO)
+    logger.setLevel(settings.get_log_level_int())
+    logger.propagate = False
 
     # double-handler yaratmamak için önce temizle
     if logger.hasHandlers():
         logger.handlers.clear()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    if settings.LOG_JSON:
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(settings.LOG_FORMAT))
 
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        "%(asctime)s %(levelname)s %(name)s :: %(message)s"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    if settings.LOG_SAMPLE_RATES:
+        queue_handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATES))
+    logger.addHandler(queue_handler)
+    _queue_handler = queue_handler
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+
+def log_stats() -> dict:
+    """Log kuyruğu doluluğu ve atılan kayıt sayısı (/health)"""
+    return _queue_handler.stats() if _queue_handler is not None else {}
+
+
+@atexit.register
+def _flush_logs():
+    """Çıkışta kuyrukta kalan kayıtları yaz"""
+    if _listener is not None:
+        _listener.stop()
+
+
+logger = setup_logger()
+access_logger = logging.getLogger("faqstudio.access")
@@ -1,22 +1,32 @@
 ﻿import os
-import pathlib
 import uuid
 import time
 import asyncio
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
 # Local imports
-from .db import init_db, get_conn
+from .db import init_db, leader_lock, close_pool, get_read_conn, get_read_router, begin_request, end_request
 from .utils.json_io import ensure_json_file
-from .utils.categories import ensure_categories_file, load_categories
-from .routes import questions, stats
-from .logger import logger
+from .utils.categories import ensure_categories_file, load_categories, add_category_if_new, categories_version
+from .utils.templating import templates
+from .utils.http_cache import cached_response
+from .routes import questions, stats, export, admin, assets, events, categories
+from .logger import logger, access_logger, request_id_var, log_stats
 from .config import settings
 from .utils.chroma_service import chroma_service
-from .utils.embeddings import embed
+from .utils.embeddings import embed, embedding_service, vector_to_numpy
+from .utils.ollama_client import ollama_client, OllamaUnavailableError
+from .utils.admission import embed_gate, AdmissionRejected, DeadlineExceeded
+from .utils.reembed import reembedder
+from .utils.suggest_index import suggest_index
+from .utils.live_events import live_events
+from .utils.idempotency import single_flight, idempotency_store
+from .utils.profiling import SamplingProfiler, profile_store, loop_monitor
+from .routes.admin import admin_token_valid
 
 # Docker Compose ile çalıştırma:
 # docker compose build api
@@ -35,9 +45,20 @@ from .utils.embeddings import embed
 # FastAPI app initialization
 app = FastAPI(title="FAQ Studio")
 
-# Template setup
-TPL_DIR = pathlib.Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=str(TPL_DIR))
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    """SSE akışları sıkıştırılmaz: gzip küçük olayları tamponlar ve istemciye geç ulaştırır"""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in NO_GZIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+NO_GZIP_PATHS = {"/events"}
+
+# Büyük liste yanıtlarını sıkıştır (uzun answer metinleri iyi sıkışır)
+app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=settings.GZIP_LEVEL)
 
 
 @app.middleware("http")
@@ -54,27 +75,75 @@ async def log_requests(request: Request, call_next):
     # Request state'e ekle (diğer fonksiyonlarda kullanmak için)
     request.state.request_id = request_id
     request.state.client_ip = client_ip
+    # Log kayıtları request_id'yi context'ten alır
+    token = request_id_var.set(request_id)
     
-    logger.debug(
+    access_logger.debug(
         "REQ [%s] %s %s from %s UA=%s",
         request_id, request.method, request.url.path, client_ip, user_agent
     )
     
     # Latency measurement
     start_time = time.time()
-    response = await call_next(request)
-    process_time = (time.time() - start_time) * 1000  # milliseconds
-    
-    logger.debug(
-        "RES [%s] Status: %s Latency: %.2fms",
-        request_id, response.status_code, process_time
-    )
+    try:
+        response = await call_next(request)
+        process_time = (time.time() - start_time) * 1000  # milliseconds
+        
+        access_logger.debug(
+            "RES [%s] Status: %s Latency: %.2fms",
+            request_id, response.status_code, process_time
+        )
+        return response
+    finally:
+        request_id_var.reset(token)
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """X-Profile: 1 + geçerli X-Admin-Token: istek süresince örnekleme yapar, sonucu saklar"""
+    if not request.headers.get("x-profile") or not admin_token_valid(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    profiler = SamplingProfiler(interval=0.001).start()
+    try:
+        response = await call_next(request)
+    finally:
+        profile = profiler.stop()
+    request_id = getattr(request.state, "request_id", None) or str(uuid.uuid4())[:8]
+    profile_store.save_request(request_id, request.method, request.url.path, profile)
+    response.headers["X-Profile-Id"] = request_id
     return response
 
 
+STICKY_COOKIE = "faq_primary_until"
+
+
+@app.middleware("http")
+async def route_reads(request: Request, call_next):
+    """Read-your-writes: yazma yapan istemcinin okumaları READ_STICKY_SECONDS boyunca primary'den"""
+    try:
+        sticky = float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        sticky = False
+    token = begin_request(sticky)
+    try:
+        response = await call_next(request)
+    finally:
+        wrote = end_request(token)
+    if wrote and get_read_router() is not None:
+        window = settings.READ_STICKY_SECONDS
+        response.set_cookie(STICKY_COOKIE, f"{time.time() + window:.3f}", max_age=max(int(window), 1),
+                            httponly=True, samesite="lax")
+    return response
+
+
+WARMUP_BATCH_SIZE = 500
+
 _chroma_loaded = False
 async def load_existing_questions_to_chroma():
-    """Mevcut soruları ChromaDB'ye yükler (sadece bir kez)"""
+    """Index'te olmayan soruları ChromaDB'ye yükler (sadece bir kez)
+
+    Embedding'ler Postgres'teki kolondan okunur; Ollama'ya istek atılmaz.
+    """
     global _chroma_loaded
     
     if _chroma_loaded:
@@ -82,24 +151,27 @@ async def load_existing_questions_to_chroma():
         return
         
     try:
-        with get_conn() as conn, conn.cursor() as cur:
-            cur.execute("SELECT id, question, answer, keywords, category FROM questions")
-            rows = cur.fetchall()
+        existing = chroma_service.get_ids()
+        total = added = 0
+        # Tam tablo taraması: replika varsa primary'yi meşgul etmesin
+        with get_read_conn() as conn, conn.cursor(name="chroma_warmup") as cur:
+            cur.itersize = WARMUP_BATCH_SIZE
+            cur.execute("SELECT id, question, answer, keywords, category, embedding FROM questions ORDER BY id")
+            batch = []
+            for row in cur:
+                total += 1
+                if str(row["id"]) in existing:
+                    continue
+                row["embedding"] = vector_to_numpy(row["embedding"]).tolist()
+                batch.append(row)
+                if len(batch) >= WARMUP_BATCH_SIZE:
+                    added += chroma_service.add_questions_batch(batch)
+                    batch = []
+                    await asyncio.sleep(0)
+            added += chroma_service.add_questions_batch(batch)
             
-            for row in rows:
-                try:
-                    embedding = embed(row["question"])
-                    chroma_service.add_question(
-                        row["id"], row["question"], row["answer"], 
-                        row["keywords"], row["category"], embedding.tolist()
-                    )
-                    # Küçük bir bekleme süresi ekleyerek Ollama'ya aşırı yük binmesini önle
-                    await asyncio.sleep(0.05)  # 0.1'den 0.05'e düşürdüm
-                except Exception as e:
-                    logger.error("Error loading question %s to ChromaDB: %s", row["id"], e)
-            
-            _chroma_loaded = True
-            logger.info("Loaded %s questions to ChromaDB", len(rows))
+        _chroma_loaded = True
+        logger.info("ChromaDB warm-up: %s questions in DB, %s added to index", total, added)
     except Exception as e:
         logger.error("Error loading questions to ChromaDB: %s", e)
 
@@ -107,46 +179,138 @@ async def load_existing_questions_to_chroma():
 @app.on_event("startup")
 async def startup():
     """Uygulama başlatma işlemleri"""
-    logger.info("Application starting…")
-    ensure_json_file()
-    ensure_categories_file()
-    init_db()
-    
-    # Kategori dosyası boşsa default kategorileri ekle
-    await ensure_default_categories()
+    logger.info("Application starting… pid=%s vector_mode=%s", os.getpid(), settings.VECTOR_MODE)
     
+    # Event loop'u bloklayan senkron çağrıları logla
+    if settings.LOOP_LAG_THRESHOLD_MS > 0:
+        loop_monitor.start()
+
+    # Replika gecikme ölçümünü başlat (DATABASE_READ_URL tanımlıysa)
+    get_read_router()
+
     # ChromaDB'yi başlat ve embedding fonksiyonunu ayarla
     chroma_service.initialize_embeddings(embed)
     
-    # Mevcut soruları ChromaDB'ye yükle
-    await load_existing_questions_to_chroma()
+    # Çok worker'lı modda startup görevlerini sadece lider worker çalıştırır (açılış başına bir kez)
+    with leader_lock("faq-studio:startup", settings.BOOT_ID) as is_leader:
+        if not is_leader:
+            logger.info("Startup tasks handled by another worker, skipping boot_id=%s", settings.BOOT_ID or "-")
+        else:
+            ensure_json_file()
+            ensure_categories_file()
+            init_db()
+            # Chroma yüklemesi aktif modelle embed etsin
+            await run_in_threadpool(embedding_service.refresh_model)
+            
+            # Kategori dosyası boşsa default kategorileri ekle
+            await ensure_default_categories()
+            
+            # Mevcut soruları ChromaDB'ye yükle
+            await load_existing_questions_to_chroma()
+            # Kategori filtreli aramalar için bölümleri eksikse doldur
+            chroma_service.start_partition_backfill()
+            # CHROMA_SLIM değiştiyse koleksiyonu arka planda yeni düzene taşı
+            if chroma_service.start_layout_migration():
+                logger.info("ChromaDB layout migration started in background")
+            # EMBED_MODEL değiştiyse (veya yarım kalmış iş varsa) arka planda yeniden embed et
+            await reembedder.resume_or_start()
+
+    # Yazarken öneri index'i worker başına bellekte: dinleyici bağlanınca kurulur,
+    # diğer worker'ların yazmaları olaylardan artımlı uygulanır
+    live_events.add_handler(suggest_index.on_event)
+    # Aktif embedding modeli bellekte: istek yolunda sorgu yok, cutover olayıyla tazelenir
+    await run_in_threadpool(embedding_service.refresh_model)
+    live_events.add_handler(embedding_service.on_event)
+    # Canlı olaylar: her worker LISTEN ile tüm worker'ların yazmalarını alır
+    live_events.start(asyncio.get_running_loop())
     
     logger.info("DB init ok; OLLAMA_BASE_URL=%s EMBED_MODEL=%s", settings.OLLAMA_BASE_URL, settings.EMBED_MODEL)
 
 
+@app.on_event("shutdown")
+def shutdown():
+    """Havuzdaki veritabanı bağlantılarını kapatır"""
+    loop_monitor.stop()
+    live_events.stop()
+    close_pool()
+
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
     """Ana sayfa"""
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request, 
-            "categories": load_categories(), 
-            "th_default": settings.SIM_THRESHOLD
-        }
-    )
+    def build() -> bytes:
+        html = templates.env.get_template("index.html").render(
+            categories=load_categories(),
+            th_default=settings.SIM_THRESHOLD,
+        )
+        return html.encode("utf-8")
+
+    # Yazmalarda ve kategori dosyası değişince yeniden render edilir
+    return cached_response(request, f"page:index:{categories_version()}", build, "text/html; charset=utf-8")
 
 
 # Route'ları include et
 app.include_router(questions.router)
 app.include_router(stats.router)
+app.include_router(export.router)
+app.include_router(admin.router)
+app.include_router(assets.router)
+app.include_router(events.router)
+app.include_router(categories.router)
 
 
 # Health check endpoint
 @app.get("/health")
 def health_check():
     """Sağlık kontrolü endpoint'i"""
-    return {"status": "healthy", "service": "FAQ Studio"}
+    ollama = ollama_client.health()
+    status = "healthy" if ollama["ok"] else "degraded"
+    result = {"status": status, "service": "FAQ Studio", "ollama": ollama, "admission": embed_gate.stats(),
+              "suggest_index": suggest_index.stats(), "live_events": live_events.stats(),
+              "coalescing": {**single_flight.stats(), **idempotency_store.stats()}, "logging": log_stats()}
+    if (router := get_read_router()) is not None:
+        result["read_replicas"] = router.status()
+    return result
+
+
+# Embedding kuyruğu doluyken yükü at
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Lane kuyruğu dolu/bekleme süresi aşıldı: 503 + Retry-After"""
+    from fastapi.responses import JSONResponse
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Sunucu yoğun, lütfen tekrar deneyin", "lane": exc.lane},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """İstemcinin zaman bütçesi bitti: iş bırakıldı"""
+    logger.info(
+        "Deadline exceeded req_id=%s path=%s: %s",
+        getattr(request.state, 'request_id', 'unknown'), request.url.path, exc
+    )
+    from fastapi.responses import JSONResponse
+    return JSONResponse(status_code=504, content={"detail": "İstek zaman aşımına uğradı"})
+
+
+# Ollama devre dışıyken hızlıca 503 döndür
+@app.exception_handler(OllamaUnavailableError)
+async def ollama_unavailable_handler(request: Request, exc: OllamaUnavailableError):
+    """Circuit açıkken embedding isteyen endpoint'ler için 503"""
+    logger.warning(
+        "Ollama unavailable req_id=%s path=%s",
+        getattr(request.state, 'request_id', 'unknown'),
+        request.url.path
+    )
+    from fastapi.responses import JSONResponse
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Embedding servisi geçici olarak kullanılamıyor"},
+        headers={"Retry-After": str(int(settings.OLLAMA_CIRCUIT_RESET))}
+    )
 
 
 # Global exception handler
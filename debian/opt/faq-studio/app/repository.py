@@ -0,0 +1,449 @@
+"""İstek yolundaki tüm SQL sorguları.
+
+Sorgular adlarıyla burada tanımlıdır; route'lar SQL yazmaz. Havuzdaki bağlantılar
+uzun ömürlü olduğundan her sorgu bağlantı başına bir kez sunucuda hazırlanır
+(prepared statement) ve sonraki çalıştırmalarda parse/plan maliyeti ödenmez.
+Birden fazla ifade gönderen işlemler pipeline modunda tek gidiş-dönüşte çalışır.
+Salt okunur sorgular (read=True) DATABASE_READ_URL replikalarına gidebilir.
+Her sorgu için çağrı sayısı ve süre sayaçları tutulur (GET /admin/queries).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from psycopg.errors import UniqueViolation
+from app.db import pooled_conn, read_conn, mark_write, ReplicaError
+from app.config import settings
+from app.logger import logger
+
+QUESTION_COLUMNS = "id, question, answer, keywords, category, created_at, created_by"
+
+# Canlı olay yazmayla aynı ifadede gönderilir: NOTIFY commit'te teslim edilir, rollback'te
+# hiç gitmez. question_stats alt sorgusu ifade öncesi görüntüyü okuduğu için toplam
+# yazmanın farkıyla düzeltilir.
+STATS_TOTAL = "(SELECT COALESCE(SUM(cnt), 0)::bigint FROM question_stats)"
+
+
+def _notify(fields: str, total_delta: str = "") -> str:
+    """%(channel)s kanalına %(event)s (sabit alanlar) + sorgudan gelen alanlar + yeni toplam"""
+    return (
+        f"pg_notify(%(channel)s, (%(event)s::jsonb || jsonb_build_object({fields}, "
+        f"'total', {STATS_TOTAL}{total_delta}))::text) AS notified"
+    )
+
+
+# Tekil güncellemelerde kategori farkı: kategori değiştiyse eskisi -1, yenisi +1
+_UPDATE_EVENT = (
+    "'id', w.id, 'category', w.category, 'delta', CASE WHEN w.old_category IS DISTINCT FROM w.category "
+    "THEN jsonb_build_object(w.old_category, -1, w.category, 1) ELSE '{}'::jsonb END"
+)
+# Toplu taşımalarda id listesi yerine sayı ve kategori farkı (NOTIFY 8000 byte sınırı)
+_BULK_EVENT = (
+    "'count', COUNT(*), 'delta', (SELECT jsonb_object_agg(old_category, -cnt) FROM "
+    "(SELECT old_category, COUNT(*) AS cnt FROM moved GROUP BY old_category) d) "
+    "|| jsonb_build_object(%(target)s::text, COUNT(*))"
+)
+
+QUERIES: Dict[str, str] = {
+    # questions
+    # Yazma sorguları canlı olayı da gönderir (bkz. _notify)
+    "question.insert": (
+        "WITH w AS (INSERT INTO questions (question, answer, keywords, category, embedding, embed_model, created_by) "
+        "VALUES (%(question)s, %(answer)s, %(keywords)s, %(category)s, %(vec)s::vector, %(model)s, %(created_by)s) "
+        "RETURNING id, category) "
+        "SELECT w.id, " + _notify("'id', w.id, 'category', w.category, 'delta', jsonb_build_object(w.category, 1)",
+                                  " + 1") + " FROM w"
+    ),
+    # Eski kategori Chroma bölümü ve canlı olayın kategori farkı için döndürülür
+    "question.update": (
+        "WITH w AS (UPDATE questions q SET question = %(question)s, answer = %(answer)s, keywords = %(keywords)s, "
+        "category = %(category)s, embedding = %(vec)s::vector, embed_model = %(model)s, updated_at = NOW() "
+        "FROM (SELECT id, category FROM questions WHERE id = %(id)s FOR UPDATE) old "
+        "WHERE q.id = old.id RETURNING q.id, q.category, old.category AS old_category) "
+        "SELECT w.old_category, " + _notify(_UPDATE_EVENT) + " FROM w"
+    ),
+    # Kısmi güncelleme: NULL verilen alanlar (ve embedding) olduğu gibi kalır
+    "question.patch": (
+        "WITH w AS (UPDATE questions q SET question = COALESCE(%(question)s, q.question), "
+        "answer = COALESCE(%(answer)s, q.answer), keywords = COALESCE(%(keywords)s, q.keywords), "
+        "category = COALESCE(%(category)s, q.category), embedding = COALESCE(%(vec)s::vector, q.embedding), "
+        "embed_model = COALESCE(%(model)s, q.embed_model), updated_at = NOW() "
+        "FROM (SELECT id, category FROM questions WHERE id = %(id)s FOR UPDATE) old "
+        "WHERE q.id = old.id RETURNING q.id, q.category, old.category AS old_category) "
+        "SELECT w.old_category, " + _notify(_UPDATE_EVENT) + " FROM w"
+    ),
+    # Toplu kategori işlemleri: tek set-based UPDATE, eski kategori bölüm için döner.
+    # Olay CTE'si (volatile, bir kez çalışır) satırlara bağlanır ki atlanmasın; taşınan yoksa gönderilmez
+    "category.move": (
+        "WITH moved AS (UPDATE questions q SET category = %(target)s, updated_at = NOW() "
+        "FROM (SELECT id, category FROM questions WHERE category = ANY(%(sources)s) "
+        "AND category <> %(target)s FOR UPDATE) old "
+        "WHERE q.id = old.id RETURNING q.id, old.category AS old_category), "
+        "n AS (SELECT " + _notify(_BULK_EVENT) + " FROM moved HAVING COUNT(*) > 0) "
+        "SELECT m.id, m.old_category FROM moved m CROSS JOIN n"
+    ),
+    "category.reassign": (
+        "WITH moved AS (UPDATE questions q SET category = %(target)s, updated_at = NOW() "
+        "FROM (SELECT id, category FROM questions WHERE id = ANY(%(ids)s) "
+        "AND category <> %(target)s FOR UPDATE) old "
+        "WHERE q.id = old.id RETURNING q.id, old.category AS old_category), "
+        "n AS (SELECT " + _notify(_BULK_EVENT) + " FROM moved HAVING COUNT(*) > 0) "
+        "SELECT m.id, m.old_category FROM moved m CROSS JOIN n"
+    ),
+    # Sadece bu transaction için: questions_centroids_update trigger'ı satır başına çalışmaz
+    "centroids.defer": "SELECT set_config('faq.centroids_deferred', 'on', true)",
+    # Verilen kategorilerin merkezlerini tek GROUP BY ile baştan hesaplar; boşalanlar silinir
+    "centroids.recompute": (
+        "WITH agg AS (SELECT category, SUM(embedding) AS vec_sum, COUNT(*) AS cnt FROM questions "
+        "WHERE category = ANY(%(categories)s) GROUP BY category), "
+        "gone AS (DELETE FROM category_centroids c WHERE c.category = ANY(%(categories)s) "
+        "AND NOT EXISTS (SELECT 1 FROM agg WHERE agg.category = c.category)) "
+        "INSERT INTO category_centroids (category, vec_sum, cnt) SELECT category, vec_sum, cnt FROM agg "
+        "ON CONFLICT (category) DO UPDATE SET vec_sum = EXCLUDED.vec_sum, cnt = EXCLUDED.cnt"
+    ),
+    "category.count": "SELECT COUNT(*)::bigint AS cnt FROM questions WHERE category = %s",
+    # uq_questions_text index'iyle aynı ifade: index kullanılır
+    "question.find_text": "SELECT id FROM questions WHERE lower(trim(question)) = lower(trim(%s))",
+    "question.delete": (
+        "WITH w AS (DELETE FROM questions WHERE id = %(id)s RETURNING id, category) "
+        "SELECT w.id, w.category, " + _notify(
+            "'id', w.id, 'category', w.category, 'delta', jsonb_build_object(w.category, -1)", " - 1"
+        ) + " FROM w"
+    ),
+    "question.get": f"SELECT {QUESTION_COLUMNS} FROM questions WHERE id = %s",
+    "question.list": f"SELECT {QUESTION_COLUMNS} FROM questions ORDER BY id DESC LIMIT %s OFFSET %s",
+    "question.search": (
+        f"SELECT {QUESTION_COLUMNS} FROM questions "
+        "WHERE question ILIKE %(p)s OR answer ILIKE %(p)s OR keywords ILIKE %(p)s OR category ILIKE %(p)s "
+        "ORDER BY id DESC LIMIT %(limit)s OFFSET %(offset)s"
+    ),
+    "question.table": "SELECT id, question, category, created_at FROM questions ORDER BY id DESC LIMIT %s",
+    "question.hydrate": "SELECT id, question, answer, keywords, category FROM questions WHERE id = ANY(%s)",
+    # embedding
+    "embedding.active_model": "SELECT active_model FROM embedding_state",
+    "reembed.store_vector": "UPDATE questions SET embedding_next = %s::vector WHERE id = %s AND question = %s",
+    "reembed.checkpoint": (
+        "UPDATE reembed_jobs SET done = done + %s, last_id = %s, rate = %s, updated_at = NOW() WHERE id = %s"
+    ),
+    # idempotency (süresi dolmuş anahtar yeniden alınabilir)
+    "idempotency.claim": (
+        "INSERT INTO idempotency_keys (key, fingerprint) VALUES (%(key)s, %(fingerprint)s) "
+        "ON CONFLICT (key) DO UPDATE SET fingerprint = EXCLUDED.fingerprint, status = NULL, "
+        "response = NULL, created_at = NOW() "
+        "WHERE idempotency_keys.created_at < NOW() - make_interval(secs => %(ttl)s) RETURNING key"
+    ),
+    "idempotency.get": "SELECT fingerprint, status, response FROM idempotency_keys WHERE key = %s",
+    "idempotency.complete": "UPDATE idempotency_keys SET status = %s, response = %s::jsonb WHERE key = %s",
+    "idempotency.release": "DELETE FROM idempotency_keys WHERE key = %s AND status IS NULL",
+    "idempotency.purge": "DELETE FROM idempotency_keys WHERE created_at < NOW() - make_interval(secs => %s)",
+    # Yazmaya bağlı olmayan canlı olaylar (ör. model değişimi): yeni toplam aynı gidiş-dönüşte eklenir
+    "events.publish": (
+        "SELECT pg_notify(%s, (%s::jsonb || jsonb_build_object('total', "
+        "(SELECT COALESCE(SUM(cnt), 0)::bigint FROM question_stats)))::text)"
+    ),
+    # stats (question_stats sayaçları, trigger'lar günceller)
+    "stats.categories": (
+        "SELECT category, SUM(cnt)::bigint AS cnt FROM question_stats "
+        "GROUP BY category HAVING SUM(cnt) > 0 ORDER BY cnt DESC, category"
+    ),
+    "stats.total": "SELECT COALESCE(SUM(cnt), 0)::bigint AS total FROM question_stats",
+    "stats.recent": (
+        "SELECT COALESCE(SUM(cnt), 0)::bigint AS recent_count FROM question_stats "
+        "WHERE day >= (NOW() - make_interval(days => %s))::date"
+    ),
+    "stats.by_date": (
+        "SELECT day AS date, SUM(cnt)::bigint AS count FROM question_stats "
+        "WHERE day >= (NOW() - make_interval(days => %s))::date "
+        "GROUP BY day ORDER BY day DESC"
+    ),
+    "stats.summary": """
+        WITH per_cat AS (
+            SELECT category, SUM(cnt)::bigint AS cnt
+            FROM question_stats
+            GROUP BY category
+            HAVING SUM(cnt) > 0
+        ), per_day AS (
+            SELECT day, SUM(cnt)::bigint AS cnt
+            FROM question_stats
+            WHERE day >= (NOW() - make_interval(days => %(limit)s))::date
+            GROUP BY day
+        )
+        SELECT
+            (SELECT COALESCE(SUM(cnt), 0)::bigint FROM per_cat) AS total,
+            (SELECT COALESCE(json_agg(json_build_object('category', category, 'cnt', cnt)
+                                      ORDER BY cnt DESC, category), '[]'::json)
+             FROM per_cat) AS categories,
+            (SELECT COALESCE(SUM(cnt), 0)::bigint
+             FROM question_stats
+             WHERE day >= (NOW() - make_interval(days => %(days)s))::date) AS recent_count,
+            (SELECT COALESCE(json_agg(json_build_object('date', day, 'count', cnt)
+                                      ORDER BY day DESC), '[]'::json)
+             FROM per_day) AS by_date
+    """,
+}
+
+
+class QueryTimings:
+    """Sorgu adı başına çağrı sayısı, toplam/en uzun süre ve hata sayısı"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, List[float]] = {}
+
+    def record(self, name: str, seconds: float, failed: bool = False):
+        with self._lock:
+            stat = self._stats.setdefault(name, [0, 0.0, 0.0, 0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] = max(stat[2], seconds)
+            stat[3] += failed
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {
+                    "calls": int(calls),
+                    "errors": int(errors),
+                    "total_ms": round(total * 1000, 3),
+                    "avg_ms": round(total * 1000 / calls, 3) if calls else 0.0,
+                    "max_ms": round(worst * 1000, 3),
+                }
+                for name, (calls, total, worst, errors) in sorted(self._stats.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class DuplicateQuestion(Exception):
+    """Güncellenen soru metni başka bir soruyla aynı (uq_questions_text)"""
+
+
+class Repository:
+    """Adlandırılmış sorguları havuzdaki bağlantılarda prepared statement olarak çalıştırır"""
+
+    def __init__(self, queries: Dict[str, str]):
+        self.queries = queries
+        self.timings = QueryTimings()
+        # False: hiç hazırlama (transaction modunda PgBouncer prepared statement taşımaz)
+        self._prepare = True if settings.DB_PREPARE else False
+
+    @contextmanager
+    def _timed(self, name: str):
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings.record(name, elapsed, failed)
+            if elapsed > settings.DB_SLOW_QUERY_MS / 1000:
+                logger.warning("Slow query %s took %.1fms", name, elapsed * 1000)
+
+    def _execute(self, cur, name: str, params: Optional[Sequence] = None):
+        cur.execute(self.queries[name], params, prepare=self._prepare)
+
+    def _conn(self, read: bool):
+        """read=True: salt okunur sorgu, replika varsa oradan okunabilir"""
+        return read_conn() if read else pooled_conn()
+
+    def _fetch(self, name: str, params: Optional[Sequence], read: bool, one: bool):
+        with self._timed(name):
+            try:
+                with self._conn(read) as conn, conn.cursor() as cur:
+                    self._execute(cur, name, params)
+                    return cur.fetchone() if one else cur.fetchall()
+            except ReplicaError:
+                pass
+            # Replika sorgu sırasında düştü (rotasyondan çıkarıldı): bir kez primary'de tekrarla
+            with pooled_conn() as conn, conn.cursor() as cur:
+                self._execute(cur, name, params)
+                return cur.fetchone() if one else cur.fetchall()
+
+    def fetch_one(self, name: str, params: Optional[Sequence] = None, read: bool = False) -> Optional[Dict[str, Any]]:
+        return self._fetch(name, params, read, one=True)
+
+    def fetch_all(self, name: str, params: Optional[Sequence] = None, read: bool = False) -> List[Dict[str, Any]]:
+        return self._fetch(name, params, read, one=False)
+
+    def execute(self, name: str, params: Optional[Sequence] = None) -> int:
+        """Sonuç döndürmeyen ifade; etkilenen satır sayısı"""
+        with self._timed(name), pooled_conn() as conn, conn.cursor() as cur:
+            self._execute(cur, name, params)
+            return cur.rowcount
+
+    def write_one(self, name: str, params: Optional[Sequence] = None) -> Optional[Dict[str, Any]]:
+        """Yazma sorgusu: istemcinin sonraki okumaları kısa süre primary'den yapılır"""
+        mark_write()
+        return self.fetch_one(name, params)
+
+    def pipeline(self, label: str, statements: Iterable[tuple]) -> None:
+        """(ad, parametreler) ifadelerini tek transaction'da, pipeline modunda tek gidiş-dönüşte çalıştırır
+
+        Parametre listesi verilen ifadeler (list of tuples) executemany ile gönderilir.
+        """
+        with self._timed(label), pooled_conn() as conn:
+            with conn.pipeline(), conn.cursor() as cur:
+                for name, params in statements:
+                    if isinstance(params, list):
+                        cur.executemany(self.queries[name], params)
+                    else:
+                        self._execute(cur, name, params)
+
+    # --- questions ---
+    # Yazma metotlarının notify'ı: live_events.notify() çıktısı (kanal + olayın sabit alanları)
+
+    def insert_question(self, question: str, answer: str, keywords: str, category: str,
+                        vec_str: str, model: str, created_by: str, *, notify: Dict[str, str]) -> Optional[int]:
+        """Yeni id; aynı metinde soru varsa (uq_questions_text) None"""
+        try:
+            row = self.write_one("question.insert", {
+                "question": question, "answer": answer, "keywords": keywords, "category": category,
+                "vec": vec_str, "model": model, "created_by": created_by, **notify,
+            })
+        except UniqueViolation:
+            return None
+        return row["id"]
+
+    def find_question_by_text(self, question: str) -> Optional[int]:
+        """Aynı metinli (büyük/küçük harf ve baş/son boşluk hariç) sorunun id'si, primary'den"""
+        row = self.fetch_one("question.find_text", (question,))
+        return row["id"] if row else None
+
+    def update_question(self, qid: int, question: str, answer: str, keywords: str, category: str,
+                        vec_str: str, model: str, *, notify: Dict[str, str]) -> Optional[str]:
+        """Sorunun önceki kategorisi; güncellenen satır yoksa None"""
+        try:
+            row = self.write_one("question.update", {
+                "id": qid, "question": question, "answer": answer, "keywords": keywords, "category": category,
+                "vec": vec_str, "model": model, **notify,
+            })
+        except UniqueViolation as e:
+            raise DuplicateQuestion(question) from e
+        return row["old_category"] if row else None
+
+    def patch_question(self, qid: int, changes: Dict[str, str], vec_str: Optional[str] = None,
+                       model: Optional[str] = None, *, notify: Dict[str, str]) -> Optional[str]:
+        """Sadece changes'teki alanları (ve verilirse embedding'i) yazar; önceki kategori, satır yoksa None"""
+        try:
+            row = self.write_one("question.patch", {
+                "id": qid,
+                "question": changes.get("question"),
+                "answer": changes.get("answer"),
+                "keywords": changes.get("keywords"),
+                "category": changes.get("category"),
+                "vec": vec_str,
+                "model": model,
+                **notify,
+            })
+        except UniqueViolation as e:
+            raise DuplicateQuestion(changes.get("question")) from e
+        return row["old_category"] if row else None
+
+    def delete_question(self, qid: int, *, notify: Dict[str, str]) -> Optional[str]:
+        """Silinen sorunun kategorisi; silinecek satır yoksa None"""
+        row = self.write_one("question.delete", {"id": qid, **notify})
+        return row["category"] if row else None
+
+    def get_question(self, qid: int, primary: bool = False) -> Optional[Dict[str, Any]]:
+        """primary=True: yazmadan önce karşılaştırma için replika gecikmesi olmadan okur"""
+        return self.fetch_one("question.get", (qid,), read=not primary)
+
+    def list_questions(self, limit: int, offset: int) -> List[Dict[str, Any]]:
+        return self.fetch_all("question.list", (limit, offset), read=True)
+
+    def search_questions(self, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        return self.fetch_all("question.search", {"p": f"%{query}%", "limit": limit, "offset": offset}, read=True)
+
+    def questions_table(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return self.fetch_all("question.table", (limit,), read=True)
+
+    def hydrate_questions(self, ids: List[int]) -> List[Dict[str, Any]]:
+        return self.fetch_all("question.hydrate", (ids,))
+
+    # --- categories ---
+
+    def _recategorize(self, name: str, params: Dict[str, Any], target: str) -> List[Dict[str, Any]]:
+        """Toplu kategori UPDATE'i: merkez trigger'ı satır başına çalışmaz, etkilenen
+        kategorilerin merkezleri aynı transaction'da tek sorguyla yeniden hesaplanır"""
+        mark_write()
+        with self._timed(name), pooled_conn() as conn, conn.cursor() as cur:
+            self._execute(cur, "centroids.defer")
+            self._execute(cur, name, params)
+            rows = cur.fetchall()
+            if rows:
+                categories = sorted({row["old_category"] for row in rows} | {target})
+                self._execute(cur, "centroids.recompute", {"categories": categories})
+        return rows
+
+    def move_category(self, sources: List[str], target: str, *, notify: Dict[str, str]) -> List[Dict[str, Any]]:
+        """sources kategorilerindeki tüm soruları target'a taşır; (id, old_category) satırları"""
+        return self._recategorize("category.move", {"sources": sources, "target": target, **notify}, target)
+
+    def reassign_questions(self, ids: List[int], target: str, *, notify: Dict[str, str]) -> List[Dict[str, Any]]:
+        return self._recategorize("category.reassign", {"ids": ids, "target": target, **notify}, target)
+
+    def category_count(self, category: str) -> int:
+        return self.fetch_one("category.count", (category,))["cnt"]
+
+    # --- embedding ---
+
+    def active_embed_model(self) -> Optional[str]:
+        row = self.fetch_one("embedding.active_model")
+        return row["active_model"] if row else None
+
+    def store_reembed_batch(self, job_id: int, updates: List[tuple], last_id: int, rate: float):
+        """Gölge vektörleri ve checkpoint'i tek transaction'da, tek gidiş-dönüşte yazar"""
+        self.pipeline("reembed.store_batch", [
+            ("reembed.store_vector", updates),
+            ("reembed.checkpoint", (len(updates), last_id, rate, job_id)),
+        ])
+
+    # --- idempotency ---
+
+    def claim_idempotency_key(self, key: str, fingerprint: str, ttl: float) -> bool:
+        """Anahtar bu istek için alındıysa True; başka bir istek tutuyorsa False"""
+        return self.fetch_one("idempotency.claim", {"key": key, "fingerprint": fingerprint, "ttl": ttl}) is not None
+
+    def get_idempotency_key(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.fetch_one("idempotency.get", (key,))
+
+    def complete_idempotency_key(self, key: str, status: int, response: str):
+        self.execute("idempotency.complete", (status, response, key))
+
+    def release_idempotency_key(self, key: str):
+        self.execute("idempotency.release", (key,))
+
+    def purge_idempotency_keys(self, ttl: float) -> int:
+        return self.execute("idempotency.purge", (ttl,))
+
+    # --- events ---
+
+    def publish_event(self, channel: str, payload: str):
+        self.fetch_one("events.publish", (channel, payload))
+
+    # --- stats ---
+
+    def stats_categories(self) -> List[Dict[str, Any]]:
+        return self.fetch_all("stats.categories", read=True)
+
+    def stats_total(self) -> int:
+        return self.fetch_one("stats.total", read=True)["total"]
+
+    def stats_recent(self, days: int) -> int:
+        return self.fetch_one("stats.recent", (days,), read=True)["recent_count"]
+
+    def stats_by_date(self, limit: int) -> List[Dict[str, Any]]:
+        return self.fetch_all("stats.by_date", (limit,), read=True)
+
+    def stats_summary(self, days: int, limit: int) -> Dict[str, Any]:
+        return self.fetch_one("stats.summary", {"days": days, "limit": limit}, read=True)
+
+
+# Global instance
+repository = Repository(QUERIES)
+
@@ -0,0 +1,217 @@
+import hmac
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ..logger import logger
+from ..config import settings
+from ..utils.duplicate_scan import duplicate_scanner, ScanAlreadyRunning
+from ..utils.category_centroids import category_centroids
+from ..utils.reembed import reembedder, ReembedAlreadyRunning
+from ..repository import repository
+from ..utils.profiling import profile_store, allocation_tracker, loop_monitor, ProfilerBusy
+from ..utils.serialization import FastJSONResponse
+
+
+def admin_token_valid(token: Optional[str]) -> bool:
+    """ADMIN_TOKEN tanımlı ve verilen token eşleşiyorsa True"""
+    return bool(settings.ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, settings.ADMIN_TOKEN)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """X-Admin-Token kontrolü; ADMIN_TOKEN boşsa admin API kapalıdır"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API devre dışı (ADMIN_TOKEN ayarlanmamış)")
+    if not admin_token_valid(x_admin_token):
+        raise HTTPException(status_code=403, detail="Geçersiz admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.post("/duplicate-scan", status_code=202)
+def start_duplicate_scan(
+    request: Request,
+    threshold: Optional[float] = Query(None, ge=0.5, le=1.0),
+):
+    """Tüm korpus için yakın-kopya taramasını arka planda başlatır"""
+    try:
+        scan_id = duplicate_scanner.start(threshold)
+    except ScanAlreadyRunning:
+        return JSONResponse(status_code=409, content={"detail": "Zaten çalışan bir tarama var"})
+
+    logger.info(
+        "Duplicate scan requested id=%s req_id=%s ip=%s",
+        scan_id,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+    return {"scan_id": scan_id, "status": "running"}
+
+
+@router.get("/duplicate-scan/{scan_id}")
+def get_duplicate_scan(scan_id: int):
+    """Tarama durumu ve ilerlemesi"""
+    scan = duplicate_scanner.get_scan(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Tarama bulunamadı")
+    return scan
+
+
+@router.get("/duplicate-clusters")
+def get_duplicate_clusters(
+    scan_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """Taramada bulunan kümeler (büyükten küçüğe); scan_id yoksa son biten tarama"""
+    scan = duplicate_scanner.get_scan(scan_id)
+    if not scan:
+        raise HTTPException(status_code=404, detail="Tamamlanmış tarama yok")
+    return {
+        "scan": scan,
+        "clusters": duplicate_scanner.get_clusters(scan["id"], limit=limit, offset=offset),
+    }
+
+
+@router.post("/category-centroids/rebuild")
+def rebuild_category_centroids():
+    """Kategori merkez toplamlarını sorulardan yeniden hesaplar"""
+    category_centroids.rebuild()
+    return {"ok": True}
+
+
+@router.get("/reembed")
+def get_reembed_status():
+    """Aktif/hedef embedding modeli ve yeniden embedding ilerlemesi (ETA)"""
+    return reembedder.status()
+
+
+@router.post("/reembed", status_code=202)
+async def start_reembed(
+    request: Request,
+    force: bool = Query(False, description="Model adı aynı olsa da yeniden hesapla (ör. model güncellendi)"),
+):
+    """EMBED_MODEL ile yeniden embedding işini başlatır veya kaldığı yerden sürdürür"""
+    try:
+        job_id = await reembedder.start(force)
+    except ReembedAlreadyRunning:
+        return JSONResponse(status_code=409, content={"detail": "Zaten çalışan bir yeniden embedding işi var"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    logger.info(
+        "Re-embedding requested job=%s model=%s req_id=%s ip=%s",
+        job_id, settings.EMBED_MODEL,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+    return {"job_id": job_id, "status": "running"}
+
+
+@router.post("/reembed/cancel")
+def cancel_reembed():
+    """Devam eden yeniden embedding işini iptal eder (cutover başladıysa edilemez)"""
+    return {"cancelled": reembedder.cancel()}
+
+
+@router.get("/queries")
+def get_query_timings():
+    """Bu worker'daki sorgu başına çağrı sayısı ve süreler"""
+    return repository.timings.snapshot()
+
+
+@router.delete("/queries")
+def reset_query_timings():
+    """Sorgu süre sayaçlarını sıfırlar"""
+    repository.timings.reset()
+    return {"ok": True}
+
+
+def _profile_response(profile, fmt: str, name: str):
+    """speedscope: https://www.speedscope.app ile açılır; folded: flamegraph.pl girdisi"""
+    if fmt == "folded":
+        return PlainTextResponse(profile.to_folded())
+    return FastJSONResponse(
+        profile.to_speedscope(name),
+        headers={"Content-Disposition": f'attachment; filename="{name}.speedscope.json"'}
+    )
+
+
+@router.post("/profile/cpu")
+async def cpu_profile(
+    request: Request,
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=100),
+    format: str = Query("speedscope", pattern="^(speedscope|folded)$"),
+    idle: bool = Query(False, description="Boşta bekleyen thread örneklerini de dahil et"),
+):
+    """Bu worker'ın tüm thread'lerini (event loop dahil) N saniye örnekler"""
+    seconds = min(seconds, settings.PROFILE_MAX_SECONDS)
+    logger.info(
+        "CPU profile requested seconds=%s interval_ms=%s req_id=%s ip=%s",
+        seconds, interval_ms,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+    try:
+        profile = await profile_store.cpu_profile(seconds, interval_ms / 1000, idle)
+    except ProfilerBusy:
+        return JSONResponse(status_code=409, content={"detail": "Zaten alınan bir CPU profili var"})
+    return _profile_response(profile, format, f"cpu-{int(time.time())}")
+
+
+@router.get("/profile/requests")
+def list_request_profiles():
+    """X-Profile başlığıyla profillenen son istekler"""
+    return profile_store.list_requests()
+
+
+@router.get("/profile/requests/{request_id}")
+def get_request_profile(
+    request_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|folded)$"),
+):
+    """Tek bir isteğin profili (request_id: yanıttaki X-Profile-Id)"""
+    entry = profile_store.get_request(request_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı")
+    return _profile_response(entry["profile"], format, f"request-{request_id}")
+
+
+@router.post("/tracemalloc/start")
+def start_tracemalloc(frames: int = Query(10, ge=1, le=100)):
+    """Bellek ayırma izlemeyi başlatır (ek CPU/bellek maliyeti vardır; iş bitince durdurun)"""
+    return allocation_tracker.start(frames)
+
+
+@router.post("/tracemalloc/snapshot")
+def take_tracemalloc_snapshot(
+    limit: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    compare_to: Optional[int] = Query(None, description="Karşılaştırılacak snapshot; varsayılan bir önceki"),
+):
+    """Snapshot alır; en çok ayıranlar ve önceki snapshot'a göre büyüyenler"""
+    try:
+        return allocation_tracker.snapshot(limit, group_by, compare_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/tracemalloc")
+def get_tracemalloc_status():
+    """İzleme durumu ve izlenen toplam bellek"""
+    return allocation_tracker.status()
+
+
+@router.delete("/tracemalloc")
+def stop_tracemalloc():
+    """İzlemeyi durdurur ve snapshot'ları siler"""
+    return allocation_tracker.stop()
+
+
+@router.get("/loop-lag")
+def get_loop_lag():
+    """Event loop bloklanmaları: sayı, en uzun süre ve son olayların yığınları"""
+    return loop_monitor.stats()
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import Response
+
+from ..utils.assets import asset_manager
+from ..utils.http_cache import etag_matches
+
+
+router = APIRouter()
+
+# Parmak izli URL'ler içerik değişince değişir: tarayıcı bir daha sormaz
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@router.get("/static/{path:path}")
+def static_asset(request: Request, path: str):
+    """Statik dosyaları bellekten, önceden sıkıştırılmış varyantlarıyla sunar"""
+    asset, fingerprinted = asset_manager.lookup(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    headers = {
+        "ETag": asset.etag,
+        "Cache-Control": IMMUTABLE if fingerprinted else "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+
+    encoding, body = asset.select(request.headers.get("accept-encoding", ""))
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.media_type, headers=headers)
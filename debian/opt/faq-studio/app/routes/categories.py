@@ -0,0 +1,102 @@
+import time
+from typing import List
+from fastapi import APIRouter, Request, Form, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from ..repository import repository
+from ..logger import logger
+from ..utils.categories import category_manager
+from ..utils.chroma_service import chroma_service
+from ..utils.http_cache import invalidate_cache
+from ..utils.json_io import json_manager
+from ..utils.live_events import live_events
+from ..utils.suggest_index import suggest_index
+
+
+# Router setup
+router = APIRouter()
+
+
+def _clean(name: str) -> str:
+    name = (name or "").strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="Kategori adı boş olamaz")
+    return name
+
+
+async def _apply(request: Request, op: str, moved: List[dict], target: str, removed: List[str], started: float) -> dict:
+    """Veritabanı UPDATE'inden sonra: tek Chroma metadata güncellemesi, tek JSON ve kategori yazması
+
+    Canlı olay (sayı ve kategori farkı) UPDATE sorgusunun içinde gönderilmiştir.
+    Embedding hesaplanmaz: soru metinleri değişmediği için vektörler aynı kalır.
+    """
+    pairs = [(r["id"], r["old_category"]) for r in moved]
+    ids = {qid for qid, _ in pairs}
+    if pairs:
+        await run_in_threadpool(chroma_service.recategorize, pairs, target)
+        await run_in_threadpool(json_manager.set_category, ids, target)
+        suggest_index.set_category(ids, target)
+    if removed or target not in category_manager.load_categories():
+        # Dosya yazması (fsync + rename) event loop dışında
+        await run_in_threadpool(category_manager.replace_categories, removed, target)
+    invalidate_cache()
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(
+        "Category %s -> %s moved=%s removed=%s in %.1fms req_id=%s ip=%s",
+        op, target, len(pairs), removed, elapsed_ms,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+    return {"ok": True, "op": op, "category": target, "moved": len(pairs), "removed": removed, "elapsed_ms": elapsed_ms}
+
+
+@router.post("/categories/rename")
+async def rename_category(
+    request: Request,
+    old: str = Form(...),
+    new: str = Form(...),
+):
+    """Kategoriyi yeniden adlandırır (yeni ad kullanılıyorsa /categories/merge kullanılmalı)"""
+    started = time.perf_counter()
+    old, new = _clean(old), _clean(new)
+    if old == new:
+        raise HTTPException(status_code=400, detail="Yeni ad eskisiyle aynı")
+    if new in category_manager.load_categories() or await run_in_threadpool(repository.category_count, new):
+        raise HTTPException(status_code=409, detail=f"'{new}' kategorisi zaten var; birleştirmek için /categories/merge")
+    moved = await run_in_threadpool(repository.move_category, [old], new,
+                                    notify=live_events.notify("rename", category=new))
+    if not moved and old not in category_manager.load_categories():
+        raise HTTPException(status_code=404, detail="Kategori bulunamadı")
+    return await _apply(request, "rename", moved, new, [old], started)
+
+
+@router.post("/categories/merge")
+async def merge_categories(
+    request: Request,
+    sources: List[str] = Form(...),
+    target: str = Form(...),
+):
+    """Kaynak kategorilerdeki tüm soruları hedef kategoriye taşır ve kaynakları kaldırır"""
+    started = time.perf_counter()
+    target = _clean(target)
+    sources = sorted({_clean(s) for s in sources} - {target})
+    if not sources:
+        raise HTTPException(status_code=400, detail="Hedeften farklı en az bir kaynak kategori gerekli")
+    moved = await run_in_threadpool(repository.move_category, sources, target,
+                                    notify=live_events.notify("merge", category=target))
+    return await _apply(request, "merge", moved, target, sources, started)
+
+
+@router.post("/categories/reassign")
+async def reassign_questions(
+    request: Request,
+    ids: List[int] = Form(...),
+    category: str = Form(...),
+):
+    """Seçilen soruları tek seferde başka bir kategoriye taşır (kategoriler kaldırılmaz)"""
+    started = time.perf_counter()
+    category = _clean(category)
+    moved = await run_in_threadpool(repository.reassign_questions, sorted(set(ids)), category,
+                                    notify=live_events.notify("reassign", category=category))
+    return await _apply(request, "reassign", moved, category, [], started)
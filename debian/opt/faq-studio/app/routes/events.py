@@ -0,0 +1,57 @@
+import asyncio
+import os
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..logger import logger
+from ..config import settings
+from ..utils.live_events import live_events
+
+
+# Router setup
+router = APIRouter()
+
+# Bağlantı koparsa tarayıcı bu kadar ms sonra yeniden bağlanır
+RETRY_MS = 3000
+
+
+@router.get("/events")
+async def events(request: Request):
+    """Canlı değişiklik akışı (Server-Sent Events): ekleme/güncelleme/silme olayları"""
+    subscriber = live_events.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Çok fazla canlı bağlantı",
+                            headers={"Retry-After": str(RETRY_MS // 1000)})
+
+    logger.debug(
+        "Live events subscribed clients=%s req_id=%s ip=%s",
+        live_events.client_count,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+
+    async def stream():
+        try:
+            # hello: istemci (yeniden) bağlandı, görünümünü bir kez tam yüklesin
+            yield f"retry: {RETRY_MS}\nevent: hello\ndata: {{\"worker\": {os.getpid()}}}\n\n"
+            while True:
+                # Yavaş kaldı veya dinleyici koptu: kuyruktaki eski olaylar yerine tam yükleme
+                if subscriber.overflowed:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                try:
+                    payload = await asyncio.wait_for(subscriber.queue.get(), settings.SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Proxy'ler boşta bağlantıyı kapatmasın
+                    yield ": ping\n\n"
+                    continue
+                if payload is None:
+                    continue
+                yield f"event: change\ndata: {payload}\n\n"
+        finally:
+            live_events.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx tamponlamasın
+    })
@@ -0,0 +1,128 @@
+import base64
+import csv
+import datetime
+import io
+from typing import Iterator, Optional
+import numpy as np
+from fastapi import APIRouter, Request, Query
+from fastapi.responses import StreamingResponse
+
+from ..db import get_conn
+from ..logger import logger
+from ..config import settings
+from ..utils.serialization import dumps
+from ..utils.embeddings import vector_to_numpy
+
+
+router = APIRouter()
+
+EXPORT_COLUMNS = ["id", "question", "answer", "keywords", "category", "created_at", "created_by", "updated_at"]
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+}
+# Ağa gönderilecek parça boyutu (satır satır yield etmek yerine)
+CHUNK_BYTES = 64 * 1024
+
+
+def encode_embedding(vec: np.ndarray) -> str:
+    """Embedding'i float16 + base64 olarak sıkıştırır (1024 boyut -> ~2.7 KB)"""
+    return base64.b64encode(np.asarray(vec, dtype="<f2").tobytes()).decode("ascii")
+
+
+def iter_rows(include_embeddings: bool, since: Optional[datetime.datetime]) -> Iterator[dict]:
+    """Server-side cursor ile satırları sabit bellekle okur"""
+    columns = ", ".join(EXPORT_COLUMNS + (["embedding"] if include_embeddings else []))
+    sql = f"SELECT {columns} FROM questions"
+    params = ()
+    if since is not None:
+        sql += " WHERE updated_at >= %s"
+        params = (since,)
+    sql += " ORDER BY id"
+
+    with get_conn() as conn:
+        with conn.cursor(name="faq_export") as cur:
+            cur.itersize = settings.EXPORT_BATCH_SIZE
+            cur.execute(sql, params)
+            for row in cur:
+                if include_embeddings:
+                    vec = vector_to_numpy(row.pop("embedding"))
+                    row["embedding_dim"] = len(vec)
+                    row["embedding_f16_b64"] = encode_embedding(vec)
+                yield row
+
+
+def _chunked(parts: Iterator[bytes]) -> Iterator[bytes]:
+    """Küçük parçaları CHUNK_BYTES boyutunda birleştirir"""
+    buf = bytearray()
+    for part in parts:
+        buf += part
+        if len(buf) >= CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+def _ndjson(rows: Iterator[dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield dumps(row) + b"\n"
+
+
+def _json(rows: Iterator[dict]) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for row in rows:
+        yield dumps(row) if first else b"," + dumps(row)
+        first = False
+    yield b"]"
+
+
+def _csv(rows: Iterator[dict], include_embeddings: bool) -> Iterator[bytes]:
+    fields = EXPORT_COLUMNS + (["embedding_dim", "embedding_f16_b64"] if include_embeddings else [])
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=fields)
+    # Excel'in UTF-8'i tanıması için BOM
+    out.write("\ufeff")
+    writer.writeheader()
+    # Başlık satırı her zaman gönderilir: hiç kayıt yoksa da geçerli bir CSV döner
+    yield out.getvalue().encode("utf-8")
+    out.seek(0)
+    out.truncate(0)
+    for row in rows:
+        writer.writerow(row)
+        yield out.getvalue().encode("utf-8")
+        out.seek(0)
+        out.truncate(0)
+
+
+@router.get("/export")
+def export_questions(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv|json)$"),
+    include_embeddings: bool = Query(False),
+    since: Optional[datetime.datetime] = Query(None, description="Sadece bu tarihten sonra eklenen/güncellenen kayıtlar"),
+):
+    """Tüm soruları akış (streaming) olarak dışa aktarır"""
+    rows = iter_rows(include_embeddings, since)
+    if format == "ndjson":
+        body = _ndjson(rows)
+    elif format == "csv":
+        body = _csv(rows, include_embeddings)
+    else:
+        body = _json(rows)
+
+    logger.info(
+        "Export format=%s embeddings=%s since=%s req_id=%s ip=%s",
+        format, include_embeddings, since,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+
+    filename = f"faq-export-{datetime.datetime.now():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        _chunked(body),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -2,25 +2,31 @@ import os
 from typing import Optional
 from fastapi import APIRouter, Request, Form, Query, HTTPException
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-import pathlib
+from starlette.concurrency import run_in_threadpool
 
-from ..db import get_conn
-from ..utils.embeddings import embed, embedding_to_vector_str
+from ..repository import repository, DuplicateQuestion
+from ..utils.embeddings import embed_admitted, embedding_to_vector_str, active_embed_model
+from ..utils.admission import Deadline
+from ..utils.category_centroids import suggest_categories
 from ..utils.json_io import append_question_to_json, remove_question_from_json
 from ..utils.categories import load_categories, add_category_if_new
 from ..logger import logger
 from ..config import settings
 from ..utils.chroma_service import chroma_service
+from ..utils.suggest_index import suggest_index, suggest_questions
+from ..utils.live_events import live_events
+from ..utils.idempotency import coalesced, idempotent, fingerprint
+from ..utils.http_cache import cached_json_response, cached_response, invalidate_cache
+from ..utils.serialization import FastJSONResponse
+from ..utils.templating import templates
 
 
-# Router ve template setup
+# Router setup
 router = APIRouter()
-TPL_DIR = pathlib.Path(__file__).parent.parent / "templates"
-templates = Jinja2Templates(directory=str(TPL_DIR))
 
 # Environment variables
 DEFAULT_THRESHOLD = settings.SIM_THRESHOLD
+IDEMPOTENCY_KEY_MAX = 255
 
 
 @router.post("/check-duplicate")
@@ -29,6 +35,9 @@ async def check_duplicate(
     question: str = Form(...),
     th: Optional[float] = Query(None),
     k: int = Query(3, ge=1, le=10),
+    suggest: bool = Query(False),
+    category: Optional[str] = Query(None, description="Sadece bu kategorinin index'inde ara"),
+    scope: str = Query("only", pattern="^(only|first)$", description="first: önce kategori, k'ya kadar genel"),
 ):
     """Benzer soru kontrolü yapar - ChromaDB ile"""
 
@@ -38,33 +47,81 @@ async def check_duplicate(
     if len(question.strip()) < 3:
         return {"duplicate": False, "results": [], "error": "Soru çok kısa"}
     
-    # Embedding hesapla
-    q = embed(question)
-    
-    # ChromaDB'de benzer soruları ara
     threshold = float(th) if th is not None else DEFAULT_THRESHOLD
-    similar_questions = chroma_service.search_similar(
-        q.tolist(), top_k=k, threshold=threshold
+
+    async def compute():
+        # Embedding hesapla (interaktif lane: toplu işlerden önce sıraya girer)
+        deadline = Deadline.from_request(request)
+        q = await embed_admitted(question, "interactive", deadline)
+        deadline.check()
+        
+        # ChromaDB'de benzer soruları ara
+        similar_questions = await run_in_threadpool(
+            chroma_service.search_similar, q.tolist(), top_k=k, threshold=threshold,
+            category=category or None, scope=scope
+        )
+        
+        # Benzerlik kontrolü
+        dup = len(similar_questions) > 0
+        
+        logger.debug(
+            "Duplicate check qlen=%s th=%.2f topk=%s cat=%s scope=%s result=%s req_id=%s ip=%s",
+            len(question), threshold, k, category, scope, {"duplicate": dup},
+            getattr(request.state, 'request_id', 'unknown'),
+            getattr(request.state, 'client_ip', 'unknown')
+        )
+        
+        response = {
+            "duplicate": dup, 
+            "threshold": threshold,
+            "results": [
+                {"id": r["id"], "question": r["question"], "sim": float(r["sim"]),
+                 **({"category": r["category"], "scope": r["scope"]} if "scope" in r else {})}
+                for r in similar_questions
+            ]
+        }
+        # Embedding zaten hesaplandı: kategori önerisi neredeyse bedava
+        if suggest:
+            response["suggested_categories"] = await run_in_threadpool(suggest_categories, q)
+        return response
+
+    # Aynı anda gelen aynı kontroller (çift tıklama, birden çok sekme) tek embedding'i paylaşır
+    return await coalesced(
+        "check:" + fingerprint(question, threshold, k, suggest, category, scope, active_embed_model()), compute
     )
-    
-    # Benzerlik kontrolü
-    dup = len(similar_questions) > 0
-    
+
+
+@router.post("/suggest-category")
+async def suggest_category(
+    request: Request,
+    question: str = Form(...),
+    k: int = Query(3, ge=1, le=10),
+):
+    """Soruya en uygun kategorileri önerir (kategori merkezleriyle, kNN sorgusu olmadan)"""
+    if not question or len(question.strip()) < 3:
+        raise HTTPException(status_code=400, detail="Soru çok kısa")
+
+    deadline = Deadline.from_request(request)
+    q = await embed_admitted(question, "interactive", deadline)
+    suggestions = await run_in_threadpool(suggest_categories, q, k)
+
     logger.debug(
-        "Duplicate check qlen=%s th=%.2f topk=%s result=%s req_id=%s ip=%s",
-        len(question), threshold, k, {"duplicate": dup},
+        "Category suggestion qlen=%s top=%s req_id=%s ip=%s",
+        len(question), suggestions[0]["category"] if suggestions else None,
         getattr(request.state, 'request_id', 'unknown'),
         getattr(request.state, 'client_ip', 'unknown')
     )
-    
-    return {
-        "duplicate": dup, 
-        "threshold": threshold,
-        "results": [
-            {"id": r["id"], "question": r["question"], "sim": float(r["sim"])} 
-            for r in similar_questions
-        ]
-    }
+    return {"suggestions": suggestions}
+
+
+@router.get("/suggest")
+async def suggest(
+    prefix: str = Query(..., max_length=200),
+    limit: int = Query(8, ge=1, le=20),
+):
+    """Yazarken öneri: bellekteki önek index'inden (embedding/DB çağrısı yok)"""
+    # Bellek içi bisect: threadpool'a göndermek aramadan pahalı
+    return FastJSONResponse({"prefix": prefix, "suggestions": suggest_questions(prefix, limit)})
 
 
 @router.post("/add")
@@ -76,21 +133,64 @@ async def add_question(
     category: str = Form(...),
     created_by: str = Form("anonymous")
 ):
-    """Yeni soru ekler - ChromaDB ile"""
+    """Yeni soru ekler - ChromaDB ile
+
+    Idempotency-Key başlığıyla tekrarlanan istekler ilk isteğin yanıtını alır; aynı
+    içerikli eşzamanlı istekler tek hesaplamayı paylaşır.
+    """
+    idempotency_key = request.headers.get("idempotency-key")
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key 1-{IDEMPOTENCY_KEY_MAX} karakter olmalı")
+    request_fingerprint = fingerprint("add", question, answer, keywords, category, created_by)
+
+    async def compute():
+        return await coalesced(
+            "add:" + request_fingerprint,
+            lambda: _add_question(request, question, answer, keywords, category, created_by)
+        )
+
+    return await idempotent(
+        "add:" + idempotency_key if idempotency_key else None, request_fingerprint, compute
+    )
+
+
+def _conflict(existing_id: int):
+    return 409, {"ok": False, "detail": "Bu soru zaten kayıtlı", "existing_id": existing_id}
+
+
+async def _conflict_response(question: str) -> FastJSONResponse:
+    """Güncellemede uq_questions_text ihlali: /add ile aynı 409 gövdesi"""
+    existing_id = await run_in_threadpool(repository.find_question_by_text, question)
+    status, body = _conflict(existing_id)
+    return FastJSONResponse(body, status_code=status)
+
+
+async def _add_question(request: Request, question: str, answer: str, keywords: str, category: str, created_by: str):
+    """/add'in asıl işi: (durum kodu, gövde) döndürür"""
+    # Aynı metinli soru varsa embedding hesaplamadan 409
+    existing_id = await run_in_threadpool(repository.find_question_by_text, question)
+    if existing_id is not None:
+        logger.info("Add rejected: duplicate text of id=%s req_id=%s", existing_id,
+                    getattr(request.state, 'request_id', 'unknown'))
+        return _conflict(existing_id)
+
     # Embedding hesapla
-    vec = embed(question)
+    deadline = Deadline.from_request(request)
+    model = active_embed_model()
+    vec = await embed_admitted(question, "write", deadline, model=model)
     vec_str = embedding_to_vector_str(vec)
+    # Bütçe bittiyse istemci gitmiştir: yazma yapma
+    deadline.check()
 
-    # Veritabanına ekle ve ID al - created_by alanını da ekle!
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO questions (question, answer, keywords, category, embedding, created_by) "
-            "VALUES (%s, %s, %s, %s, %s::vector, %s) RETURNING id",
-            (question, answer, keywords, category, vec_str, created_by)
-        )
-        result = cur.fetchone()
-        new_id = result.get("id") if hasattr(result, 'get') else result[0]
-        conn.commit()
+    # Veritabanına ekle ve ID al - created_by alanını da ekle! Canlı olay aynı sorguda gider
+    new_id = await run_in_threadpool(
+        repository.insert_question, question, answer, keywords, category, vec_str, model, created_by,
+        notify=live_events.notify("add", question=question, created_by=created_by)
+    )
+    if new_id is None:
+        # Ön kontrolden sonra başka bir istek aynı metni ekledi (uq_questions_text)
+        existing_id = await run_in_threadpool(repository.find_question_by_text, question)
+        return _conflict(existing_id)
 
     # ChromaDB'ye ekle
     chroma_service.add_question(
@@ -107,9 +207,11 @@ async def add_question(
         "created_by": created_by
     }
     append_question_to_json(question_data)
+    suggest_index.upsert(new_id, question, keywords, category)
 
     # Kategoriyi güncelle (yoksa ekle)
     add_category_if_new(category)
+    invalidate_cache()
 
     logger.info(
         "Added id=%s cat=%s qlen=%s by=%s req_id=%s ip=%s",
@@ -118,7 +220,26 @@ async def add_question(
         getattr(request.state, 'client_ip', 'unknown')
     )
     
-    return {"ok": True, "id": new_id}
+    return 200, {"ok": True, "id": new_id}
+
+
+@router.get("/questions/search")
+def search_questions(
+    request: Request,
+    query: str, 
+    limit: int = 50, 
+    offset: int = 0
+):
+    """Soruları arar"""
+    # Not: /questions/{qid}'den önce tanımlı olmalı, yoksa "search" qid olarak eşleşir
+    logger.debug(
+        "Search query=%s limit=%s offset=%s req_id=%s ip=%s",
+        query, limit, offset,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+    
+    return FastJSONResponse(repository.search_questions(query, limit, offset))
 
 
 @router.get("/questions/{qid}")
@@ -131,17 +252,14 @@ def get_question_detail(request: Request, qid: int):
         getattr(request.state, 'client_ip', 'unknown')
     )
     
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            "SELECT id, question, answer, keywords, category, created_at, created_by "
-            "FROM questions WHERE id = %s",
-            (qid)
-        )
-        result = cur.fetchone()
+    def build():
+        result = repository.get_question(qid)
         if not result:
             raise HTTPException(status_code=404, detail="Soru bulunamadı")
         return result
 
+    return cached_json_response(request, f"questions:{qid}", build)
+
 
 @router.get("/questions")
 def list_questions(
@@ -157,13 +275,10 @@ def list_questions(
         getattr(request.state, 'client_ip', 'unknown')
     )
     
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            "SELECT id, question, answer, keywords, category, created_at, created_by "
-            "FROM questions ORDER BY id DESC LIMIT %s OFFSET %s",
-            (limit, offset)
-        )
-        return cur.fetchall()
+    def build():
+        return repository.list_questions(limit, offset)
+
+    return cached_json_response(request, f"questions:list:{limit}:{offset}", build)
 
 
 @router.get("/questions-table", response_class=HTMLResponse)
@@ -175,39 +290,12 @@ def questions_table(request: Request):
         getattr(request.state, 'client_ip', 'unknown')
     )
     
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            "SELECT id, question, category, created_at FROM questions ORDER BY id DESC LIMIT 100"
-        )
-        rows = cur.fetchall()
-    return templates.TemplateResponse("questions.html", {"request": request, "rows": rows})
-
+    def build() -> bytes:
+        rows = repository.questions_table()
+        html = templates.env.get_template("questions.html").render(rows=rows)
+        return html.encode("utf-8")
 
-@router.get("/questions/search")
-def search_questions(
-    request: Request,
-    query: str, 
-    limit: int = 50, 
-    offset: int = 0
-):
-    """Soruları arar"""
-    logger.debug(
-        "Search query=%s limit=%s offset=%s req_id=%s ip=%s",
-        query, limit, offset,
-        getattr(request.state, 'request_id', 'unknown'),
-        getattr(request.state, 'client_ip', 'unknown')
-    )
-    
-    like_pattern = f"%{query}%"
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("""
-            SELECT id, question, answer, keywords, category, created_at, created_by
-            FROM questions
-            WHERE question ILIKE %s OR answer ILIKE %s OR keywords ILIKE %s OR category ILIKE %s
-            ORDER BY id DESC
-            LIMIT %s OFFSET %s
-        """, (like_pattern, like_pattern, like_pattern, like_pattern, limit, offset))
-        return cur.fetchall()
+    return cached_response(request, "questions:table", build, "text/html; charset=utf-8")
 
 
 @router.get("/categories.json")
@@ -219,7 +307,7 @@ def get_categories(request: Request):
         getattr(request.state, 'client_ip', 'unknown')
     )
     
-    return load_categories()
+    return cached_json_response(request, "categories", load_categories)
 
 
 @router.put("/questions/{qid}")
@@ -233,22 +321,29 @@ async def update_question(
     updated_by: str = Form("anonymous")
 ):
     """Soru günceller - ChromaDB ile"""
+    existing_id = await run_in_threadpool(repository.find_question_by_text, question)
+    if existing_id is not None and existing_id != qid:
+        status, body = _conflict(existing_id)
+        return FastJSONResponse(body, status_code=status)
+
     # Yeni embedding hesapla
-    vec = embed(question)
+    deadline = Deadline.from_request(request)
+    model = active_embed_model()
+    vec = await embed_admitted(question, "write", deadline, model=model)
     vec_str = embedding_to_vector_str(vec)
+    deadline.check()
 
     # Veritabanında güncelle
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute(
-            "UPDATE questions SET question = %s, answer = %s, keywords = %s, "
-            "category = %s, embedding = %s::vector, updated_at = NOW() "
-            "WHERE id = %s RETURNING id",
-            (question, answer, keywords, category, vec_str, qid)
+    try:
+        old_category = await run_in_threadpool(
+            repository.update_question, qid, question, answer, keywords, category, vec_str, model,
+            notify=live_events.notify("update", question=question)
         )
-        result = cur.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="Soru bulunamadı")
-        conn.commit()
+    except DuplicateQuestion:
+        # Ön kontrolden sonra başka bir istek aynı metni yazdı
+        return await _conflict_response(question)
+    if old_category is None:
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
 
     # ChromaDB'den eski kaydı sil ve yenisini ekle
     chroma_service.delete_question(qid)
@@ -264,9 +359,11 @@ async def update_question(
         "keywords": keywords,
         "category": category
     })
+    suggest_index.upsert(qid, question, keywords, category)
 
     # Kategoriyi güncelle (yoksa ekle)
     add_category_if_new(category)
+    invalidate_cache()
 
     logger.info(
         "Updated id=%s cat=%s qlen=%s by=%s req_id=%s ip=%s",
@@ -278,6 +375,92 @@ async def update_question(
     return {"ok": True, "id": qid}
 
 
+# PATCH'te karşılaştırılan alanlar
+PATCH_FIELDS = ("question", "answer", "keywords", "category")
+
+
+def _embedding_text(text: str) -> str:
+    """Sadece boşluk farkları yok sayılır; embedding modelleri büyük/küçük harfe duyarlıdır"""
+    return " ".join(text.split())
+
+
+@router.patch("/questions/{qid}")
+async def patch_question(
+    request: Request,
+    qid: int,
+    question: Optional[str] = Form(None),
+    answer: Optional[str] = Form(None),
+    keywords: Optional[str] = Form(None),
+    category: Optional[str] = Form(None),
+    updated_by: str = Form("anonymous")
+):
+    """Sadece değişen alanları günceller; soru metni değişmediyse embedding yeniden hesaplanmaz"""
+    submitted = {"question": question, "answer": answer, "keywords": keywords, "category": category}
+    for field in ("question", "category"):
+        if submitted[field] is not None and not submitted[field].strip():
+            raise HTTPException(status_code=400, detail=f"{field} boş olamaz")
+
+    # Karşılaştırma primary'deki güncel satırla yapılır
+    current = await run_in_threadpool(repository.get_question, qid, True)
+    if not current:
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
+    changes = {f: v for f, v in submitted.items() if v is not None and v != current[f]}
+    if not changes:
+        return {"ok": True, "id": qid, "changed": [], "reembedded": False}
+
+    if "question" in changes:
+        # Başka bir sorunun metnine çevriliyorsa embedding hesaplamadan 409
+        existing_id = await run_in_threadpool(repository.find_question_by_text, changes["question"])
+        if existing_id is not None and existing_id != qid:
+            status, body = _conflict(existing_id)
+            return FastJSONResponse(body, status_code=status)
+
+    reembed = "question" in changes and _embedding_text(changes["question"]) != _embedding_text(current["question"])
+    vec = vec_str = model = None
+    if reembed:
+        deadline = Deadline.from_request(request)
+        model = active_embed_model()
+        vec = await embed_admitted(changes["question"], "write", deadline, model=model)
+        vec_str = embedding_to_vector_str(vec)
+        deadline.check()
+
+    # Tek UPDATE: gönderilmeyen/değişmeyen kolonlar (ve embedding) yeniden yazılmaz
+    merged = {f: changes.get(f, current[f]) for f in PATCH_FIELDS}
+    try:
+        old_category = await run_in_threadpool(
+            repository.patch_question, qid, changes, vec_str, model,
+            notify=live_events.notify("update", question=merged["question"])
+        )
+    except DuplicateQuestion:
+        return await _conflict_response(changes["question"])
+    if old_category is None:
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
+
+    # ChromaDB: vektör değiştiyse upsert, değilse sadece metadata/doküman update
+    await run_in_threadpool(
+        chroma_service.update_question,
+        qid, merged["question"], merged["answer"], merged["keywords"], merged["category"],
+        embedding=vec.tolist() if reembed else None, old_category=old_category
+    )
+
+    from ..utils.json_io import json_manager
+    await run_in_threadpool(json_manager.update_question, qid, changes)
+    if "category" in changes:
+        add_category_if_new(merged["category"])
+    if changes.keys() & {"question", "keywords", "category"}:
+        suggest_index.upsert(qid, merged["question"], merged["keywords"], merged["category"])
+    invalidate_cache()
+
+    logger.info(
+        "Patched id=%s fields=%s reembedded=%s by=%s req_id=%s ip=%s",
+        qid, ",".join(sorted(changes)), reembed, updated_by,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+
+    return {"ok": True, "id": qid, "changed": sorted(changes), "reembedded": reembed}
+
+
 @router.delete("/questions/{qid}")
 async def delete_question(
     request: Request,
@@ -286,18 +469,17 @@ async def delete_question(
 ):
     """Soru siler - ChromaDB ile"""
     # Veritabanından sil
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("DELETE FROM questions WHERE id = %s RETURNING id", (qid,))
-        deleted = cur.fetchone()
-        if not deleted:
-            raise HTTPException(status_code=404, detail="Soru bulunamadı")
-        conn.commit()
+    category = await run_in_threadpool(repository.delete_question, qid, notify=live_events.notify("delete"))
+    if category is None:
+        raise HTTPException(status_code=404, detail="Soru bulunamadı")
 
     # ChromaDB'den sil
     chroma_service.delete_question(qid)
     
     # JSON dosyasından sil
     success = remove_question_from_json(qid)
+    suggest_index.remove(qid)
+    invalidate_cache()
     
     logger.info(
         "Deleted id=%s deleted_by=%s req_id=%s ip=%s",
@@ -1,85 +1,90 @@
 from fastapi import APIRouter, Request
-from ..db import get_conn
+from ..repository import repository
 from ..logger import logger
+from ..config import settings
+from ..utils.http_cache import cached_json_response
 
 router = APIRouter()
 
+# Sayaçlar question_stats tablosundan okunur (questions üzerindeki trigger'lar günceller).
+# Önbellek yazma işlemlerinde geçersizleşir; TTL yalnızca NOW()'a bağlı pencereler için.
+
 
 @router.get("/stats/categories")
 def stats_categories(request: Request):
     """Kategorilere göre soru sayılarını döndürür"""
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("""
-            SELECT category, COUNT(*) AS cnt
-            FROM questions
-            GROUP BY category
-            ORDER BY cnt DESC, category
-        """)
-        result = cur.fetchall()
-    
+    def build():
+        return repository.stats_categories()
+
     logger.debug(
         "Categories stats req_id=%s ip=%s",
         getattr(request.state, 'request_id', 'unknown'),
         getattr(request.state, 'client_ip', 'unknown')
     )
-    return result
+    return cached_json_response(request, "stats:categories", build, settings.STATS_CACHE_TTL)
 
 
 @router.get("/stats/total")
 def stats_total(request: Request):
     """Toplam soru sayısını döndürür"""
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("SELECT COUNT(*) AS total FROM questions")
-        row = cur.fetchone()
-        total = row["total"]
-    
+    def build():
+        return {"total": repository.stats_total()}
+
     logger.debug(
-        "Total count=%s req_id=%s ip=%s",
-        total,
+        "Total count req_id=%s ip=%s",
         getattr(request.state, 'request_id', 'unknown'),
         getattr(request.state, 'client_ip', 'unknown')
     )
-    return {"total": total}
+    return cached_json_response(request, "stats:total", build, settings.STATS_CACHE_TTL)
 
 
 @router.get("/stats/recent")
 def stats_recent(request: Request, days: int = 7):
     """Son N gün içindeki soru sayısını döndürür"""
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("""
-            SELECT COUNT(*) AS recent_count
-            FROM questions
-            WHERE created_at >= NOW() - INTERVAL '%s days'
-        """, (days,))
-        row = cur.fetchone()
-        recent_count = row["recent_count"]
-    
+    def build():
+        return {"recent_count": repository.stats_recent(days), "days": days}
+
     logger.debug(
-        "Recent count=%s days=%s req_id=%s ip=%s",
-        recent_count, days,
+        "Recent count days=%s req_id=%s ip=%s",
+        days,
         getattr(request.state, 'request_id', 'unknown'),
         getattr(request.state, 'client_ip', 'unknown')
     )
-    return {"recent_count": recent_count, "days": days}
+    return cached_json_response(request, f"stats:recent:{days}", build, settings.STATS_CACHE_TTL)
 
 
 @router.get("/stats/by-date")
 def stats_by_date(request: Request, limit: int = 30):
     """Günlere göre soru sayılarını döndürür"""
-    with get_conn() as conn, conn.cursor() as cur:
-        cur.execute("""
-            SELECT DATE(created_at) as date, COUNT(*) as count
-            FROM questions
-            WHERE created_at >= NOW() - INTERVAL '%s days'
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-        """, (limit,))
-        result = cur.fetchall()
-    
+    def build():
+        return repository.stats_by_date(limit)
+
+    logger.debug(
+        "Stats by date limit=%s req_id=%s ip=%s",
+        limit,
+        getattr(request.state, 'request_id', 'unknown'),
+        getattr(request.state, 'client_ip', 'unknown')
+    )
+    return cached_json_response(request, f"stats:by-date:{limit}", build, settings.STATS_CACHE_TTL)
+
+
+@router.get("/stats/summary")
+def stats_summary(request: Request, days: int = 7, limit: int = 30):
+    """Tüm istatistik panellerini tek sorguda döndürür"""
+    def build():
+        row = repository.stats_summary(days, limit)
+        return {
+            "total": row["total"],
+            "categories": row["categories"],
+            "recent_count": row["recent_count"],
+            "days": days,
+            "by_date": row["by_date"],
+        }
+
     logger.debug(
-        "Stats by date limit=%s count=%s req_id=%s ip=%s",
-        limit, len(result),
+        "Stats summary days=%s limit=%s req_id=%s ip=%s",
+        days, limit,
         getattr(request.state, 'request_id', 'unknown'),
         getattr(request.state, 'client_ip', 'unknown')
     )
-    return result
\ No newline at end of file
+    return cached_json_response(request, f"stats:summary:{days}:{limit}", build, settings.STATS_CACHE_TTL)
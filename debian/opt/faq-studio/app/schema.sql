@@ -62,9 +62,254 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
--- updated_at trigger'ı oluştur (eğer yoksa)
+-- updated_at trigger'ı oluştur (eğer yoksa); yeniden embedding'in gölge kolon yazmaları sayılmaz
 DROP TRIGGER IF EXISTS update_questions_modtime ON questions;
 CREATE TRIGGER update_questions_modtime
-    BEFORE UPDATE ON questions
+    BEFORE UPDATE OF question, answer, keywords, category, embedding, created_by ON questions
     FOR EACH ROW
-    EXECUTE FUNCTION update_modified_column();
\ No newline at end of file
+    EXECUTE FUNCTION update_modified_column();
+
+-- İstatistik tablosu: kategori + gün bazında sayaçlar (trigger'larla güncellenir)
+CREATE TABLE IF NOT EXISTS question_stats (
+  category TEXT NOT NULL,
+  day DATE NOT NULL,
+  cnt BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (category, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_question_stats_day
+ON question_stats (day DESC);
+
+-- Tek bir (kategori, gün) sayacını artırır/azaltır, sıfırlanan satırı siler
+CREATE OR REPLACE FUNCTION question_stats_bump(p_category TEXT, p_day DATE, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO question_stats (category, day, cnt)
+    VALUES (p_category, p_day, p_delta)
+    ON CONFLICT (category, day) DO UPDATE SET cnt = question_stats.cnt + EXCLUDED.cnt;
+
+    IF p_delta < 0 THEN
+        DELETE FROM question_stats
+        WHERE category = p_category AND day = p_day AND cnt <= 0;
+    END IF;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION question_stats_sync()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM question_stats_bump(OLD.category, COALESCE(OLD.created_at, NOW())::date, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM question_stats_bump(NEW.category, COALESCE(NEW.created_at, NOW())::date, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION question_stats_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE question_stats;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS questions_stats_insert_delete ON questions;
+CREATE TRIGGER questions_stats_insert_delete
+    AFTER INSERT OR DELETE ON questions
+    FOR EACH ROW
+    EXECUTE FUNCTION question_stats_sync();
+
+-- Sadece kategori veya tarih değiştiğinde sayaçlara dokun
+DROP TRIGGER IF EXISTS questions_stats_update ON questions;
+CREATE TRIGGER questions_stats_update
+    AFTER UPDATE OF category, created_at ON questions
+    FOR EACH ROW
+    WHEN (OLD.category IS DISTINCT FROM NEW.category OR OLD.created_at IS DISTINCT FROM NEW.created_at)
+    EXECUTE FUNCTION question_stats_sync();
+
+DROP TRIGGER IF EXISTS questions_stats_truncate ON questions;
+CREATE TRIGGER questions_stats_truncate
+    AFTER TRUNCATE ON questions
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION question_stats_truncate();
+
+-- İlk kurulumda mevcut sorulardan sayaçları doldur
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM question_stats) THEN
+        INSERT INTO question_stats (category, day, cnt)
+        SELECT category, COALESCE(created_at, NOW())::date, COUNT(*)
+        FROM questions
+        GROUP BY 1, 2;
+    END IF;
+END $$;
+
+-- Toplu yakın-kopya taraması: her çalıştırma bir kayıt
+CREATE TABLE IF NOT EXISTS duplicate_scans (
+  id BIGSERIAL PRIMARY KEY,
+  status TEXT NOT NULL DEFAULT 'running',  -- running | done | failed
+  threshold REAL NOT NULL,
+  total_questions INTEGER,
+  pair_count BIGINT,
+  cluster_count INTEGER,
+  progress REAL NOT NULL DEFAULT 0,
+  error TEXT,
+  started_at TIMESTAMP DEFAULT NOW(),
+  finished_at TIMESTAMP
+);
+
+-- Taramada bulunan kümeler (en az 2 soru); max_sim: sorunun kümedeki en yüksek benzerliği
+CREATE TABLE IF NOT EXISTS duplicate_clusters (
+  scan_id BIGINT NOT NULL REFERENCES duplicate_scans(id) ON DELETE CASCADE,
+  cluster_id INTEGER NOT NULL,
+  question_id BIGINT NOT NULL,
+  max_sim REAL NOT NULL,
+  PRIMARY KEY (scan_id, cluster_id, question_id)
+);
+
+-- Kategori merkezleri: embedding toplamı + sayı (trigger'larla artımlı güncellenir)
+CREATE TABLE IF NOT EXISTS category_centroids (
+  category TEXT PRIMARY KEY,
+  vec_sum VECTOR(1024) NOT NULL,
+  cnt BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION category_centroids_sync()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE category_centroids
+        SET vec_sum = vec_sum - OLD.embedding, cnt = cnt - 1
+        WHERE category = OLD.category;
+        DELETE FROM category_centroids WHERE category = OLD.category AND cnt <= 0;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO category_centroids (category, vec_sum, cnt)
+        VALUES (NEW.category, NEW.embedding, 1)
+        ON CONFLICT (category) DO UPDATE
+        SET vec_sum = category_centroids.vec_sum + EXCLUDED.vec_sum,
+            cnt = category_centroids.cnt + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Kayan nokta hatası birikmesin diye toplamları baştan hesaplar
+CREATE OR REPLACE FUNCTION category_centroids_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM category_centroids;
+    INSERT INTO category_centroids (category, vec_sum, cnt)
+    SELECT category, SUM(embedding), COUNT(*)
+    FROM questions
+    GROUP BY category;
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION category_centroids_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    TRUNCATE category_centroids;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS questions_centroids_insert_delete ON questions;
+CREATE TRIGGER questions_centroids_insert_delete
+    AFTER INSERT OR DELETE ON questions
+    FOR EACH ROW
+    EXECUTE FUNCTION category_centroids_sync();
+
+-- Sadece kategori veya embedding değiştiğinde. Toplu kategori taşıma transaction'ı
+-- faq.centroids_deferred = 'on' ile satır başı güncellemeyi atlar, etkilenen
+-- kategorileri sonda tek GROUP BY ile yeniden hesaplar
+DROP TRIGGER IF EXISTS questions_centroids_update ON questions;
+CREATE TRIGGER questions_centroids_update
+    AFTER UPDATE OF category, embedding ON questions
+    FOR EACH ROW
+    WHEN ((OLD.category IS DISTINCT FROM NEW.category OR OLD.embedding IS DISTINCT FROM NEW.embedding)
+          AND current_setting('faq.centroids_deferred', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION category_centroids_sync();
+
+DROP TRIGGER IF EXISTS questions_centroids_truncate ON questions;
+CREATE TRIGGER questions_centroids_truncate
+    AFTER TRUNCATE ON questions
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION category_centroids_truncate();
+
+-- İlk kurulumda mevcut sorulardan doldur
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM category_centroids) AND EXISTS (SELECT 1 FROM questions) THEN
+        PERFORM category_centroids_rebuild();
+    END IF;
+END $$;
+
+-- Embedding modeli değişimi: satır başına model adı + yeniden embedding için gölge kolon
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS embed_model TEXT;
+ALTER TABLE questions ADD COLUMN IF NOT EXISTS embedding_next VECTOR(1024);
+
+-- Sorguların kullandığı (index'teki vektörleri üreten) model; tek satır
+CREATE TABLE IF NOT EXISTS embedding_state (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  active_model TEXT NOT NULL,
+  updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Yeniden embedding işleri; last_id: kaldığı yer (checkpoint)
+CREATE TABLE IF NOT EXISTS reembed_jobs (
+  id BIGSERIAL PRIMARY KEY,
+  source_model TEXT NOT NULL,
+  target_model TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'running',  -- running | cutover | done | failed | cancelled
+  total INTEGER NOT NULL DEFAULT 0,
+  done INTEGER NOT NULL DEFAULT 0,
+  last_id BIGINT NOT NULL DEFAULT 0,
+  rate REAL,  -- satır/saniye, ETA için
+  error TEXT,
+  started_at TIMESTAMP DEFAULT NOW(),
+  updated_at TIMESTAMP DEFAULT NOW(),
+  finished_at TIMESTAMP
+);
+
+-- Soru metni değişirse gölge vektör geçersizdir; iş onu yeniden hesaplar
+CREATE OR REPLACE FUNCTION questions_reset_embedding_next()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.question IS DISTINCT FROM OLD.question THEN
+        NEW.embedding_next := NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS questions_reset_embedding_next ON questions;
+CREATE TRIGGER questions_reset_embedding_next
+    BEFORE UPDATE OF question ON questions
+    FOR EACH ROW
+    EXECUTE FUNCTION questions_reset_embedding_next();
+
+-- Idempotency-Key ile gelen yazma istekleri: ilk istek sonucu saklanır, tekrarlar aynı yanıtı alır.
+-- Kısa ömürlü (IDEMPOTENCY_TTL) ve sadece primary'den okunur: WAL'a yazılmasına gerek yok
+CREATE UNLOGGED TABLE IF NOT EXISTS idempotency_keys (
+  key TEXT PRIMARY KEY,
+  fingerprint TEXT NOT NULL,
+  status INTEGER,  -- NULL: istek hâlâ işleniyor
+  response JSONB,
+  created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at
+ON idempotency_keys (created_at);
+
+-- Tamamlanan startup görevleri (çok worker'lı mod): aynı açılışta yeniden doğan
+-- worker'lar şema/ısınma görevlerini tekrar çalıştırmaz. boot_id launcher'dan gelir.
+CREATE TABLE IF NOT EXISTS startup_runs (
+  name TEXT NOT NULL,
+  boot_id TEXT NOT NULL,
+  finished_at TIMESTAMP DEFAULT NOW(),
+  PRIMARY KEY (name, boot_id)
+);
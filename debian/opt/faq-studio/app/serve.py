@@ -0,0 +1,73 @@
+"""FAQ Studio launcher.
+
+WORKERS=1 iken uygulama tek süreçte, ChromaDB süreç içinde çalışır (eski davranış).
+WORKERS>1 iken:
+  - vektör index'inin tek sahibi olan ayrı bir süreç başlatılır (Unix socket),
+  - uvicorn N worker ile başlatılır; worker'lar VECTOR_MODE=remote ile index'e bağlanır,
+  - response cache sürümü worker'lar arasında paylaşılan bir dosyada tutulur,
+  - tüm worker'lar aynı BOOT_ID'yi alır: startup görevleri (şema, ısınma) açılış başına
+    bir kez çalışır, sonradan yeniden doğan worker'lar bunları tekrarlamaz.
+
+Kullanım:
+    python -m app.serve
+
+Gunicorn ile (index sahibi ayrı çalıştırılır):
+    VECTOR_MODE=remote python -m app.utils.vector_ipc &
+    VECTOR_MODE=remote CACHE_GENERATION_PATH=/run/faq-studio/cache.gen BOOT_ID=$(uuidgen) \\
+        gunicorn app.main:app -k uvicorn.workers.UvicornWorker -w $WORKERS
+"""
+import multiprocessing
+import os
+import time
+import uuid
+
+import uvicorn
+
+from app.config import settings
+from app.logger import logger
+
+
+def _wait_for_socket(path: str, timeout: float = 60.0):
+    """Index sahibi socket'i açana kadar bekle"""
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Vector index owner did not start: {path}")
+        time.sleep(0.1)
+
+
+def main():
+    workers = settings.WORKERS
+    if workers == 1:
+        uvicorn.run("app.main:app", host=settings.HOST, port=settings.PORT, reload=settings.RELOAD)
+        return
+
+    from app.utils.vector_ipc import run_owner
+
+    socket_path = settings.VECTOR_SOCKET_PATH
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    ctx = multiprocessing.get_context("spawn")
+    owner = ctx.Process(target=run_owner, args=(socket_path,), name="faq-vector-owner", daemon=True)
+    owner.start()
+    _wait_for_socket(socket_path)
+
+    # Worker süreçleri bu env'i miras alır
+    os.environ["VECTOR_MODE"] = "remote"
+    os.environ["VECTOR_SOCKET_PATH"] = socket_path
+    os.environ.setdefault("CACHE_GENERATION_PATH", socket_path + ".cache-gen")
+    os.environ["BOOT_ID"] = uuid.uuid4().hex
+    if os.path.exists(os.environ["CACHE_GENERATION_PATH"]):
+        os.unlink(os.environ["CACHE_GENERATION_PATH"])
+
+    logger.info("Starting %s workers, vector index owner pid=%s", workers, owner.pid)
+    try:
+        uvicorn.run("app.main:app", host=settings.HOST, port=settings.PORT, workers=workers)
+    finally:
+        owner.terminate()
+        owner.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,925 @@
+// === GLOBAL VARIABLES ===
+const form = document.getElementById('qform');
+const dupBox = document.getElementById('dupBox');
+const saveBox = document.getElementById('saveBox');
+const thInput = document.getElementById('th');
+const thLabel = document.getElementById('thLabel');
+const catSel = document.getElementById('categorySel');
+const createdByInput = document.getElementById('created_by');
+
+// Recent modal elements
+const recentModal = document.getElementById('recentModal');
+const recentSearch = document.getElementById('recentSearch');
+const recentClear = document.getElementById('recentClear');
+
+// Stats modal elements
+const statsModal = document.getElementById('statsModal');
+
+// Search query state
+let recentQuery = "";
+
+// === UTILITY FUNCTIONS ===
+function debounce(fn, ms = 300) {
+  let timeout;
+  return (...args) => {
+    clearTimeout(timeout);
+    timeout = setTimeout(() => fn(...args), ms);
+  };
+}
+
+function safeHtml(str) {
+  return String(str ?? '').replace(/[<>]/g, ch => ({'<': '&lt;', '>': '&gt;'}[ch]));
+}
+
+// === THRESHOLD SLIDER ===
+thInput.oninput = () => {
+  thLabel.textContent = Number(thInput.value).toFixed(2);
+};
+
+// === TYPEAHEAD SUGGESTIONS ===
+// Her tuşta bellekteki önek index'i sorgulanır (Ollama çağrısı yok); eski istek iptal edilir
+const questionInput = form.elements['question'];
+const suggestBox = document.getElementById('suggestBox');
+let suggestController = null;
+
+function hideSuggestions() {
+  suggestBox.style.display = 'none';
+  suggestBox.innerHTML = '';
+}
+
+questionInput.addEventListener('input', async () => {
+  const prefix = questionInput.value.trim();
+  if (suggestController) suggestController.abort();
+  if (prefix.length < 2) {
+    hideSuggestions();
+    return;
+  }
+  suggestController = new AbortController();
+  try {
+    const resp = await fetch(`/suggest?prefix=${encodeURIComponent(prefix)}&limit=6`, { signal: suggestController.signal });
+    const d = await resp.json();
+    if (!d.suggestions || !d.suggestions.length) {
+      hideSuggestions();
+      return;
+    }
+    suggestBox.innerHTML = d.suggestions.map(s =>
+      `<li data-id="${s.id}">${safeHtml(s.question)}<small>${safeHtml(s.category)}</small></li>`
+    ).join('');
+    suggestBox.style.display = 'block';
+  } catch (err) {
+    if (err.name !== 'AbortError') hideSuggestions();
+  }
+});
+
+// Öneriye tıklanınca mevcut kaydın detayı açılır (yeniden eklemek yerine güncellensin)
+suggestBox.addEventListener('mousedown', (e) => {
+  const item = e.target.closest('li');
+  if (!item) return;
+  e.preventDefault();
+  hideSuggestions();
+  openDetailModal(Number(item.dataset.id));
+});
+questionInput.addEventListener('blur', hideSuggestions);
+
+// === DUPLICATE CHECK ===
+document.getElementById('btnCheck').onclick = async () => {
+  dupBox.textContent = 'Kontrol ediliyor...';
+  const onlyQ = new FormData();
+  onlyQ.append('question', new FormData(form).get('question'));
+  const question = new FormData(form).get('question');
+
+  // Basit validation
+  if (!question || question.trim().length < 3) {
+    dupBox.innerHTML = '<div class="warn">Lütfen en az 3 karakterlik bir soru yazın!</div>';
+    return;
+  }
+  
+  try {
+    // Kategori seçiliyse önce o kategoride, sonra genelde ara
+    const cat = catSel.value && catSel.value !== '__new__' ? `&category=${encodeURIComponent(catSel.value)}&scope=first` : '';
+    const resp = await fetch(`/check-duplicate?th=${encodeURIComponent(thInput.value)}&k=3&suggest=true${cat}`, { 
+      method: 'POST', 
+      body: onlyQ 
+    });
+    const d = await resp.json();
+    
+    if (d.results && d.results.length) {
+      const items = d.results.map(x => 
+        `<li>${(x.sim || 0).toFixed(2)} — ${safeHtml(x.question)}</li>`
+      ).join('');
+      
+      if (d.duplicate) {
+        dupBox.innerHTML = `<div class="warn"><b>Benzerler (eşik ${d.threshold.toFixed(2)}):</b><ul>${items}</ul></div>`;
+      } else {
+        dupBox.innerHTML = `<div class="ok">Benzer yok (eşik ${d.threshold.toFixed(2)}).<ul>${items}</ul></div>`;
+      }
+    } else {
+      dupBox.innerHTML = `<div class="ok">Kayıt bulunamadı.</div>`;
+    }
+
+    // Kategori seçilmemişse en yakın kategoriyi öner
+    const suggested = (d.suggested_categories || [])[0];
+    if (suggested && !catSel.value && [...catSel.options].some(o => o.value === suggested.category)) {
+      catSel.value = suggested.category;
+      dupBox.insertAdjacentHTML('beforeend',
+        `<div class="ok">Önerilen kategori: <b>${safeHtml(suggested.category)}</b> (${suggested.score.toFixed(2)})</div>`);
+    }
+  } catch (error) {
+    dupBox.innerHTML = `<div class="warn">Kontrol hatası: ${error.message}</div>`;
+  }
+};
+
+// === FORM SUBMISSION ===
+// Aynı kayıt denemesinin tekrarları (çift tıklama, ağ hatası sonrası yeniden gönderim) aynı anahtarı taşır
+let pendingAddKey = null;
+form.addEventListener('input', () => { pendingAddKey = null; });
+
+form.onsubmit = async (e) => {
+    e.preventDefault();
+    const submitBtn = form.querySelector('button[type="submit"]');
+    const originalText = submitBtn.textContent;
+    submitBtn.textContent = 'Kaydediliyor...';
+    submitBtn.disabled = true;
+    
+    try {
+        pendingAddKey = pendingAddKey || (crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`);
+        const resp = await fetch('/add', {
+            method: 'POST',
+            body: new FormData(form),
+            headers: { 'Idempotency-Key': pendingAddKey }
+        });
+        const d = await resp.json();
+        
+        if (resp.status === 409 && d.existing_id) {
+            pendingAddKey = null;
+            saveBox.innerHTML = `<div class="warn">Bu soru zaten kayıtlı (ID ${d.existing_id}). ` +
+                `<a href="#" id="openExisting">Kaydı aç</a></div>`;
+            document.getElementById('openExisting').onclick = (ev) => {
+                ev.preventDefault();
+                openDetailModal(d.existing_id);
+            };
+        } else if (d.ok) {
+            pendingAddKey = null;
+            saveBox.innerHTML = '<div class="ok">Kaydedildi (JSON + DB) ✅</div>';
+            
+            // FORM'U TAMAMEN RESETLE ve SAYFAYI YENİLE
+            form.reset();
+            
+            // Kullanıcı adını localStorage'dan geri yükle
+            const savedUser = localStorage.getItem('faq_studio_user');
+            createdByInput.value = savedUser || 'anonymous';
+            
+            // Kategorileri yeniden yükle
+            await refreshCategories();
+            
+            // Benzer soru kutusunu temizle
+            dupBox.innerHTML = '';
+            
+        } else {
+            saveBox.innerHTML = '<div class="warn">Kaydedilemedi.</div>';
+        }
+    } catch (error) {
+        saveBox.innerHTML = `<div class="warn">Kaydetme hatası: ${error.message}</div>`;
+    } finally {
+        submitBtn.textContent = originalText;
+        submitBtn.disabled = false;
+    }
+};
+
+// === CATEGORY SELECTION ===
+catSel.addEventListener('change', () => {
+  if (catSel.value === '__new__') {
+    const yeni = prompt('Yeni kategori adı:');
+    if (yeni && yeni.trim()) {
+      const opt = document.createElement('option');
+      opt.value = yeni.trim();
+      opt.textContent = yeni.trim();
+      catSel.insertBefore(opt, catSel.lastElementChild);
+      catSel.value = yeni.trim();
+    } else {
+      catSel.value = '';
+    }
+  }
+});
+
+// === CATEGORY MANAGEMENT ===
+// categories.js veya mevcut JavaScript içinde
+function sortCategoriesForDisplay(categories) {
+    return [...categories].sort((a, b) => {
+        if (a.toLowerCase() === 'diger') return 1;
+        if (b.toLowerCase() === 'diger') return -1;
+        return a.localeCompare(b, 'tr');  // ← Alfabetik sırala
+    });
+}
+
+// Kullanım
+async function refreshCategories() {
+    try {
+        const response = await fetch('/categories.json');
+        if (!response.ok) throw new Error('Kategoriler yüklenemedi');
+        
+        const categories = await response.json();
+        const sortedCategories = sortCategoriesForDisplay(categories);
+        updateCategorySelect(sortedCategories);
+        
+    } catch (error) {
+        console.error('Kategori yenileme hatası:', error);
+    }
+}
+
+function updateCategorySelect(categories) {
+    const currentValue = catSel.value;
+    
+    // Tüm option'ları temizle (ilk iki hariç)
+    while (catSel.options.length > 2) {
+        catSel.remove(2);
+    }
+    
+    // Kategorileri özel sırala: diger en sonda, diğerleri alfabetik
+    const sortedCategories = [...categories].sort((a, b) => {
+        if (a.toLowerCase() === 'diger') return 1;
+        if (b.toLowerCase() === 'diger') return -1;
+        return a.localeCompare(b, 'tr');
+    });
+
+    // Sıralanmış kategorileri ekle
+    sortedCategories.forEach(category => {
+        const option = document.createElement('option');
+        option.value = category;
+        option.textContent = category;
+        catSel.add(option);  // Sonuna ekle
+    });
+    
+    // Önceki değeri geri yükle
+    if (currentValue) {
+        catSel.value = currentValue;
+    }
+}
+
+// === RECENT MODAL FUNCTIONS ===
+function openRecentModal() {
+  recentModal.style.display = 'block';
+  recentModal.setAttribute('aria-hidden', 'false');
+}
+
+function closeRecentModal() {
+  recentModal.style.display = 'none';
+  recentModal.setAttribute('aria-hidden', 'true');
+}
+
+async function loadRecentRecords() {
+  const countSpan = document.getElementById('recentCount');
+  const loading = document.getElementById('recentLoading');
+  const table = document.getElementById('recentTable');
+  const tbody = document.getElementById('recentTbody');
+  const errorDiv = document.getElementById('recentError');
+
+  // Reset UI state
+  loading.style.display = 'block';
+  table.style.display = 'none';
+  errorDiv.style.display = 'none';
+  tbody.innerHTML = '';
+
+  try {
+    // Determine URL based on search query
+    const url = recentQuery
+      ? `/questions/search?query=${encodeURIComponent(recentQuery)}&limit=100`
+      : `/questions?limit=100&offset=0`;
+
+    // Fetch data and total count
+    const [dataResponse, totalResponse] = await Promise.all([
+      fetch(url),
+      fetch('/stats/total')
+    ]);
+
+    if (!dataResponse.ok) throw new Error('HTTP ' + dataResponse.status);
+
+    const rows = await dataResponse.json();
+    const total = totalResponse.ok ? (await totalResponse.json()).total : null;
+
+    // Update count display
+    if (countSpan) {
+      countSpan.textContent = total !== null ? `(${total})` : '';
+    }
+
+    // Populate table
+    if (!Array.isArray(rows) || rows.length === 0) {
+      tbody.innerHTML = '<tr><td colspan="6" style="padding:8px;color:#aaa;">Kayıt bulunamadı.</td></tr>';
+    } else {
+      for (const record of rows) {
+        tbody.insertAdjacentHTML('beforeend', recentRowHtml(record));
+      }
+    }
+
+    table.style.display = 'table';
+  } catch (error) {
+    errorDiv.textContent = 'Hata: ' + error.message;
+    errorDiv.style.display = 'block';
+  } finally {
+    loading.style.display = 'none';
+  }
+}
+
+function recentRowHtml(record) {
+  return `<tr data-row-id="${record.id ?? ''}">
+            <td style="border-bottom:1px solid #222;padding:8px;">${record.id ?? ''}</td>
+            <td style="border-bottom:1px solid #222;padding:8px;">${safeHtml(record.question)}</td>
+            <td style="border-bottom:1px solid #222;padding:8px;">${safeHtml(record.category)}</td>
+            <td style="border-bottom:1px solid #222;padding:8px;">${formatDateTime(record.created_at)}</td>
+            <td style="border-bottom:1px solid #222;padding:8px;">${safeHtml(record.created_by || 'anonymous')}</td>
+            <td style="border-bottom:1px solid #222;padding:8px;">
+              <button class="btn-view" data-id="${record.id ?? ''}" style="background:#2ad;color:#000;border:0;padding:6px 10px;cursor:pointer;margin-right:5px;">Görüntüle</button>
+              <button class="btn-del" data-id="${record.id ?? ''}" style="background:#933;color:#fff;border:0;padding:6px 10px;cursor:pointer;">Sil</button>
+            </td>
+          </tr>`;
+}
+
+// Tarih formatlama fonksiyonu
+function formatDateTime(dateTimeStr) {
+    if (!dateTimeStr) return '';
+    
+    try {
+        const date = new Date(dateTimeStr);
+        return date.toLocaleString('tr-TR', {
+            year: 'numeric',
+            month: '2-digit',
+            day: '2-digit',
+            hour: '2-digit',
+            minute: '2-digit'
+        }).replace(',', '');
+    } catch (e) {
+        return dateTimeStr; // Hata durumunda orijinal değeri döndür
+    }
+}
+
+// === STATS MODAL FUNCTIONS ===
+function openStatsModal() {
+  statsModal.style.display = 'block';
+  statsModal.setAttribute('aria-hidden', 'false');
+}
+
+function closeStatsModal() {
+  statsModal.style.display = 'none';
+  statsModal.setAttribute('aria-hidden', 'true');
+}
+
+let chart = null; // Global chart instance
+// Son yüklenen istatistikler: canlı olaylar bunları yerinde günceller
+let statsData = [];
+let statsTotal = 0;
+
+async function loadStatsData() {
+    try {
+        // Tüm paneller tek istekte
+        const summaryResponse = await fetch('/stats/summary');
+        
+        if (!summaryResponse.ok) throw new Error('Kategoriler yüklenemedi');
+        
+        const summary = await summaryResponse.json();
+        const rows = summary.categories || [];
+        const total = summary.total ?? 0;
+        
+        // Veriyi normalize et
+        const data = rows.map(x => ({
+            category: x.category ?? x['category'],
+            cnt: Number(x.cnt ?? x['cnt'] ?? 0)
+        }));
+        
+        statsData = data;
+        statsTotal = total;
+        renderStats();
+        
+    } catch (error) {
+        console.error('İstatistik hatası:', error);
+        alert('İstatistikler yüklenirken hata oluştu: ' + error.message);
+    }
+}
+
+function renderStats() {
+    // ÖZEL SIRALAMA: diger en sonda, diğerleri alfabetik
+    const sortedData = sortCategoriesSpecial(statsData.filter(d => d.cnt > 0));
+
+    // Özet istatistikleri güncelle
+    document.getElementById('totalQuestions').textContent = statsTotal;
+    document.getElementById('totalCategories').textContent = sortedData.length;
+    document.getElementById('avgPerCategory').textContent = 
+        sortedData.length > 0 ? (statsTotal / sortedData.length).toFixed(1) : '0';
+
+    // Chart.js ile pasta grafik oluştur
+    drawPieChart(sortedData);
+}
+
+function drawPieChart(data) {
+    const ctx = document.getElementById('catChart').getContext('2d');
+    
+    // Eski chart'ı temizle - GÜVENLİ VERSİYON
+    if (typeof chart !== 'undefined' && chart !== null) {
+        chart.destroy();
+        chart = null;
+    }
+
+    // Boş veri kontrolü
+    if (data.length === 0 || data.every(item => item.cnt === 0)) {
+        ctx.clearRect(0, 0, ctx.canvas.width, ctx.canvas.height);
+        ctx.fillStyle = '#aaa';
+        ctx.font = '16px system-ui';
+        ctx.textAlign = 'center';
+        ctx.fillText('Henüz veri bulunmamaktadır', ctx.canvas.width / 2, ctx.canvas.height / 2);
+        return;
+    }
+    
+    const labels = data.map(d => d.category);
+    const counts = data.map(d => d.cnt);
+    
+    // Özel renk paleti - diger kategorisi gri olsun
+    const backgroundColors = generateSpecialColors(data);
+
+    // Arka plan rengini koyu yap
+    Chart.defaults.backgroundColor = '#1a1a1a';
+    Chart.defaults.borderColor = '#333';
+    Chart.defaults.color = '#cccccc';
+    
+    chart = new Chart(ctx, {
+        type: 'pie',
+        data: {
+            labels: labels,
+            datasets: [{
+                data: counts,
+                backgroundColor: backgroundColors,
+                borderColor: '#111',
+                borderWidth: 2,
+                hoverOffset: 15
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'left',
+                    labels: {
+                        color: '#cccccc', // Legend yazı rengi
+                        generateLabels(chart) {
+                          // 1) Default label’ları al
+                          const defaults = Chart.overrides.pie.plugins.legend.labels.generateLabels(chart);
+                          const ds = chart.data.datasets[0];
+                          const total = ds.data.reduce((a, b) => a + b, 0);
+                          // 2) Sadece metni zenginleştir
+                          return defaults.map((item, i) => {
+                            const value = ds.data[i];
+                            const pct = total > 0 ? ((value / total) * 100).toFixed(1) : '0';
+                            return {
+                              ...item,                         // ← default stiller (renk vb.) korunur
+                              text: `${chart.data.labels[i]}: ${value} (${pct}%)`,
+                              fillStyle: item.fillStyle,      // Renkleri koru
+                              strokeStyle: item.strokeStyle,
+                              lineWidth: item.lineWidth
+                            };
+                          });
+                        }
+                    }
+                },
+                tooltip: {
+                    backgroundColor: 'rgba(0, 0, 0, 0.8)',
+                    titleColor: '#4ea',
+                    bodyColor: '#cccccc',
+                    borderColor: '#333',
+                    borderWidth: 1,
+                    callbacks: {
+                        label: function(context) {
+                            const total = context.dataset.data.reduce((a, b) => a + b, 0);
+                            const percentage = total > 0 ? ((context.raw / total) * 100).toFixed(1) : '0';
+                            return `${context.label}: ${context.raw} soru (${percentage}%)`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+function generateSpecialColors(data) {
+    const colors = [];
+    const hueStep = 360 / (data.length - 1); // diger hariç
+    
+    data.forEach((item, index) => {
+        if (item.category.toLowerCase() === 'diger') {
+            // diger kategorisi için gri renk
+            colors.push('hsla(0, 0%, 60%, 0.8)');
+        } else {
+            // Diğer kategoriler için canlı renkler
+            const hue = (index * hueStep) % 360;
+            colors.push(`hsla(${hue}, 70%, 60%, 0.8)`);
+        }
+    });
+    
+    return colors;
+}
+
+function sortCategoriesSpecial(categoriesData) {
+    return categoriesData.sort((a, b) => {
+        // 'diger' her zaman en sonda olsun
+        if (a.category.toLowerCase() === 'diger') return 1;
+        if (b.category.toLowerCase() === 'diger') return -1;
+        
+        // Diğer kategorileri alfabetik sırala
+        return b.cnt - a.cnt;
+    });
+}
+
+// Türkçe karakter desteği için localeCompare
+function turkishSort(a, b) {
+    const turkishMap = { 'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u' };
+    const normalize = str => str.toLowerCase().replace(/[çğıöşü]/g, char => turkishMap[char]);
+    return normalize(a).localeCompare(normalize(b), 'tr');
+}
+
+// Dışa aktarma fonksiyonu
+document.getElementById('exportStats').addEventListener('click', function() {
+    if (chart) {        
+        // Chart'ı güncelle
+        chart.update();
+
+        // Canvas'ın kopyasını oluştur
+        const tempCanvas = document.createElement('canvas');
+        tempCanvas.width = chart.canvas.width;
+        tempCanvas.height = chart.canvas.height;
+        const tempCtx = tempCanvas.getContext('2d');
+
+        // Önce koyu arka planı çiz
+        tempCtx.fillStyle = '#1a1a1a';
+        tempCtx.fillRect(0, 0, tempCanvas.width, tempCanvas.height);
+
+        // Sonra chart'ı çiz
+        tempCtx.drawImage(chart.canvas, 0, 0);
+    
+        // Resmi indir
+        const imageLink = document.createElement('a');
+        imageLink.href = tempCanvas.toDataURL('image/png');
+        imageLink.download = 'kategori-istatistikleri.png';
+        document.body.appendChild(imageLink);
+        imageLink.click();
+        document.body.removeChild(imageLink);
+    }
+});
+
+
+// === EVENT LISTENERS ===
+
+// Recent modal events
+document.getElementById('btnRecent').onclick = async () => {
+  openRecentModal();
+  await loadRecentRecords();
+};
+
+document.getElementById('closeRecent').onclick = closeRecentModal;
+document.getElementById('closeRecent2').onclick = closeRecentModal;
+document.getElementById('refreshRecent').onclick = loadRecentRecords;
+
+// Recent modal backdrop click
+recentModal.addEventListener('click', (e) => {
+  if (e.target === recentModal) closeRecentModal();
+});
+
+// Search functionality
+recentSearch.addEventListener('input', debounce(() => {
+  recentQuery = recentSearch.value.trim();
+  loadRecentRecords();
+}, 300));
+
+recentClear.onclick = () => {
+  recentSearch.value = '';
+  recentQuery = '';
+  loadRecentRecords();
+};
+
+// Stats modal events
+document.getElementById('btnStats').onclick = async () => {
+  openStatsModal();
+  await loadStatsData();
+};
+
+document.getElementById('closeStats').onclick = closeStatsModal;
+document.getElementById('closeStats2').onclick = closeStatsModal;
+document.getElementById('refreshStats').onclick = loadStatsData;
+
+// Stats modal backdrop click
+statsModal.addEventListener('click', (e) => {
+  if (e.target === statsModal) closeStatsModal();
+});
+
+// created_by alanı için localStorage desteği
+(function() {
+  // Sayfa yüklendiğinde localStorage'dan kullanıcı adını yükle
+  const savedUser = localStorage.getItem('faq_studio_user');
+  if (savedUser) {
+    createdByInput.value = savedUser;
+  }
+
+  // Kullanıcı adı değiştiğinde localStorage'a kaydet
+  createdByInput.addEventListener('change', function() {
+    if (this.value.trim()) {
+      localStorage.setItem('faq_studio_user', this.value.trim());
+    }
+  });
+})();
+
+// Silme modalı için
+let currentDeleteId = null;
+let currentDeleteQuestion = null;
+
+function showDeleteModal(id, question) {
+  currentDeleteId = id;
+  currentDeleteQuestion = question;
+  
+  document.getElementById('deleteId').textContent = id;
+  document.getElementById('deleteQuestion').textContent = question;
+  
+  // Kullanıcı adını doldur (localStorage'dan)
+  const savedUser = localStorage.getItem('faq_studio_user');
+  document.getElementById('deleterName').value = savedUser || 'anonymous';
+  
+  document.getElementById('deleteModal').style.display = 'block';
+}
+
+function closeDeleteModal() {
+  document.getElementById('deleteModal').style.display = 'none';
+  currentDeleteId = null;
+  currentDeleteQuestion = null;
+}
+
+async function confirmDelete() {
+  const deletedBy = document.getElementById('deleterName').value || 'anonymous';
+  
+  try {
+    const formData = new FormData();
+    formData.append('deleted_by', deletedBy);
+    
+    const response = await fetch(`/questions/${currentDeleteId}`, {
+      method: 'DELETE',
+      body: formData
+    });
+    
+    if (response.ok) {
+      // Canlı bağlantı varsa satır silme olayıyla kalkar; yoksa listeyi yenile
+      if (!liveConnected) await loadRecentRecords();
+      closeDeleteModal();
+    }
+  } catch (error) {
+    alert('Silme hatası: ' + error.message);
+  }
+}
+
+// Sil butonlarını modal'a bağla (soru bilgisini de al)
+document.getElementById('recentTbody').addEventListener('click', async (e) => {
+  const btn = e.target.closest('.btn-del');
+  if (!btn) return;
+  
+  const tr = btn.closest('tr');
+  if (!tr) return;
+  
+  const id = btn.getAttribute('data-id');
+  const question = tr.querySelector('td:nth-child(2)').textContent; // Soru sütunundan al
+  
+  if (id && question) {
+    showDeleteModal(id, question);
+  }
+});
+
+// Sayfa yüklendiğinde kategorileri yükle
+document.addEventListener('DOMContentLoaded', async () => {
+  await refreshCategories();
+});
+
+// Görüntüle butonları için event listener
+document.getElementById('recentTbody').addEventListener('click', async (e) => {
+  const viewBtn = e.target.closest('.btn-view');
+  if (viewBtn) {
+    const id = viewBtn.getAttribute('data-id');
+    if (id) {
+      await openDetailModal(id);
+    }
+    return;
+  }
+  const delBtn = e.target.closest('.btn-del');
+  if (delBtn) {
+    const tr = delBtn.closest('tr');
+    const id = delBtn.getAttribute('data-id');
+    const question = tr.querySelector('td:nth-child(2)').textContent;
+    if (id && question) {
+      showDeleteModal(id, question);
+    }
+  }
+});
+
+// Event listener'ı güncelle
+document.addEventListener('click', function(e) {
+    if (e.target.matches('.btn-del')) {
+        const id = e.target.dataset.id;
+        const row = e.target.closest('tr');
+        const question = row.querySelector('td:nth-child(2)').textContent;
+        openDeleteModal(id, question);
+    } else if (e.target.matches('.btn-view')) {
+        const id = e.target.dataset.id;
+        openDetailModal(id);
+    }
+});
+
+// Detay modalı açma fonksiyonu
+async function openDetailModal(id) {
+    const modal = document.getElementById('detailModal');
+    
+    try {
+        // Soru detaylarını getir
+        const response = await fetch(`/questions/${id}`);
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        
+        const question = await response.json();
+        
+        // Form alanlarını doldur
+        document.getElementById('updateId').value = question.id;
+        document.getElementById('updateQuestion').value = question.question || '';
+        document.getElementById('updateAnswer').value = question.answer || '';
+        document.getElementById('updateKeywords').value = question.keywords || '';
+        document.getElementById('updatedBy').value = '';
+        
+        // Detay bilgileri
+        document.getElementById('detailId').textContent = question.id;
+        document.getElementById('detailCreatedBy').textContent = question.created_by || 'anonymous';
+        document.getElementById('detailCreatedAt').textContent = formatDateTime(question.created_at);
+        
+        // Kategorileri yükle ve seç
+        await loadCategoriesForUpdate();
+        document.getElementById('updateCategory').value = question.category || '';
+        
+        modal.style.display = 'block';
+        
+    } catch (error) {
+        alert('Soru detayları yüklenirken hata oluştu: ' + error.message);
+    }
+}
+
+// Kategorileri güncelleme formu için yükleme
+async function loadCategoriesForUpdate() {
+    try {
+        const response = await fetch('/categories.json');
+        if (!response.ok) return;
+        
+        const categories = await response.json();
+        const select = document.getElementById('updateCategory');
+        
+        // Mevcut seçenekleri temizle (ilk option hariç)
+        const firstOption = select.querySelector('option');
+        select.innerHTML = '';
+        select.appendChild(firstOption);
+        
+        categories.forEach(cat => {
+            const option = document.createElement('option');
+            option.value = cat;
+            option.textContent = cat;
+            select.appendChild(option);
+        });
+        
+    } catch (error) {
+        console.error('Kategoriler yüklenirken hata:', error);
+    }
+}
+
+// Soru güncelleme fonksiyonu
+async function updateQuestion() {
+    const id = document.getElementById('updateId').value;
+    const question = document.getElementById('updateQuestion').value.trim();
+    const answer = document.getElementById('updateAnswer').value.trim();
+    const keywords = document.getElementById('updateKeywords').value.trim();
+    const category = document.getElementById('updateCategory').value;
+    const updatedBy = document.getElementById('updatedBy').value.trim() || 'anonymous';
+    
+    if (!question) {
+        alert('Soru boş olamaz');
+        return;
+    }
+    if (!answer) {
+        alert('Cevap boş olamaz');
+        return;
+    }
+    if (!category) {
+        alert('Kategori seçilmeli');
+        return;
+    }
+    
+    try {
+        const formData = new FormData();
+        formData.append('question', question);
+        formData.append('answer', answer);
+        formData.append('keywords', keywords);
+        formData.append('category', category);
+        formData.append('updated_by', updatedBy);
+        
+        // PATCH: sunucu kayıtla karşılaştırır, soru metni değişmediyse embedding hesaplanmaz
+        const response = await fetch(`/questions/${id}`, {
+            method: 'PATCH',
+            body: formData
+        });
+        
+        if (!response.ok) throw new Error('HTTP ' + response.status);
+        
+        alert('Soru başarıyla güncellendi!');
+        closeDetailModal();
+        
+        // Listeyi yenile (canlı bağlantı varsa satır güncelleme olayıyla yamanır)
+        if (!liveConnected && document.getElementById('recentModal').style.display !== 'none') {
+            await loadRecentRecords();
+        }
+        
+    } catch (error) {
+        alert('Güncelleme hatası: ' + error.message);
+    }
+}
+
+// Detay modalını kapatma
+function closeDetailModal() {
+    document.getElementById('detailModal').style.display = 'none';
+}
+
+// === LIVE UPDATES (Server-Sent Events) ===
+// Yazmalardan sonra liste ve istatistikler tam yeniden çekilmez; olaylarla yerinde güncellenir
+let liveConnected = false;
+
+function isOpen(modal) {
+  return modal.style.display === 'block';
+}
+
+function applyLiveChange(ev) {
+  // Embedding modeli değişimi: arayüzde gösterilecek bir şey yok
+  if (ev.op === 'model') return;
+  // Toplam ve kategori sayıları
+  statsTotal = ev.total ?? statsTotal;
+  for (const [category, delta] of Object.entries(ev.delta || {})) {
+    const item = statsData.find(d => d.category === category);
+    if (item) item.cnt += delta;
+    else if (delta > 0) statsData.push({ category, cnt: delta });
+  }
+  if (isOpen(statsModal)) renderStats();
+
+  const countSpan = document.getElementById('recentCount');
+  if (countSpan && ev.total !== undefined) countSpan.textContent = `(${ev.total})`;
+
+  // Toplu kategori işlemi: satırlar olayda yok, açık liste ve kategori seçimi bir kez yenilenir
+  if (ev.count !== undefined) {
+    if (isOpen(recentModal)) loadRecentRecords();
+    refreshCategories();
+    return;
+  }
+
+  // Son kayıtlar tablosu (arama sonuçları olaydan türetilemez: sadece silme uygulanır)
+  const tbody = document.getElementById('recentTbody');
+  const row = tbody.querySelector(`tr[data-row-id="${ev.id}"]`);
+  if (ev.op === 'delete') {
+    if (row) row.remove();
+  } else if (ev.op === 'update' && row) {
+    row.children[1].textContent = ev.question ?? row.children[1].textContent;
+    row.children[2].textContent = ev.category;
+  } else if (ev.op === 'add' && !recentQuery) {
+    tbody.insertAdjacentHTML('afterbegin', recentRowHtml({
+      id: ev.id, question: ev.question, category: ev.category,
+      created_at: new Date(ev.ts * 1000).toISOString(), created_by: ev.created_by
+    }));
+    while (tbody.rows.length > 100) tbody.lastElementChild.remove();
+  }
+
+  // Yeni kategori eklendiyse seçim listesini güncelle
+  if (ev.category && ![...catSel.options].some(o => o.value === ev.category)) {
+    refreshCategories();
+  }
+}
+
+// (Yeniden) bağlanınca veya olay kaçırılınca açık görünümler bir kez tam yüklenir
+function resyncViews() {
+  if (isOpen(recentModal)) loadRecentRecords();
+  if (isOpen(statsModal)) loadStatsData();
+  refreshCategories();
+}
+
+(function connectLiveEvents() {
+  if (!window.EventSource) return;
+  const source = new EventSource('/events');
+  let connectedOnce = false;
+  source.addEventListener('hello', () => {
+    liveConnected = true;
+    if (connectedOnce) resyncViews();
+    connectedOnce = true;
+  });
+  source.addEventListener('resync', () => {
+    liveConnected = false;
+    resyncViews();
+  });
+  source.addEventListener('change', (e) => {
+    try {
+      applyLiveChange(JSON.parse(e.data));
+    } catch (error) {
+      console.error('Canlı olay hatası:', error);
+    }
+  });
+  // Tarayıcı retry süresi sonunda kendisi yeniden bağlanır
+  source.onerror = () => { liveConnected = false; };
+})();
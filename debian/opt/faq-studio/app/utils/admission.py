@@ -0,0 +1,188 @@
+import asyncio
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+from app.logger import logger
+from app.config import settings
+
+
+class AdmissionRejected(Exception):
+    """Lane kuyruğu dolu veya bekleme süresi doldu: istek reddedilir (503)"""
+
+    def __init__(self, lane: str, retry_after: int, reason: str):
+        super().__init__(f"{lane} lane {reason}")
+        self.lane = lane
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class DeadlineExceeded(Exception):
+    """İstemcinin zaman bütçesi bitti: iş yarıda bırakılır (504)"""
+
+
+class Deadline:
+    """İstek için mutlak bitiş zamanı (time.monotonic)"""
+
+    HEADER = "X-Request-Timeout"
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_request(cls, request) -> "Deadline":
+        """X-Request-Timeout (saniye) header'ından; yoksa/büyükse REQUEST_TIMEOUT"""
+        budget = float(settings.REQUEST_TIMEOUT)
+        raw = request.headers.get(cls.HEADER)
+        if raw:
+            try:
+                budget = min(budget, max(0.0, float(raw)))
+            except ValueError:
+                pass
+        return cls(budget)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self):
+        """Bütçe bittiyse DeadlineExceeded fırlatır"""
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("request deadline exceeded")
+
+
+@dataclass
+class Lane:
+    priority: int      # küçük olan önce
+    max_queue: int     # bu kadar bekleyen varsa yenisi reddedilir
+    max_active: int    # lane'in aynı anda tutabileceği slot sayısı
+
+
+class PriorityGate:
+    """Embedding işleri için öncelikli, sınırlı kuyruklu eşzamanlılık kapısı
+
+    Toplam `capacity` slot lane'ler arasında paylaşılır. Slot boşaldığında en
+    yüksek öncelikli bekleyen alır; bulk lane kendi max_active sınırı nedeniyle
+    interaktif işlere her zaman yer bırakır. Süreç başınadır (WORKERS>1 iken
+    toplam sınır capacity * WORKERS olur).
+    """
+
+    def __init__(self, capacity: int, lanes: dict[str, Lane]):
+        self.capacity = capacity
+        self.lanes = lanes
+        self._active = {name: 0 for name in lanes}
+        self._queued = {name: 0 for name in lanes}
+        self._waiters = []  # [priority, seq, lane, future]
+        self._seq = itertools.count()
+        self._hold_ewma = 1.0  # saniye, Retry-After tahmini için
+        self.shed = {name: 0 for name in lanes}
+
+    def _can_take(self, lane: str) -> bool:
+        return (sum(self._active.values()) < self.capacity
+                and self._active[lane] < self.lanes[lane].max_active)
+
+    def _wake(self):
+        """Boş slotları öncelik sırasına göre bekleyenlere ver"""
+        self._waiters.sort(key=lambda w: (w[0], w[1]))
+        for waiter in list(self._waiters):
+            lane, fut = waiter[2], waiter[3]
+            if fut.done():
+                self._waiters.remove(waiter)
+                continue
+            if self._can_take(lane):
+                self._waiters.remove(waiter)
+                self._active[lane] += 1
+                fut.set_result(None)
+
+    def retry_after(self, lane: str) -> int:
+        """Kuyruğun boşalması için kaba tahmin (saniye)"""
+        backlog = sum(self._queued.values()) + 1
+        return max(1, math.ceil(self._hold_ewma * backlog / self.capacity))
+
+    def _reject(self, lane: str, reason: str):
+        self.shed[lane] += 1
+        logger.warning("Admission rejected lane=%s reason=%s queued=%s active=%s",
+                       lane, reason, self._queued, self._active)
+        raise AdmissionRejected(lane, self.retry_after(lane), reason)
+
+    async def acquire(self, lane: str, timeout: float):
+        cfg = self.lanes[lane]
+        higher_waiting = any(w[0] <= cfg.priority and not w[3].done() for w in self._waiters)
+        if not higher_waiting and self._can_take(lane):
+            self._active[lane] += 1
+            return
+        if self._queued[lane] >= cfg.max_queue:
+            self._reject(lane, "queue full")
+
+        fut = asyncio.get_running_loop().create_future()
+        waiter = [cfg.priority, next(self._seq), lane, fut]
+        self._waiters.append(waiter)
+        self._queued[lane] += 1
+        try:
+            await asyncio.wait_for(fut, timeout=max(0.0, timeout))
+        except asyncio.TimeoutError:
+            self._reject(lane, "queue timeout")
+        except BaseException:
+            # Slot tam iptal anında verildiyse geri bırak
+            if fut.done() and not fut.cancelled():
+                self.release(lane, 0.0)
+            raise
+        finally:
+            self._queued[lane] -= 1
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, lane: str, held: float):
+        self._active[lane] -= 1
+        if held:
+            self._hold_ewma = 0.8 * self._hold_ewma + 0.2 * held
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, lane: str, deadline: Optional[Deadline] = None):
+        """Slot alır; kuyrukta en fazla EMBED_QUEUE_TIMEOUT veya kalan bütçe kadar bekler"""
+        if deadline is not None:
+            deadline.check()
+        wait = settings.EMBED_QUEUE_TIMEOUT
+        if deadline is not None:
+            wait = min(wait, deadline.remaining())
+        try:
+            await self.acquire(lane, wait)
+        except AdmissionRejected:
+            # Bekleme, kuyruk değil istemci bütçesi yüzünden bittiyse 504
+            if deadline is not None and deadline.remaining() <= 0:
+                raise DeadlineExceeded("request deadline exceeded while queued") from None
+            raise
+        started = time.monotonic()
+        try:
+            if deadline is not None:
+                deadline.check()
+            yield
+        finally:
+            self.release(lane, time.monotonic() - started)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "active": dict(self._active),
+            "queued": dict(self._queued),
+            "shed": dict(self.shed),
+        }
+
+
+# Global instance
+embed_gate = PriorityGate(
+    capacity=settings.EMBED_CONCURRENCY,
+    lanes={
+        # Kullanıcının beklediği benzerlik kontrolleri
+        "interactive": Lane(priority=0, max_queue=settings.EMBED_QUEUE_INTERACTIVE,
+                            max_active=settings.EMBED_CONCURRENCY),
+        # Kayıt ekleme / güncelleme
+        "write": Lane(priority=1, max_queue=settings.EMBED_QUEUE_WRITE,
+                      max_active=settings.EMBED_CONCURRENCY),
+        # Arka plan işleri (toplu yeniden embedding vb.)
+        "bulk": Lane(priority=2, max_queue=settings.EMBED_QUEUE_BULK,
+                     max_active=min(settings.EMBED_BULK_CONCURRENCY, settings.EMBED_CONCURRENCY)),
+    },
+)
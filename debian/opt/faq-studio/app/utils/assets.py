@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import mimetypes
+import pathlib
+from typing import Dict, Optional, Tuple
+from app.logger import logger
+
+try:
+    import brotli
+except ImportError:  # brotli kurulu değilse sadece gzip varyantı sunulur
+    brotli = None
+
+STATIC_DIR = pathlib.Path(__file__).parent.parent / "static"
+STATIC_PREFIX = "/static/"
+# Bu boyutun altındaki dosyalar sıkıştırılmaz
+COMPRESS_MIN_SIZE = 256
+
+
+class StaticAsset:
+    """Bellekte tutulan, önceden sıkıştırılmış tek bir statik dosya"""
+
+    def __init__(self, name: str, body: bytes):
+        self.name = name
+        self.media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type == "application/javascript":
+            self.media_type += "; charset=utf-8"
+        digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        stem, dot, ext = name.rpartition(".")
+        self.fingerprinted = f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+        self.etag = f'"{digest}"'
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= COMPRESS_MIN_SIZE:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=11)
+
+    def select(self, accept_encoding: str) -> Tuple[str, bytes]:
+        """İstemcinin kabul ettiği en küçük varyantı seçer"""
+        accepted = {e.split(";")[0].strip().lower() for e in accept_encoding.split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.variants:
+                return encoding, self.variants[encoding]
+        return "identity", self.variants["identity"]
+
+
+class AssetManager:
+    """static/ dizinindeki dosyaları parmak izli adlarla sunar
+
+    İçerik hash'i URL'de olduğu için dosyalar süresiz (immutable) önbelleklenebilir;
+    dosya değişince yeni bir URL oluşur.
+    """
+
+    def __init__(self, directory: pathlib.Path):
+        self.directory = directory
+        self._by_name: Dict[str, StaticAsset] = {}
+        self._by_url: Dict[str, StaticAsset] = {}
+        self.load()
+
+    def load(self):
+        """Dosyaları okur, parmak izlerini ve sıkıştırılmış varyantlarını hesaplar"""
+        by_name, by_url = {}, {}
+        if self.directory.is_dir():
+            for path in sorted(self.directory.rglob("*")):
+                if not path.is_file():
+                    continue
+                name = path.relative_to(self.directory).as_posix()
+                asset = StaticAsset(name, path.read_bytes())
+                by_name[name] = asset
+                by_url[asset.fingerprinted] = asset
+        self._by_name, self._by_url = by_name, by_url
+        logger.debug("Static assets loaded: %s files (brotli=%s)", len(by_name), brotli is not None)
+
+    def url(self, name: str) -> str:
+        """Template'ler için: dosyanın parmak izli URL'si"""
+        asset = self._by_name.get(name)
+        if asset is None:
+            logger.warning("Unknown static asset: %s", name)
+            return STATIC_PREFIX + name
+        return STATIC_PREFIX + asset.fingerprinted
+
+    def lookup(self, path: str) -> Tuple[Optional[StaticAsset], bool]:
+        """URL yolundaki dosyayı bulur; ikinci değer adın parmak izli olup olmadığı"""
+        asset = self._by_url.get(path)
+        if asset is not None:
+            return asset, True
+        return self._by_name.get(path), False
+
+
+# Global instance
+asset_manager = AssetManager(STATIC_DIR)
+
+
+# Convenience functions
+def asset_url(name: str) -> str:
+    """Kısa kullanım için wrapper"""
+    return asset_manager.url(name)
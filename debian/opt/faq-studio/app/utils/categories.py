@@ -1,7 +1,7 @@
 import json
 import pathlib
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 from app.logger import logger
 from app.config import settings
 
@@ -13,6 +13,9 @@ class CategoryManager:
         self.file_path = pathlib.Path(self.categories_path)
         # Hard-coded default kategorileri TAMAMEN KALDIR
         self.default_categories = ["tahakkuk", "tahsilat", "diger"]  # Minimal fallback
+        # Dosya değişmedikçe (mtime) tekrar okunmaz; diğer worker'ların yazmaları mtime'ı değiştirir
+        self._cache: Optional[List[str]] = None
+        self._cache_mtime: Optional[int] = None
     
     def ensure_file_exists(self):
         """Kategori dosyasının var olduğundan emin olur"""
@@ -40,13 +43,25 @@ class CategoryManager:
         # Fallback: hard-coded minimal kategoriler
         return self.default_categories.copy()
     
+    @property
+    def version(self) -> Optional[int]:
+        """Kategori dosyasının sürümü (mtime); dosya yoksa None"""
+        try:
+            return self.file_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
     def load_categories(self) -> List[str]:
-        """Kategorileri yükler"""
+        """Kategorileri yükler (bellekteki kopyanın kopyası döner)"""
+        mtime = self.version
+        if mtime is not None and mtime == self._cache_mtime:
+            return list(self._cache)
         try:
-            if self.file_path.exists():
+            if mtime is not None:
                 raw = self.file_path.read_text(encoding="utf-8-sig").strip()
                 if raw:
-                    return json.loads(raw)
+                    self._cache, self._cache_mtime = json.loads(raw), mtime
+                    return list(self._cache)
         except (json.JSONDecodeError, FileNotFoundError) as e:
             logger.error("Error loading categories: %s", e)
         
@@ -74,21 +89,18 @@ class CategoryManager:
             json.dumps(sorted_cats, ensure_ascii=False, indent=2), 
             encoding="utf-8"
         )
+        self._cache, self._cache_mtime = sorted_cats, self.version
         logger.debug("Categories saved: %s items", len(sorted_cats))
     
     def add_category(self, category: str) -> bool:
         """Yeni kategori ekler, zaten varsa False döndürür"""
         categories = self.load_categories()
-        print(f"DEBUG: Mevcut kategoriler: {categories}")  # ← DEBUG EKLE
-        print(f"DEBUG: Eklenmek istenen: {category}")      # ← DEBUG EKLE
     
         if category not in categories:
             categories.append(category)
             self.save_categories(categories)
-            print(f"DEBUG: Kategori eklendi: {category}")  # ← DEBUG EKLE
             logger.info("Category added: %s (total: %s)", category, len(categories))
             return True
-        print(f"DEBUG: Kategori zaten var: {category}")    # ← DEBUG EKLE
         logger.debug("Category already exists: %s", category)
         return False
     
@@ -103,6 +115,15 @@ class CategoryManager:
         logger.debug("Category not found for removal: %s", category)
         return False
     
+    def replace_categories(self, removed: List[str], added: str) -> List[str]:
+        """Toplu yeniden adlandırma/birleştirme: eski adları çıkarıp yenisini tek yazmada ekler"""
+        categories = [c for c in self.load_categories() if c not in removed]
+        if added not in categories:
+            categories.append(added)
+        self.save_categories(categories)
+        logger.info("Categories replaced: %s -> %s (total: %s)", removed, added, len(categories))
+        return categories
+
     def category_exists(self, category: str) -> bool:
         """Kategorinin var olup olmadığını kontrol eder"""
         exists = category in self.load_categories()
@@ -119,6 +140,10 @@ def load_categories() -> List[str]:
     logger.debug("Categories loaded: %s items", len(categories))
     return categories
 
+def categories_version():
+    """Kısa kullanım için wrapper"""
+    return category_manager.version
+
 def ensure_categories_file():
     """Kısa kullanım için wrapper"""
     category_manager.ensure_file_exists()
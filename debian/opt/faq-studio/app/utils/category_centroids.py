@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import List, Dict, Any
+import numpy as np
+from app.db import get_conn
+from app.logger import logger
+from app.utils.embeddings import vector_to_numpy
+from app.utils.http_cache import response_cache
+
+# Yazma olmasa da bu sürede bir yenile (başka bir yoldan yapılan değişiklikler için)
+REFRESH_INTERVAL = 60.0
+
+
+class CategoryCentroids:
+    """Kategori merkezlerinin bellekteki kopyası (C x D normalize matris)
+
+    Toplamlar category_centroids tablosunda trigger'larla tutulur; burada sadece
+    okunur. Yazmalar response cache sürümünü artırdığı için sürüm değişince
+    yeniden yüklenir (tüm worker'larda).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories: List[str] = []
+        self._counts = np.empty(0, dtype=np.int64)
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._generation = None
+        self._loaded_at = 0.0
+
+    def _load(self):
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT category, vec_sum, cnt FROM category_centroids WHERE cnt > 0 ORDER BY category")
+            rows = cur.fetchall()
+        categories = [r["category"] for r in rows]
+        counts = np.array([r["cnt"] for r in rows], dtype=np.int64)
+        if rows:
+            matrix = np.stack([vector_to_numpy(r["vec_sum"]) for r in rows])
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            matrix /= norms
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+        self._categories, self._counts, self._matrix = categories, counts, matrix
+        logger.debug("Category centroids loaded: %s categories", len(categories))
+
+    def _ensure_fresh(self):
+        generation = response_cache.generation
+        if generation == self._generation and time.monotonic() - self._loaded_at < REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if generation == self._generation and time.monotonic() - self._loaded_at < REFRESH_INTERVAL:
+                return
+            self._load()
+            self._generation = generation
+            self._loaded_at = time.monotonic()
+
+    def suggest(self, embedding: np.ndarray, k: int = 3) -> List[Dict[str, Any]]:
+        """Embedding'e en yakın k kategori (cosine), merkez karşılaştırmasıyla"""
+        self._ensure_fresh()
+        categories, counts, matrix = self._categories, self._counts, self._matrix
+        if not categories:
+            return []
+        q = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+        scores = matrix @ (q / norm)
+        k = min(k, len(categories))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"category": categories[i], "score": round(float(scores[i]), 4), "count": int(counts[i])}
+            for i in top
+        ]
+
+    def rebuild(self):
+        """Toplamları tablodan yeniden hesaplar (kayan nokta birikimine karşı)"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT category_centroids_rebuild()")
+            conn.commit()
+        with self._lock:
+            self._generation = None
+
+
+# Global instance
+category_centroids = CategoryCentroids()
+
+
+# Convenience functions
+def suggest_categories(embedding: np.ndarray, k: int = 3) -> List[Dict[str, Any]]:
+    """Kısa kullanım için wrapper"""
+    return category_centroids.suggest(embedding, k)
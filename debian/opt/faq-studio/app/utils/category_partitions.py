@@ -0,0 +1,198 @@
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from app.logger import logger
+
+# Kategori başına ayrı (id + embedding) koleksiyon; kategori adı koleksiyon metadata'sında
+PARTITION_PREFIX = "faq_cat_"
+BACKFILL_BATCH_SIZE = 500
+
+
+def partition_name(category: str) -> str:
+    """Chroma koleksiyon adları ASCII olmalı: kategori adının hash'i kullanılır"""
+    return PARTITION_PREFIX + hashlib.blake2b(category.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class CategoryPartitions:
+    """Kategori filtreli aramalar için kategori başına HNSW index'leri
+
+    Filtreli bir arama sadece o kategorinin vektörlerini dolaşır. Bölümler ana
+    koleksiyondaki embedding'lerden doldurulur (Ollama çağrılmaz); dolum bitene
+    kadar ready False'tur ve aramalar ana koleksiyonda metadata filtresiyle yapılır.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._collections: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._building = False
+        self.ready = False
+        for collection in client.list_collections():
+            if collection.name.startswith(PARTITION_PREFIX):
+                category = (collection.metadata or {}).get("category")
+                if category is not None:
+                    self._collections[category] = client.get_collection(collection.name)
+
+    def get(self, category: str, create: bool = False):
+        with self._lock:
+            collection = self._collections.get(category)
+            if collection is None and create:
+                collection = self.client.get_or_create_collection(
+                    name=partition_name(category),
+                    metadata={"hnsw:space": "cosine", "category": category},
+                )
+                self._collections[category] = collection
+            return collection
+
+    def count(self) -> int:
+        with self._lock:
+            collections = list(self._collections.values())
+        return sum(c.count() for c in collections)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {category: c.count() for category, c in self._collections.items()}
+
+    def upsert(self, rows: List[Dict[str, Any]]):
+        """rows: id, category, embedding; kategoriye göre gruplanıp yazılır"""
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            groups.setdefault(row["category"], []).append(row)
+        for category, group in groups.items():
+            self.get(category, create=True).upsert(
+                ids=[str(r["id"]) for r in group],
+                embeddings=[r["embedding"] for r in group],
+            )
+
+    def delete(self, question_id: int, category: Optional[str] = None):
+        """Kategori bilinmiyorsa tüm bölümlerden silinir"""
+        if category is not None:
+            collections = [c for c in [self.get(category)] if c is not None]
+        else:
+            with self._lock:
+                collections = list(self._collections.values())
+        for collection in collections:
+            collection.delete(ids=[str(question_id)])
+
+    def move(self, moved: List[Tuple[int, str]], target: str, source, batch_size: int = BACKFILL_BATCH_SIZE):
+        """(id, eski kategori) kayıtlarını target bölümüne taşır; vektörler source koleksiyonundan okunur"""
+        for start in range(0, len(moved), batch_size):
+            batch = moved[start:start + batch_size]
+            found = source.get(ids=[str(qid) for qid, _ in batch], include=["embeddings"])
+            self.upsert([
+                {"id": qid, "category": target, "embedding": embedding}
+                for qid, embedding in zip(found["ids"], found["embeddings"])
+            ])
+            by_old: Dict[str, List[str]] = {}
+            for qid, old in batch:
+                by_old.setdefault(old, []).append(str(qid))
+            for old, ids in by_old.items():
+                collection = self.get(old)
+                if collection is not None:
+                    collection.delete(ids=ids)
+        # Boşalan bölümleri kaldır (birleştirilen/yeniden adlandırılan kategoriler)
+        for old in {old for _, old in moved}:
+            collection = self.get(old)
+            if collection is not None and collection.count() == 0:
+                with self._lock:
+                    self._collections.pop(old, None)
+                self.client.delete_collection(collection.name)
+
+    def query(self, category: str, embedding: List[float], top_k: int) -> List[Tuple[int, float]]:
+        """(id, benzerlik) listesi; bölüm yoksa boş"""
+        collection = self.get(category)
+        if collection is None:
+            return []
+        size = collection.count()
+        if size == 0:
+            return []
+        results = collection.query(query_embeddings=[embedding], n_results=min(top_k, size), include=["distances"])
+        return [(int(qid), 1 - distance) for qid, distance in zip(results["ids"][0], results["distances"][0])]
+
+    def drop_all(self):
+        """Bölümleri siler (ör. embedding modeli değişince yeniden kurulur)"""
+        with self._lock:
+            collections, self._collections = list(self._collections.values()), {}
+            self.ready = False
+        for collection in collections:
+            self.client.delete_collection(collection.name)
+
+    def _snapshot(self, source) -> Tuple[Dict[str, List[str]], Dict[str, Optional[str]]]:
+        """(bölüm kategorisi -> id'ler, kaynak id -> kategori)
+
+        Bölümlerin id'leri kaynaktan önce okunur: yazmalar önce kaynağa (ana koleksiyon),
+        sonra bölümlere gider. Bölümde görülen bir kayıt kaynakta da görülür; arada
+        eklenen veya taşınan bir soru yanlışlıkla silinmez.
+        """
+        with self._lock:
+            collections = dict(self._collections)
+        placed = {category: collection.get(include=[])["ids"] for category, collection in collections.items()}
+        current = source.get(include=["metadatas"])
+        categories = {
+            qid: (metadata or {}).get("category") for qid, metadata in zip(current["ids"], current["metadatas"])
+        }
+        return placed, categories
+
+    def _prune(self, placed: Dict[str, List[str]], categories: Dict[str, Optional[str]]) -> int:
+        """Kaynakta olmayan (silinmiş) ve kategorisi kaynaktakiyle uyuşmayan (taşınmış) kayıtları siler"""
+        stale = 0
+        for category, ids in placed.items():
+            dead = [i for i in ids if categories.get(i) != category]
+            if dead:
+                collection = self.get(category)
+                if collection is not None:
+                    collection.delete(ids=dead)
+                stale += len(dead)
+        return stale
+
+    def backfill(self, source) -> int:
+        """Bölümleri ana koleksiyonla eşitler: eksik vektörleri kopyalar, fazlaları siler, ready'yi açar
+
+        Sayı karşılaştırması yeterli değildir (yanlış bölümdeki bir kayıt toplamı bozmaz);
+        her kaydın kategorisi kaynağın metadata'sıyla karşılaştırılır. Embedding'ler sadece
+        eksik kayıtlar için okunur.
+        """
+        placed, categories = self._snapshot(source)
+        present = {category: set(ids) for category, ids in placed.items()}
+        missing = [
+            qid for qid, category in categories.items()
+            if category is not None and qid not in present.get(category, ())
+        ]
+        copied = 0
+        for start in range(0, len(missing), BACKFILL_BATCH_SIZE):
+            batch = source.get(ids=missing[start:start + BACKFILL_BATCH_SIZE], include=["embeddings", "metadatas"])
+            rows = [
+                {"id": qid, "category": metadata["category"], "embedding": embedding}
+                for qid, embedding, metadata in zip(batch["ids"], batch["embeddings"], batch["metadatas"])
+                if metadata and metadata.get("category") is not None
+            ]
+            self.upsert(rows)
+            copied += len(rows)
+
+        # Kopyalama sırasında kategorisi değişen bir soru eski bölümüne yazılmış olabilir:
+        # kopyalama olduysa karşılaştırma güncel görüntüyle yapılır
+        if copied:
+            placed, categories = self._snapshot(source)
+        stale = self._prune(placed, categories)
+        self.ready = True
+        logger.info("Category partitions synced: %s vectors copied to %s partitions, %s stale removed",
+                    copied, len(placed), stale)
+        return copied
+
+    def start_backfill(self, source_getter) -> bool:
+        """Arka planda doldurur; source_getter o anki ana koleksiyonu döndürür"""
+        with self._lock:
+            if self._building:
+                return False
+            self._building = True
+
+        def run():
+            try:
+                self.backfill(source_getter())
+            except Exception as e:
+                logger.error("Category partition backfill failed: %s", e)
+            finally:
+                self._building = False
+
+        threading.Thread(target=run, name="chroma-category-partitions", daemon=True).start()
+        return True
@@ -1,10 +1,23 @@
 import chromadb
+import threading
 import numpy as np
 from typing import List, Dict, Any, Optional
 from app.logger import logger
 from app.config import settings
+from app.db import get_conn
+from app.repository import repository
+from app.utils.category_partitions import CategoryPartitions
 import os
 
+FULL_COLLECTION = "faq_questions"
+# Sadece id + kategori; diğer alanlar Postgres'ten okunur
+SLIM_COLLECTION = "faq_questions_slim"
+MIGRATION_BATCH_SIZE = 500
+# Yeniden embedding sırasında yeni model vektörlerinin yazıldığı gölge koleksiyon eki
+SHADOW_SUFFIX = "__next"
+# Toplu metadata güncellemelerinde tek çağrıdaki kayıt sayısı
+RECATEGORIZE_BATCH_SIZE = 1000
+
 class ChromaService:
     """ChromaDB ile vektör arama servisi"""
     
@@ -14,12 +27,66 @@ class ChromaService:
         # self.client = chromadb.PersistentClient(path=chroma_path)
         chroma_path = settings.CHROMA_DB_PATH
         self.client = chromadb.PersistentClient(path=chroma_path)
-        self.collection = self.client.get_or_create_collection(
-            name="faq_questions",
-            metadata={"hnsw:space": "cosine"}  # Cosine similarity kullan
-        )
+        self.slim = settings.CHROMA_SLIM
+        self.collection = self._get_collection(SLIM_COLLECTION if self.slim else FULL_COLLECTION)
+        # Online migration sırasında: okumalar eski koleksiyondan, yazmalar ikisine birden
+        self._migration_target = None
+        self._lock = threading.Lock()
+        self._migrating = False
         self.embedding_model = None
+        # Kategori filtreli aramalar için kategori başına index'ler
+        self.partitions = CategoryPartitions(self.client)
+
+        # Diğer düzende dolu bir koleksiyon varsa migration bitene kadar onu kullan
+        other_name = FULL_COLLECTION if self.slim else SLIM_COLLECTION
+        other = self._existing_collection(other_name)
+        if other is not None and other.count() > 0:
+            self._migration_target = self.collection
+            self.collection = other
+            logger.info("ChromaDB layout change pending: %s -> %s", other_name, self._migration_target.name)
         logger.info(f"ChromaDB initialized at {chroma_path}")
+
+    def _get_collection(self, name: str):
+        return self.client.get_or_create_collection(
+            name=name,
+            metadata={"hnsw:space": "cosine"}  # Cosine similarity kullan
+        )
+
+    def _existing_collection(self, name: str):
+        if name not in [c.name for c in self.client.list_collections()]:
+            return None
+        return self.client.get_collection(name)
+
+    @staticmethod
+    def _is_slim(collection) -> bool:
+        return collection.name.startswith(SLIM_COLLECTION)
+
+    def _write_targets(self) -> list:
+        """Yazmaların gideceği koleksiyonlar (migration sırasında iki tane)"""
+        with self._lock:
+            targets = [self.collection]
+            if self._migration_target is not None:
+                targets.append(self._migration_target)
+        return targets
+
+    @staticmethod
+    def _payload(collection, rows: List[Dict[str, Any]]) -> dict:
+        """Koleksiyon düzenine göre add() argümanları"""
+        payload = {
+            "ids": [str(r["id"]) for r in rows],
+            "embeddings": [r["embedding"] for r in rows],
+        }
+        if ChromaService._is_slim(collection):
+            payload["metadatas"] = [{"category": r["category"]} for r in rows]
+        else:
+            payload["metadatas"] = [{
+                "id": str(r["id"]),
+                "answer": r["answer"],
+                "keywords": r["keywords"],
+                "category": r["category"]
+            } for r in rows]
+            payload["documents"] = [r["question"] for r in rows]
+        return payload
     
     def initialize_embeddings(self, embedding_function):
         """Embedding fonksiyonunu ayarla"""
@@ -38,19 +105,17 @@ class ChromaService:
                     logger.debug("Question %s already exists in ChromaDB, skipping", question_id)
                 return False  # Eklenmedi
             
-            metadata = {
-                "id": str(question_id),
+            row = {
+                "id": question_id,
+                "question": question,
                 "answer": answer,
                 "keywords": keywords,
-                "category": category
+                "category": category,
+                "embedding": embedding
             }
-            
-            self.collection.add(
-                ids=[str(question_id)],
-                embeddings=[embedding],
-                metadatas=[metadata],
-                documents=[question]
-            )
+            for collection in self._write_targets():
+                collection.add(**self._payload(collection, [row]))
+            self.partitions.upsert([row])
             
             logger.debug("Question added to ChromaDB: id=%s", question_id)
             return True  # Eklendi
@@ -59,11 +124,138 @@ class ChromaService:
             logger.error("Error adding question %s to ChromaDB: %s", question_id, e)
             return False
     
+    def update_question(self, question_id: int, question: str, answer: str, keywords: str, category: str,
+                        embedding: Optional[List[float]] = None, old_category: Optional[str] = None) -> bool:
+        """Kaydı yerinde günceller; embedding verilmezse sadece metadata/doküman değişir (vektör korunur)"""
+        try:
+            row = {
+                "id": question_id,
+                "question": question,
+                "answer": answer,
+                "keywords": keywords,
+                "category": category,
+                "embedding": embedding
+            }
+            category_changed = old_category is not None and old_category != category
+            for collection in self._write_targets():
+                payload = self._payload(collection, [row])
+                if embedding is not None:
+                    collection.upsert(**payload)
+                    continue
+                if self._is_slim(collection):
+                    # Slim düzende sadece kategori tutulur: diğer alanlar değiştiyse yapılacak iş yok
+                    if category_changed:
+                        collection.update(ids=payload["ids"], metadatas=payload["metadatas"])
+                    continue
+                # Embedding'siz verilen documents'ı Chroma koleksiyonun embedding fonksiyonuyla
+                # (varsayılan 384 boyutlu model) yeniden embed eder: kayıtlı vektör aynen gönderilir
+                stored = collection.get(ids=payload["ids"], include=["embeddings"])
+                if not stored["ids"]:
+                    continue  # index'te yok; warm-up/migration ekler
+                payload["embeddings"] = stored["embeddings"]
+                collection.update(**payload)
+
+            # Kategori bölümleri: vektör değiştiyse yaz, kategori değiştiyse taşı
+            if category_changed:
+                if embedding is None:
+                    found = self.collection.get(ids=[str(question_id)], include=["embeddings"])
+                    row["embedding"] = found["embeddings"][0] if found["ids"] else None
+                self.partitions.delete(question_id, old_category)
+            if row["embedding"] is not None and (embedding is not None or category_changed):
+                self.partitions.upsert([row])
+
+            logger.debug("Question updated in ChromaDB: id=%s reembedded=%s", question_id, embedding is not None)
+            return True
+        except Exception as e:
+            logger.error("Error updating question %s in ChromaDB: %s", question_id, e)
+            return False
+
+    def recategorize(self, moved: List[tuple], category: str) -> int:
+        """Toplu kategori değişikliği: sadece metadata güncellenir (embedding hesaplanmaz), bölümler taşınır
+
+        moved: (id, eski kategori) listesi
+        """
+        try:
+            ids = [str(qid) for qid, _ in moved]
+            for collection in self._write_targets():
+                for start in range(0, len(ids), RECATEGORIZE_BATCH_SIZE):
+                    batch = ids[start:start + RECATEGORIZE_BATCH_SIZE]
+                    # update metadata'yı birleştirir: diğer alanlar korunur
+                    collection.update(ids=batch, metadatas=[{"category": category}] * len(batch))
+            self.partitions.move(moved, category, self.collection)
+            logger.info("ChromaDB recategorized %s questions -> %s", len(moved), category)
+            return len(moved)
+        except Exception as e:
+            logger.error("Error recategorizing %s questions in ChromaDB: %s", len(moved), e)
+            return 0
+
+    def add_questions_batch(self, rows: List[Dict[str, Any]]) -> int:
+        """Toplu ekleme (warm-up için) - index'te zaten olanları atlar, eklenen sayısını döndürür"""
+        if not rows:
+            return 0
+        try:
+            ids = [str(r["id"]) for r in rows]
+            existing = set(self.collection.get(ids=ids, include=[])["ids"])
+            new_rows = [r for r in rows if str(r["id"]) not in existing]
+            if not new_rows:
+                return 0
+            for collection in self._write_targets():
+                collection.add(**self._payload(collection, new_rows))
+            self.partitions.upsert(new_rows)
+            logger.debug("Batch added to ChromaDB: %s questions", len(new_rows))
+            return len(new_rows)
+        except Exception as e:
+            logger.error("Error batch adding %s questions to ChromaDB: %s", len(rows), e)
+            return 0
+
+    def get_ids(self) -> set:
+        """Index'teki tüm ID'leri döndürür (sadece ID, metadata olmadan)"""
+        try:
+            return set(self.collection.get(include=[])["ids"])
+        except Exception as e:
+            logger.error("ChromaDB get ids error: %s", e)
+            return set()
+
     def search_similar(self, query_embedding: List[float], top_k: int = 3, 
-                      threshold: float = 0.7):
-        """Benzer soruları ara"""
+                      threshold: float = 0.7, category: Optional[str] = None, scope: str = "only"):
+        """Benzer soruları ara
+
+        category verilirse sadece o kategorinin bölümünde aranır; scope="first" ise
+        kategoriden gelen sonuçlar k'ya tamamlanana kadar genel aramayla doldurulur.
+        """
+        if category is None:
+            return self._search_global(query_embedding, top_k, threshold)
         try:
+            hits = [{**hit, "scope": "category"} for hit in self._search_category(query_embedding, top_k, threshold, category)]
+        except Exception as e:
+            logger.error("ChromaDB category search error: %s", e)
+            hits = []
+        if scope == "first" and len(hits) < top_k:
+            seen = {hit["id"] for hit in hits}
+            extra = self._search_global(query_embedding, top_k + len(hits), threshold)
+            hits += [{**hit, "scope": "global"} for hit in extra if hit["id"] not in seen][:top_k - len(hits)]
+        return hits
+
+    def _search_category(self, query_embedding: List[float], top_k: int, threshold: float, category: str):
+        """Bölüm hazırsa sadece o kategorinin index'i, değilse ana koleksiyonda metadata filtresi"""
+        if self.partitions.ready:
+            pairs = self.partitions.query(category, query_embedding, top_k)
+        else:
             results = self.collection.query(
+                query_embeddings=[query_embedding],
+                n_results=top_k,
+                where={"category": category},
+                include=["distances"]
+            )
+            pairs = [(int(qid), 1 - distance) for qid, distance in zip(results["ids"][0], results["distances"][0])]
+        return self._hydrate_hits([(qid, sim) for qid, sim in pairs if sim >= threshold])
+
+    def _search_global(self, query_embedding: List[float], top_k: int, threshold: float):
+        try:
+            collection = self.collection
+            if self._is_slim(collection):
+                return self._search_slim(collection, query_embedding, top_k, threshold)
+            results = collection.query(
                 query_embeddings=[query_embedding],
                 n_results=top_k,
                 include=["metadatas", "documents", "distances"]
@@ -93,10 +285,45 @@ class ChromaService:
             logger.error("ChromaDB search error: %s", e)
             return []
     
+    def _search_slim(self, collection, query_embedding: List[float], top_k: int, threshold: float):
+        """Index'ten sadece id + mesafe al, alanları tek sorguyla Postgres'ten doldur"""
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=top_k,
+            include=["distances"]
+        )
+        hits = [
+            (int(qid), 1 - distance)  # Cosine distance -> similarity
+            for qid, distance in zip(results["ids"][0], results["distances"][0])
+            if 1 - distance >= threshold
+        ]
+        return self._hydrate_hits(hits)
+
+    def _hydrate_hits(self, hits: List[tuple]) -> List[Dict[str, Any]]:
+        """(id, benzerlik) listesini Postgres'teki alanlarla doldurur, sırayı korur"""
+        if not hits:
+            return []
+        rows = self.hydrate([qid for qid, _ in hits])
+        return [
+            {**rows[qid], "sim": similarity}
+            for qid, similarity in hits
+            if qid in rows  # index'te kalmış ama silinmiş kayıtları atla
+        ]
+
+    def hydrate(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Verilen id'lerin alanlarını tek sorguyla getirir (havuzdaki bağlantıda, prepared statement)"""
+        rows = repository.hydrate_questions(list(ids))
+        return {row["id"]: row for row in rows}
+
     def delete_question(self, question_id: int):
         """Soru sil"""
         try:
-            self.collection.delete(ids=[str(question_id)])
+            # Kategori bölümünü bulmak için metadata'daki kategori (iki düzende de var)
+            found = self.collection.get(ids=[str(question_id)], include=["metadatas"])
+            category = (found["metadatas"][0] or {}).get("category") if found["ids"] else None
+            self.partitions.delete(question_id, category)
+            for collection in self._write_targets():
+                collection.delete(ids=[str(question_id)])
             logger.debug("Question deleted from ChromaDB: id=%s", question_id)
         except Exception as e:
             logger.error("ChromaDB delete error: %s", e)
@@ -109,5 +336,137 @@ class ChromaService:
             logger.error("ChromaDB get all error: %s", e)
             return {}
 
+    def migrate_layout(self) -> int:
+        """Eski düzendeki koleksiyonu yeni düzene kopyalar, sonra geçiş yapar
+
+        Kopyalama sırasında okumalar eski koleksiyondan devam eder, yazmalar ikisine
+        gider. Embedding'ler eski koleksiyondan, alanlar Postgres'ten okunur (Ollama yok).
+        """
+        source, target = self.collection, self._migration_target
+        if target is None:
+            return 0
+        ids = source.get(include=[])["ids"]
+        copied = 0
+        for start in range(0, len(ids), MIGRATION_BATCH_SIZE):
+            batch = source.get(ids=ids[start:start + MIGRATION_BATCH_SIZE], include=["embeddings"])
+            existing = set(target.get(ids=batch["ids"], include=[])["ids"])
+            rows = self.hydrate([int(i) for i in batch["ids"] if i not in existing])
+            new_rows = [
+                {**rows[int(i)], "embedding": emb}
+                for i, emb in zip(batch["ids"], batch["embeddings"])
+                if int(i) in rows
+            ]
+            if new_rows:
+                target.add(**self._payload(target, new_rows))
+                copied += len(new_rows)
+
+        # Kopya sırasında silinip yine de kopyalanmış olanları temizle
+        stale = self._prune_deleted(target)
+
+        with self._lock:
+            if self._migration_target is not target:
+                # Bu arada yeniden embedding cutover'ı koleksiyonu değiştirdi
+                return 0
+            self.collection, self._migration_target = target, None
+        self.client.delete_collection(source.name)
+        logger.info("ChromaDB layout migrated %s -> %s: %s copied, %s stale removed",
+                    source.name, target.name, copied, stale)
+        return copied
+
+    @staticmethod
+    def _prune_deleted(collection) -> int:
+        """Koleksiyonda olup veritabanında olmayan kayıtları siler
+
+        Koleksiyonun id'leri veritabanından önce okunur: arada eklenen bir soru ya bu
+        listede yoktur ya da live'dadır, yanlışlıkla silinmez.
+        """
+        ids = collection.get(include=[])["ids"]
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT id FROM questions")
+            live = {str(r["id"]) for r in cur.fetchall()}
+        stale = [i for i in ids if i not in live]
+        if stale:
+            collection.delete(ids=stale)
+        return len(stale)
+
+    def start_layout_migration(self) -> bool:
+        """Bekleyen bir düzen değişikliği varsa arka planda başlatır"""
+        with self._lock:
+            if self._migration_target is None or self._migrating:
+                return False
+            self._migrating = True
+
+        def run():
+            try:
+                self.migrate_layout()
+            except Exception as e:
+                logger.error("ChromaDB layout migration failed: %s", e)
+            finally:
+                self._migrating = False
+
+        threading.Thread(target=run, name="chroma-layout-migration", daemon=True).start()
+        return True
+
+    def start_partition_backfill(self) -> bool:
+        """Kategori bölümlerinde eksik vektör varsa arka planda doldurur"""
+        return self.partitions.start_backfill(lambda: self.collection)
+
+    def partition_stats(self) -> Dict[str, Any]:
+        return {"ready": self.partitions.ready, "categories": self.partitions.stats()}
+
+    def _shadow_name(self) -> str:
+        """Gölge koleksiyon hedef düzende oluşturulur (bekleyen düzen değişikliği de tamamlanır)"""
+        return (SLIM_COLLECTION if self.slim else FULL_COLLECTION) + SHADOW_SUFFIX
+
+    def shadow_reset(self):
+        """Yeni bir yeniden embedding işi için boş gölge koleksiyon"""
+        if self._existing_collection(self._shadow_name()) is not None:
+            self.client.delete_collection(self._shadow_name())
+        self._get_collection(self._shadow_name())
+
+    def shadow_upsert(self, rows: List[Dict[str, Any]]) -> int:
+        """Yeni model vektörlerini gölge koleksiyona yazar (sorgular etkilenmez)"""
+        if not rows:
+            return 0
+        shadow = self._get_collection(self._shadow_name())
+        shadow.upsert(**self._payload(shadow, rows))
+        return len(rows)
+
+    def shadow_exists(self) -> bool:
+        """Gölge koleksiyon var mı (yoksa geçiş daha önce tamamlanmış veya iş iptal edilmiş)"""
+        return self._existing_collection(self._shadow_name()) is not None
+
+    def shadow_cutover(self) -> bool:
+        """Gölge koleksiyonu aktif yapar, eskisini siler ve asıl adına taşır"""
+        shadow = self._existing_collection(self._shadow_name())
+        if shadow is None:
+            return False  # daha önce tamamlanmış
+        with self._lock:
+            old = [c for c in (self.collection, self._migration_target) if c is not None]
+            self.collection, self._migration_target = shadow, None
+        for collection in old:
+            self.client.delete_collection(collection.name)
+        shadow.modify(name=self._shadow_name()[:-len(SHADOW_SUFFIX)])
+        # İş sırasında silinen sorular gölgeye hiç yazılmadı ama oradan silinmedi de;
+        # artık silmeler bu koleksiyona gider, bir kez temizlemek yeterli
+        stale = self._prune_deleted(shadow)
+        if stale:
+            logger.info("ChromaDB removed %s deleted questions from the re-embedded collection", stale)
+        logger.info("ChromaDB switched to re-embedded collection %s (%s vectors)", shadow.name, shadow.count())
+        # Bölümler eski modelin vektörlerini tutuyor: yeni koleksiyondan yeniden kur
+        self.partitions.drop_all()
+        self.start_partition_backfill()
+        return True
+
+    def shadow_drop(self):
+        """İptal edilen işin gölge koleksiyonunu siler"""
+        if self._existing_collection(self._shadow_name()) is not None:
+            self.client.delete_collection(self._shadow_name())
+
 # Global instance
-chroma_service = ChromaService()
\ No newline at end of file
+# Çok worker'lı modda index'in tek sahibi ayrı bir süreçtir; worker'lar ona Unix socket ile bağlanır
+if settings.VECTOR_MODE == "remote":
+    from app.utils.vector_ipc import RemoteChromaService
+    chroma_service = RemoteChromaService(settings.VECTOR_SOCKET_PATH)
+else:
+    chroma_service = ChromaService()
\ No newline at end of file
@@ -0,0 +1,338 @@
+"""Tüm korpus için yakın-kopya taraması.
+
+Embedding'ler Postgres'ten tek seferde okunur, normalize edilir ve blok blok
+matris çarpımıyla (X[i] @ X[j].T, yalnızca üst üçgen) eşik üstü çiftler bulunur.
+Bloklar thread havuzunda paralel hesaplanır (BLAS GIL'i bırakır); bellek
+kullanımı embedding matrisi + worker başına bir blok x blok benzerlik matrisidir.
+Çiftler union-find ile kümelenip duplicate_clusters tablosuna yazılır.
+
+Komut satırından:
+    python -m app.utils.duplicate_scan --threshold 0.92
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+import numpy as np
+import psycopg
+from app.db import get_conn
+from app.logger import logger
+from app.config import settings
+from app.utils.embeddings import vector_to_numpy
+
+try:
+    # Varsa BLAS thread'lerini worker başına 1'e indir (aşırı abonelik olmasın)
+    from threadpoolctl import threadpool_limits
+except ImportError:  # pragma: no cover - opsiyonel bağımlılık
+    threadpool_limits = None
+
+SCAN_LOCK_KEY = "faq-studio:duplicate-scan"
+
+
+class ScanAlreadyRunning(Exception):
+    """Başka bir tarama (bu veya başka bir worker'da) sürüyor"""
+
+
+class UnionFind:
+    """Path halving + boyuta göre birleştirme"""
+
+    def __init__(self, n: int):
+        self.parent = np.arange(n, dtype=np.int64)
+        self.size = np.ones(n, dtype=np.int64)
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+
+
+def load_embeddings(batch_size: int = 5000):
+    """Tüm soruların id'lerini ve L2-normalize embedding'lerini tutarlı bir snapshot'tan okur"""
+    with get_conn() as conn:
+        conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) AS cnt FROM questions")
+            n = cur.fetchone()["cnt"]
+        ids = np.empty(n, dtype=np.int64)
+        matrix = None
+        i = 0
+        with conn.cursor(name="duplicate_scan") as cur:
+            cur.itersize = batch_size
+            cur.execute("SELECT id, embedding FROM questions ORDER BY id")
+            for row in cur:
+                vec = vector_to_numpy(row["embedding"])
+                if matrix is None:
+                    matrix = np.empty((n, len(vec)), dtype=np.float32)
+                ids[i] = row["id"]
+                matrix[i] = vec
+                i += 1
+        conn.commit()
+    if matrix is None:
+        return ids[:0], np.empty((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return ids, matrix
+
+
+def find_pairs(matrix: np.ndarray, threshold: float, block: int, workers: int,
+               progress: Optional[Callable[[float], None]] = None):
+    """Benzerliği threshold üstünde olan (i < j) indeks çiftleri ve benzerlikleri"""
+    n = len(matrix)
+    starts = list(range(0, n, block))
+
+    def row_block(i0: int):
+        xi = matrix[i0:i0 + block]
+        rows, cols, sims = [], [], []
+        for j0 in range(i0, n, block):
+            sim = xi @ matrix[j0:j0 + block].T
+            if j0 == i0:
+                # Köşegen blok: yalnızca üst üçgen (kendisiyle ve ters çift hariç)
+                sim[np.tril_indices_from(sim)] = -np.inf
+            r, c = np.nonzero(sim >= threshold)
+            if len(r):
+                rows.append(r + i0)
+                cols.append(c + j0)
+                sims.append(sim[r, c])
+        if not rows:
+            return None
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(sims)
+
+    # Her satır bloğu kendinden sonraki blokları gezer: iş miktarı (len(starts) - k) ile orantılı
+    total_work = sum(len(starts) - k for k in range(len(starts))) or 1
+    work_of = {i0: len(starts) - k for k, i0 in enumerate(starts)}
+    done_work = 0
+    parts = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(row_block, i0): i0 for i0 in starts}
+        for fut in as_completed(futures):
+            result = fut.result()
+            if result is not None:
+                parts.append(result)
+            done_work += work_of[futures[fut]]
+            if progress:
+                progress(done_work / total_work)
+
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float32)
+    return (np.concatenate([p[0] for p in parts]),
+            np.concatenate([p[1] for p in parts]),
+            np.concatenate([p[2] for p in parts]))
+
+
+def build_clusters(n: int, a: np.ndarray, b: np.ndarray, sims: np.ndarray):
+    """Union-find ile kümeler; büyükten küçüğe [(indeks dizisi, max_sim dizisi), ...]"""
+    uf = UnionFind(n)
+    for x, y in zip(a.tolist(), b.tolist()):
+        uf.union(x, y)
+
+    max_sim = np.zeros(n, dtype=np.float32)
+    np.maximum.at(max_sim, a, sims)
+    np.maximum.at(max_sim, b, sims)
+
+    members = np.unique(np.concatenate([a, b]))
+    roots = np.array([uf.find(int(m)) for m in members], dtype=np.int64)
+    order = np.argsort(roots, kind="stable")
+    members, roots = members[order], roots[order]
+    splits = np.flatnonzero(np.diff(roots)) + 1
+    groups = [g for g in np.split(members, splits) if len(g) > 1]
+    groups.sort(key=len, reverse=True)
+    return [(g, max_sim[g]) for g in groups]
+
+
+class DuplicateScanner:
+    """Tarama işini çalıştırır, ilerlemeyi ve sonucu veritabanına yazar"""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _update_scan(scan_id: int, **fields):
+        sets = ", ".join(f"{k} = %s" for k in fields)
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(f"UPDATE duplicate_scans SET {sets} WHERE id = %s", (*fields.values(), scan_id))
+            conn.commit()
+
+    @staticmethod
+    def _create_scan(threshold: float) -> int:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("INSERT INTO duplicate_scans (threshold) VALUES (%s) RETURNING id", (threshold,))
+            scan_id = cur.fetchone()["id"]
+            conn.commit()
+        return scan_id
+
+    def _run(self, scan_id: int, threshold: float):
+        """Taramayı çalıştırır; hata olursa kaydı failed olarak işaretler"""
+        started = time.monotonic()
+        try:
+            ids, matrix = load_embeddings()
+            self._update_scan(scan_id, total_questions=len(ids))
+            logger.info("Duplicate scan %s: loaded %s embeddings in %.1fs",
+                        scan_id, len(ids), time.monotonic() - started)
+
+            last_report = [0.0]
+
+            def progress(fraction: float):
+                # İlerlemeyi en fazla saniyede bir yaz
+                now = time.monotonic()
+                if now - last_report[0] >= 1.0 or fraction >= 1.0:
+                    last_report[0] = now
+                    self._update_scan(scan_id, progress=round(fraction, 4))
+
+            workers = settings.DUPLICATE_SCAN_WORKERS or os.cpu_count() or 1
+            if threadpool_limits is not None and workers > 1:
+                with threadpool_limits(limits=1, user_api="blas"):
+                    a, b, sims = find_pairs(matrix, threshold, settings.DUPLICATE_SCAN_BLOCK, workers, progress)
+            else:
+                a, b, sims = find_pairs(matrix, threshold, settings.DUPLICATE_SCAN_BLOCK, workers, progress)
+            clusters = build_clusters(len(ids), a, b, sims)
+
+            with get_conn() as conn, conn.cursor() as cur:
+                with cur.copy("COPY duplicate_clusters (scan_id, cluster_id, question_id, max_sim) FROM STDIN") as copy:
+                    for cluster_id, (members, member_sims) in enumerate(clusters, start=1):
+                        for idx, sim in zip(members.tolist(), member_sims.tolist()):
+                            copy.write_row((scan_id, cluster_id, int(ids[idx]), float(sim)))
+                cur.execute(
+                    "UPDATE duplicate_scans SET status = 'done', progress = 1, pair_count = %s, "
+                    "cluster_count = %s, finished_at = NOW() WHERE id = %s",
+                    (len(a), len(clusters), scan_id)
+                )
+                # Eski bitmiş taramaları temizle
+                cur.execute(
+                    "DELETE FROM duplicate_scans WHERE status <> 'running' AND id NOT IN "
+                    "(SELECT id FROM duplicate_scans WHERE status <> 'running' ORDER BY id DESC LIMIT %s)",
+                    (settings.DUPLICATE_SCAN_KEEP,)
+                )
+                conn.commit()
+            logger.info("Duplicate scan %s done: %s questions, %s pairs, %s clusters in %.1fs",
+                        scan_id, len(ids), len(a), len(clusters), time.monotonic() - started)
+        except Exception as e:
+            logger.error("Duplicate scan %s failed: %s", scan_id, e)
+            with get_conn() as conn, conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE duplicate_scans SET status = 'failed', error = %s, finished_at = NOW() WHERE id = %s",
+                    (str(e)[:1000], scan_id)
+                )
+                conn.commit()
+            raise
+
+    def _locked(self, lock_conn, scan_id: int, threshold: float):
+        """Advisory lock tutulurken çalışır, sonunda kilidi bırakır"""
+        try:
+            self._run(scan_id, threshold)
+        except Exception:
+            pass  # _run loglayıp kaydı işaretledi
+        finally:
+            try:
+                lock_conn.execute("SELECT pg_advisory_unlock(hashtext(%s))", (SCAN_LOCK_KEY,))
+            finally:
+                lock_conn.close()
+
+    def _acquire_lock(self):
+        """Tüm worker'lar arasında tek tarama: kilit alınamazsa ScanAlreadyRunning"""
+        lock_conn = get_conn()
+        lock_conn.autocommit = True
+        got = lock_conn.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS ok", (SCAN_LOCK_KEY,)).fetchone()["ok"]
+        if not got:
+            lock_conn.close()
+            raise ScanAlreadyRunning("A duplicate scan is already running")
+        return lock_conn
+
+    def start(self, threshold: Optional[float] = None) -> int:
+        """Taramayı arka plan thread'inde başlatır, scan_id döndürür"""
+        threshold = settings.DUPLICATE_SCAN_THRESHOLD if threshold is None else threshold
+        lock_conn = self._acquire_lock()
+        try:
+            scan_id = self._create_scan(threshold)
+        except Exception:
+            lock_conn.close()
+            raise
+        self._thread = threading.Thread(
+            target=self._locked, args=(lock_conn, scan_id, threshold),
+            name=f"duplicate-scan-{scan_id}", daemon=True
+        )
+        self._thread.start()
+        logger.info("Duplicate scan %s started threshold=%.3f", scan_id, threshold)
+        return scan_id
+
+    def run(self, threshold: Optional[float] = None) -> int:
+        """Taramayı bu thread'de çalıştırır (CLI)"""
+        threshold = settings.DUPLICATE_SCAN_THRESHOLD if threshold is None else threshold
+        lock_conn = self._acquire_lock()
+        try:
+            scan_id = self._create_scan(threshold)
+            self._run(scan_id, threshold)
+        finally:
+            lock_conn.close()
+        return scan_id
+
+    @staticmethod
+    def get_scan(scan_id: Optional[int] = None) -> Optional[dict]:
+        """Tek tarama kaydı; scan_id verilmezse son biten tarama"""
+        with get_conn() as conn, conn.cursor() as cur:
+            if scan_id is None:
+                cur.execute("SELECT * FROM duplicate_scans WHERE status = 'done' ORDER BY id DESC LIMIT 1")
+            else:
+                cur.execute("SELECT * FROM duplicate_scans WHERE id = %s", (scan_id,))
+            return cur.fetchone()
+
+    @staticmethod
+    def get_clusters(scan_id: int, limit: int = 50, offset: int = 0) -> list:
+        """Taramanın kümeleri (büyükten küçüğe), soru metinleriyle"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.cluster_id, c.question_id, c.max_sim, q.question, q.category
+                FROM duplicate_clusters c
+                LEFT JOIN questions q ON q.id = c.question_id
+                WHERE c.scan_id = %s AND c.cluster_id > %s AND c.cluster_id <= %s
+                ORDER BY c.cluster_id, c.max_sim DESC
+                """,
+                (scan_id, offset, offset + limit)
+            )
+            rows = cur.fetchall()
+        clusters = {}
+        for row in rows:
+            cluster = clusters.setdefault(row["cluster_id"], {"cluster_id": row["cluster_id"], "questions": []})
+            cluster["questions"].append({
+                "id": row["question_id"],
+                "question": row["question"],  # tarama sonrası silindiyse None
+                "category": row["category"],
+                "max_sim": round(float(row["max_sim"]), 4),
+            })
+        for cluster in clusters.values():
+            cluster["size"] = len(cluster["questions"])
+        return list(clusters.values())
+
+
+# Global instance
+duplicate_scanner = DuplicateScanner()
+
+
+# Convenience functions
+def start_duplicate_scan(threshold: Optional[float] = None) -> int:
+    """Kısa kullanım için wrapper"""
+    return duplicate_scanner.start(threshold)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Corpus-wide near-duplicate scan")
+    parser.add_argument("--threshold", type=float, default=None)
+    args = parser.parse_args()
+    scan = duplicate_scanner.get_scan(duplicate_scanner.run(args.threshold))
+    print(f"scan {scan['id']}: {scan['total_questions']} questions, "
+          f"{scan['pair_count']} pairs, {scan['cluster_count']} clusters")
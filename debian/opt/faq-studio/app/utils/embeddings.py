@@ -1,45 +1,68 @@
-import os
-import requests
+import json
+from typing import Optional
 import numpy as np
-from typing import List
+from starlette.concurrency import run_in_threadpool
 from app.logger import logger
 from app.config import settings
+from app.utils.ollama_client import ollama_client
+from app.utils.admission import embed_gate
+from app.repository import repository
 
 class EmbeddingService:
     """Embedding işlemlerini yöneten servis sınıfı"""
-    
+
     def __init__(self):
-        self.model = settings.EMBED_MODEL
-        self.base_url = settings.OLLAMA_BASE_URL
-        self.request_timeout = settings.REQUEST_TIMEOUT
-    
-    def get_embedding(self, text: str) -> np.ndarray:
-        """Metni embedding vektörüne çevirir"""
+        self.client = ollama_client
+        self._model = None
+
+    @property
+    def model(self) -> str:
+        """Sorguların kullanacağı model: index'teki vektörleri üreten model
+
+        EMBED_MODEL değiştiyse yeniden embedding bitene kadar eski model kullanılır.
+        Değer bellekte tutulur (istek yolunda veritabanı sorgusu yok): startup'ta ve
+        cutover'ın yayınladığı "model" canlı olayında thread'de yenilenir.
+        """
+        if self._model is None:
+            return settings.EMBED_MODEL
+        return self._model
+
+    def refresh_model(self) -> str:
+        """Aktif modeli veritabanından okur (senkron: event loop dışında çağrılmalı)"""
         try:
-            response = requests.post(
-                f"{self.base_url}/api/embeddings",
-                json={"model": self.model, "prompt": text},
-                timeout=self.request_timeout
-            )
-            response.raise_for_status()
-            embedding = response.json().get("embedding")
-            return np.array(embedding, dtype=np.float32)
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"Embedding API hatası: {e}")
-    
+            active = repository.active_embed_model()
+        except Exception as e:
+            # Şema henüz kurulmamış olabilir
+            logger.debug("Active embedding model lookup failed: %s", e)
+            return self.model
+        if active and active != self._model:
+            if self._model is not None:
+                logger.info("Active embedding model changed: %s -> %s", self._model, active)
+            self._model = active
+        return self.model
+
+    def on_event(self, payload: Optional[str]):
+        """live_events handler'ı: model değişiminde ve (yeniden) bağlanınca aktif modeli tazeler"""
+        if payload is None or json.loads(payload).get("op") == "model":
+            self.refresh_model()
+
+    def get_embedding(self, text: str, deadline=None, model=None) -> np.ndarray:
+        """Metni embedding vektörüne çevirir"""
+        return self.client.embed(text, model=model or self.model, deadline=deadline)
+
     def embedding_to_vector_string(self, embedding: np.ndarray) -> str:
         """NumPy array'i PostgreSQL vector formatına çevirir"""
         return "[" + ",".join(f"{x:.6f}" for x in embedding.tolist()) + "]"
-    
+
     def cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """İki vektör arasındaki cosine similarity hesaplar"""
         dot_product = np.dot(vec1, vec2)
         norm_vec1 = np.linalg.norm(vec1)
         norm_vec2 = np.linalg.norm(vec2)
-        
+
         if norm_vec1 == 0 or norm_vec2 == 0:
             return 0.0
-        
+
         return dot_product / (norm_vec1 * norm_vec2)
 
 
@@ -47,22 +70,28 @@ class EmbeddingService:
 embedding_service = EmbeddingService()
 
 # Convenience functions
-def embed(text: str) -> np.ndarray:
+def embed(text: str, deadline=None, model=None) -> np.ndarray:
     try:
-        r = requests.post(
-            f"{settings.OLLAMA_BASE_URL}/api/embeddings",
-            json={"model": settings.EMBED_MODEL, "prompt": text},
-            timeout=settings.REQUEST_TIMEOUT
-        )
-        r.raise_for_status()
-        vec = np.array(r.json().get("embedding"), dtype=np.float32)
-        if vec.size == 0:
-            raise ValueError("Empty embedding from ollama")
-        return vec
+        return embedding_service.get_embedding(text, deadline=deadline, model=model)
     except Exception as e:
         logger.error("Embedding error: %s", e)
         raise
 
+async def embed_admitted(text: str, lane: str, deadline=None, model=None) -> np.ndarray:
+    """Async endpoint'ler için: lane slotu alır, embedding'i thread havuzunda hesaplar"""
+    async with embed_gate.slot(lane, deadline):
+        return await run_in_threadpool(embed, text, deadline, model)
+
+def active_embed_model() -> str:
+    """Kısa kullanım için wrapper"""
+    return embedding_service.model
+
 def embedding_to_vector_str(embedding: np.ndarray) -> str:
     """Kısa kullanım için wrapper fonksiyon"""
-    return embedding_service.embedding_to_vector_string(embedding)
\ No newline at end of file
+    return embedding_service.embedding_to_vector_string(embedding)
+
+def vector_to_numpy(value) -> np.ndarray:
+    """pgvector kolonundan okunan değeri float32 ndarray'e çevirir (sürüme göre Vector veya ndarray gelir)"""
+    if hasattr(value, "to_numpy"):
+        value = value.to_numpy()
+    return np.asarray(value, dtype=np.float32)
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import Response
+from app.logger import logger
+from app.config import settings
+from app.utils.serialization import dumps
+from app.utils.shared_counter import make_counter
+from app.db import prefer_primary
+
+
+class ResponseCache:
+    """Yazma işlemlerinde geçersizleşen, ETag destekli yanıt önbelleği (LRU)"""
+
+    def __init__(self, max_entries: int, generation_path: str = ""):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, float, str, bytes]]" = OrderedDict()
+        # Çok worker'lı modda sayaç paylaşımlıdır: bir worker'daki yazma diğerlerinin önbelleğini de geçersiz kılar
+        self._counter = make_counter(generation_path)
+        self._lock = threading.Lock()
+        self._observed_generation: Optional[int] = None
+        self._observed_at = 0.0
+
+    @property
+    def generation(self) -> int:
+        """Her yazma işleminde artan sayaç; önbellek sürümü olarak kullanılır"""
+        return self._counter.value
+
+    def generation_age(self) -> float:
+        """Bu süreç mevcut sürümü ilk gördüğünden beri geçen saniye (son yazmadan en fazla bu kadar süre geçti)"""
+        generation = self._counter.value
+        if generation != self._observed_generation:
+            self._observed_generation, self._observed_at = generation, time.monotonic()
+        return time.monotonic() - self._observed_at
+
+    def bump_generation(self):
+        """Tüm önbelleği geçersiz kılar (write route'ları çağırır)"""
+        with self._lock:
+            generation = self._counter.increment()
+            self._entries.clear()
+        logger.debug("Response cache invalidated, generation=%s", generation)
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[Tuple[str, bytes]]:
+        """Geçerli kaydı (etag, body) olarak döndürür"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            generation, created, etag, body = entry
+            if generation != self._counter.value or (ttl is not None and time.monotonic() - created > ttl):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag, body
+
+    def set(self, key: str, body: bytes, generation: int) -> Tuple[str, bytes]:
+        """Yanıt gövdesini saklar ve içerikten türetilen ETag'i döndürür"""
+        etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        with self._lock:
+            # Gövde hesaplanırken yazma olduysa eski sürümü saklama
+            if generation == self._counter.value:
+                self._entries[key] = (generation, time.monotonic(), etag, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return etag, body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match başlığı verilen ETag ile eşleşiyor mu?"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_response(
+    request: Request,
+    key: str,
+    builder: Callable[[], bytes],
+    media_type: str,
+    ttl: Optional[float] = None,
+) -> Response:
+    """builder() çıktısını bir sonraki yazmaya (veya TTL dolana) kadar önbellekten sunar; ETag eşleşirse 304"""
+    entry = response_cache.get(key, ttl)
+    if entry is None:
+        generation = response_cache.generation
+        # Yazmadan hemen sonra replika henüz yetişmemiş olabilir: eski veri önbelleğe girmesin
+        with prefer_primary(response_cache.generation_age() < settings.READ_STICKY_SECONDS):
+            body = builder()
+        entry = response_cache.set(key, body, generation)
+    else:
+        logger.debug("Response cache hit key=%s", key)
+
+    etag, body = entry
+    # Tarayıcı her seferinde doğrulasın; değişmediyse 304 ile gövde gönderilmez
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def cached_json_response(
+    request: Request,
+    key: str,
+    builder: Callable[[], Any],
+    ttl: Optional[float] = None,
+) -> Response:
+    """JSON payload'ları için cached_response kısayolu"""
+    def build_body() -> bytes:
+        return dumps(builder())
+    return cached_response(request, key, build_body, "application/json", ttl)
+
+
+def invalidate_cache():
+    """Kısa kullanım için wrapper"""
+    response_cache.bump_generation()
+
+
+# Global instance
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE, settings.CACHE_GENERATION_PATH)
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.logger import logger
+from app.repository import repository
+from app.utils.serialization import dumps
+
+# Başka bir worker'daki aynı anahtarlı isteğin bitmesini yoklama aralığı
+POLL_INTERVAL = 0.1
+# Süresi dolan anahtarlar en fazla bu sıklıkla silinir (worker başına)
+PURGE_INTERVAL = 60.0
+
+# (HTTP durum kodu, JSON gövde)
+Result = Tuple[int, Dict[str, Any]]
+
+
+def fingerprint(*parts: Any) -> str:
+    """İstek içeriğinin özeti: aynı içerikli istekler aynı değeri verir"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class SingleFlight:
+    """Aynı anahtarlı eşzamanlı çağrılar tek bir hesaplamayı paylaşır (worker içinde)
+
+    Hesaplama ayrı bir task'ta çalışır: ilk istemci bağlantıyı kesse de bekleyen
+    diğerleri sonucu alır. Task bitince anahtar silinir; sonuç önbelleklenmez.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        return {"inflight": len(self._inflight), "coalesced": self.coalesced}
+
+
+class IdempotencyStore:
+    """Idempotency-Key başlığı için kısa ömürlü sonuç deposu (idempotency_keys tablosu)
+
+    İlk istek anahtarı alır ve sonucunu yazar; aynı anahtarla gelen tekrarlar (hangi
+    worker'a düşerse düşsün) hesaplama yapmadan aynı yanıtı alır. Anahtar farklı bir
+    içerikle tekrar kullanılırsa 422 döner. İstek hata ile biterse anahtar bırakılır,
+    istemci yeniden deneyebilir.
+    """
+
+    def __init__(self):
+        self._last_purge = 0.0
+        self.replayed = 0
+
+    def _purge(self):
+        if time.monotonic() - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = time.monotonic()
+        try:
+            purged = repository.purge_idempotency_keys(settings.IDEMPOTENCY_TTL)
+            if purged:
+                logger.debug("Idempotency keys purged: %s", purged)
+        except Exception as e:
+            logger.warning("Idempotency key purge failed: %s", e)
+
+    def _replay(self, row: Dict[str, Any]) -> JSONResponse:
+        self.replayed += 1
+        return JSONResponse(status_code=row["status"], content=row["response"],
+                            headers={"Idempotent-Replayed": "true"})
+
+    async def run(self, key: str, request_fingerprint: str, fn: Callable[[], Awaitable[Result]]) -> JSONResponse:
+        if time.monotonic() - self._last_purge >= PURGE_INTERVAL:
+            await run_in_threadpool(self._purge)
+        claimed = await run_in_threadpool(
+            repository.claim_idempotency_key, key, request_fingerprint, settings.IDEMPOTENCY_TTL
+        )
+        if not claimed:
+            return await self._wait(key, request_fingerprint)
+        try:
+            status, body = await fn()
+        except BaseException:
+            await run_in_threadpool(repository.release_idempotency_key, key)
+            raise
+        await run_in_threadpool(repository.complete_idempotency_key, key, status, dumps(body).decode("utf-8"))
+        return JSONResponse(status_code=status, content=body)
+
+    async def _wait(self, key: str, request_fingerprint: str) -> JSONResponse:
+        """Anahtar başka bir istekte: bitmişse yanıtı tekrarla, sürüyorsa bir süre bekle"""
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while True:
+            row = await run_in_threadpool(repository.get_idempotency_key, key)
+            if row is None:
+                # Diğer istek hata ile bitti ve anahtarı bıraktı
+                raise HTTPException(status_code=409, detail="Aynı Idempotency-Key ile önceki istek başarısız oldu, tekrar deneyin")
+            if row["fingerprint"] != request_fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key farklı içerikli bir istekte kullanılmış")
+            if row["status"] is not None:
+                return self._replay(row)
+            if time.monotonic() >= deadline:
+                raise HTTPException(status_code=409, detail="Aynı Idempotency-Key ile istek hâlâ işleniyor",
+                                    headers={"Retry-After": "1"})
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def stats(self) -> Dict[str, int]:
+        return {"replayed": self.replayed}
+
+
+# Global instances
+single_flight = SingleFlight()
+idempotency_store = IdempotencyStore()
+
+
+# Convenience functions
+async def coalesced(key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Kısa kullanım için wrapper"""
+    return await single_flight.do(key, fn)
+
+
+async def idempotent(key: Optional[str], request_fingerprint: str, fn: Callable[[], Awaitable[Result]]) -> JSONResponse:
+    """Anahtar yoksa fn doğrudan çalışır; varsa sonuç saklanır ve tekrarlarda yeniden kullanılır"""
+    if not key:
+        status, body = await fn()
+        return JSONResponse(status_code=status, content=body)
+    # Aynı worker'a aynı anda gelen tekrarlar veritabanını yoklamadan ilk isteği bekler
+    return await single_flight.do(f"idem:{key}:{request_fingerprint}", lambda: idempotency_store.run(key, request_fingerprint, fn))
@@ -53,6 +53,19 @@ class JSONFileManager:
             question_data.get("id"), self.file_path, len(data)
         )
     
+    def set_category(self, question_ids: set, category: str) -> int:
+        """Verilen id'lerin kategorisini tek okuma/yazmada değiştirir, değişen kayıt sayısını döndürür"""
+        data = self.read_data()
+        changed = 0
+        for item in data:
+            if item.get("id") in question_ids and item.get("category") != category:
+                item["category"] = category
+                changed += 1
+        if changed:
+            self.write_data(data)
+        logger.info("JSON recategorized %s items -> %s path=%s", changed, category, self.file_path)
+        return changed
+
     def remove_question_by_id(self, question_id: int) -> bool:
         """ID'ye göre soru siler, başarılıysa True döndürür"""
         data = self.read_data()
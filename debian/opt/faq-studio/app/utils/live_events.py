@@ -0,0 +1,192 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+import psycopg
+from app.config import settings
+from app.logger import logger
+from app.repository import repository
+from app.utils.serialization import dumps
+
+# Tüm worker'ların dinlediği Postgres kanalı
+CHANNEL = "faq_events"
+# NOTIFY yükü 8000 byte ile sınırlı: soru metni kısaltılır
+QUESTION_PREVIEW_CHARS = 200
+RECONNECT_DELAY = 2.0
+
+
+class Subscriber:
+    """Tek bir SSE bağlantısının kuyruğu; kuyruk taşarsa istemci yeniden senkronize olur"""
+
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self, size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.overflowed = False
+
+
+class LiveEvents:
+    """Yazma olaylarını SSE istemcilerine dağıtır
+
+    Yazma route'ları notify() parametrelerini repository yazma metoduna verir; pg_notify
+    yazma sorgusunun içinde çalışır (id, kategori farkı ve yeni toplam orada eklenir), böylece
+    olay yazmayla atomiktir ve ayrı bir gidiş-dönüş gerekmez. Her worker'daki dinleyici thread LISTEN ile alır ve kendi bağlı istemcilerinin
+    kuyruklarına koyar. Böylece hangi worker'a bağlı olursa olsun tüm istemciler her
+    yazmayı görür. Dinleyici bağlantısı koparsa aradaki olaylar kaybolabileceği için
+    istemcilere "resync" gönderilir ve tam yeniden yükleme yaparlar.
+
+    Worker içi önbellekler add_handler ile aynı olayları dinleyici thread'inde alır;
+    None: bağlantı (yeniden) kuruldu, olay kaçırılmış olabilir.
+    """
+
+    def __init__(self):
+        self._clients: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._handlers: List[Callable[[Optional[str]], None]] = []
+        self.connected = False
+        self.published = 0
+        self.received = 0
+        self.dropped_clients = 0
+        self.rejected_clients = 0
+
+    # --- dinleyici ---
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._thread is not None:
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="live-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def add_handler(self, handler: Callable[[Optional[str]], None]):
+        """Her olayda (ve her bağlantıda None ile) dinleyici thread'inde çağrılır"""
+        self._handlers.append(handler)
+
+    def _listen(self):
+        first = True
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(settings.DATABASE_URL, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self.connected = True
+                    if not first:
+                        # Bağlantı yokken gelen olaylar kaçırılmış olabilir
+                        self._broadcast(None)
+                    first = False
+                    self._notify_handlers(None)
+                    logger.debug("Listening for live events on %s", CHANNEL)
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=1.0):
+                            self._broadcast(notify.payload)
+                            self._notify_handlers(notify.payload)
+            except Exception as e:
+                self.connected = False
+                logger.warning("Live event listener disconnected: %s", e)
+                self._stop.wait(RECONNECT_DELAY)
+        self.connected = False
+
+    def _notify_handlers(self, payload: Optional[str]):
+        for handler in self._handlers:
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.warning("Live event handler %s failed: %s", getattr(handler, "__qualname__", handler), e)
+
+    def _broadcast(self, payload: Optional[str]):
+        """Dinleyici thread'inden event loop'a aktarır; None: istemciler yeniden senkronize olsun"""
+        if payload is not None:
+            self.received += 1
+        if self._loop is not None and self._clients:
+            self._loop.call_soon_threadsafe(self._dispatch, payload)
+
+    def _dispatch(self, payload: Optional[str]):
+        for subscriber in list(self._clients):
+            if payload is None:
+                subscriber.overflowed = True
+            else:
+                try:
+                    subscriber.queue.put_nowait(payload)
+                    continue
+                except asyncio.QueueFull:
+                    subscriber.overflowed = True
+            # Yavaş istemci: listeden çıkarılır, bağlantı resync ile kapanır (None uyandırır)
+            self._clients.discard(subscriber)
+            self.dropped_clients += 1
+            try:
+                subscriber.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+    # --- istemciler ---
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """Worker başına SSE_MAX_CLIENTS aşılırsa None"""
+        if len(self._clients) >= settings.SSE_MAX_CLIENTS:
+            self.rejected_clients += 1
+            return None
+        subscriber = Subscriber(settings.SSE_QUEUE_SIZE)
+        self._clients.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._clients.discard(subscriber)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # --- yayın (yazma route'ları) ---
+
+    def notify(self, op: str, category: Optional[str] = None, question: Optional[str] = None,
+               created_by: Optional[str] = None) -> Dict[str, str]:
+        """Yazma sorgusuyla gönderilecek olayın kanal ve sabit alanları (repository notify= parametresi)
+
+        id, kategori ve kategori farkı (toplu işlemlerde sayı) yazmanın sonucundan sorguda eklenir.
+        Yazma rollback olursa olay da gönderilmez.
+        """
+        event: Dict[str, Any] = {"op": op, "worker": os.getpid(), "ts": time.time()}
+        if category is not None:
+            event["category"] = category
+        if question is not None:
+            event["question"] = question[:QUESTION_PREVIEW_CHARS]
+        if created_by is not None:
+            event["created_by"] = created_by
+        # Yazmaya eklenen olaylar sayılır (yazma başarısızsa olay da gitmez)
+        self.published += 1
+        return {"channel": CHANNEL, "event": dumps(event).decode("utf-8")}
+
+    def publish_model(self, model: str):
+        """Yeniden embedding cutover'ı: worker'lar aktif embedding modelini yeniden okur"""
+        self._send({"op": "model", "model": model, "delta": {}, "worker": os.getpid(), "ts": time.time()})
+
+    def _send(self, event: Dict[str, Any]):
+        payload = dumps(event).decode("utf-8")
+        try:
+            repository.publish_event(CHANNEL, payload)
+            self.published += 1
+        except Exception as e:
+            # Olay kaybolursa istemciler en geç yeniden bağlanınca tam yükleme yapar
+            logger.warning("Live event publish failed op=%s id=%s: %s", event["op"], event.get("id"), e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": self.client_count,
+            "max_clients": settings.SSE_MAX_CLIENTS,
+            "listening": self._thread is not None and self._thread.is_alive() and self.connected,
+            "published": self.published,
+            "received": self.received,
+            "dropped_clients": self.dropped_clients,
+            "rejected_clients": self.rejected_clients,
+        }
+
+
+# Global instance
+live_events = LiveEvents()
@@ -0,0 +1,208 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from app.logger import logger
+from app.config import settings
+from app.utils.admission import DeadlineExceeded
+
+
+class OllamaUnavailableError(Exception):
+    """Circuit açıkken Ollama'ya istek atılmadan fırlatılır"""
+
+
+class CircuitBreaker:
+    """Ardışık hatalarda Ollama çağrılarını kısa devre eden basit circuit breaker"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """İstek atılabilir mi? Açık devrede reset süresi dolunca tek bir deneme çağrısına izin verir"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Ollama circuit closed")
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Ollama circuit opened after %s failures", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class OllamaClient:
+    """Keep-alive bağlantı havuzu, retry, circuit breaker ve hedging ile Ollama istemcisi"""
+
+    def __init__(self):
+        self.base_url = settings.OLLAMA_BASE_URL
+        self.model = settings.EMBED_MODEL
+        self.timeout = (settings.OLLAMA_CONNECT_TIMEOUT, settings.OLLAMA_READ_TIMEOUT)
+        self.max_retries = settings.OLLAMA_MAX_RETRIES
+        self.backoff = settings.OLLAMA_RETRY_BACKOFF
+        self.backoff_max = settings.OLLAMA_RETRY_BACKOFF_MAX
+        self.hedge_delay = settings.OLLAMA_HEDGE_DELAY
+        self.breaker = CircuitBreaker(settings.OLLAMA_CIRCUIT_THRESHOLD, settings.OLLAMA_CIRCUIT_RESET)
+
+        # Tek session: TCP bağlantıları yeniden kullanılır
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.OLLAMA_POOL_SIZE, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._hedge_pool = None
+        if self.hedge_delay > 0:
+            self._hedge_pool = ThreadPoolExecutor(
+                max_workers=settings.OLLAMA_POOL_SIZE, thread_name_prefix="ollama-hedge"
+            )
+
+    def _post_embedding(self, text: str, model: str, timeout) -> np.ndarray:
+        """Tek bir HTTP çağrısı"""
+        r = self.session.post(
+            f"{self.base_url}/api/embeddings",
+            json={"model": model, "prompt": text},
+            timeout=timeout
+        )
+        r.raise_for_status()
+        vec = np.array(r.json().get("embedding"), dtype=np.float32)
+        if vec.size == 0:
+            raise ValueError("Empty embedding from ollama")
+        return vec
+
+    def _hedged_call(self, text: str, model: str, timeout) -> np.ndarray:
+        """Yanıt hedge süresini aşarsa ikinci bir istek gönderir, ilk başarılı sonucu döndürür"""
+        if self._hedge_pool is None:
+            return self._post_embedding(text, model, timeout)
+
+        primary = self._hedge_pool.submit(self._post_embedding, text, model, timeout)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+
+        logger.debug("Ollama hedged request fired after %.2fs", self.hedge_delay)
+        hedge = self._hedge_pool.submit(self._post_embedding, text, model, timeout)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    return fut.result()
+                error = fut.exception()
+        raise error
+
+    @staticmethod
+    def _is_retryable(exc: Exception) -> bool:
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return True
+        if isinstance(exc, requests.HTTPError) and exc.response is not None:
+            return exc.response.status_code >= 500 or exc.response.status_code == 429
+        return False
+
+    def embed(self, text: str, model: Optional[str] = None, timeout=None, deadline=None) -> np.ndarray:
+        """Metni embedding vektörüne çevirir (retry + circuit breaker)
+
+        deadline (admission.Deadline) verilirse her deneme kalan bütçeyle sınırlanır,
+        bütçe bitince retry yapılmaz.
+        """
+        model = model or self.model
+        timeout = timeout or self.timeout
+        attempt = 0
+        while True:
+            # Bütçe kontrolü allow()'dan önce: allow() yarı açık devrede tek deneme hakkını
+            # alır, sonucu kaydedilmeden çıkılırsa devre yarı açık kalıp tüm istekleri reddeder
+            call_timeout = timeout
+            if deadline is not None:
+                remaining = deadline.remaining()
+                if remaining <= 0:
+                    raise DeadlineExceeded("request deadline exceeded before embedding")
+                call_timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+            if not self.breaker.allow():
+                raise OllamaUnavailableError("Ollama circuit open, request rejected")
+            try:
+                vec = self._hedged_call(text, model, call_timeout)
+            except Exception as e:
+                retryable = self._is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # Sunucu cevap verdi (ör. 4xx, boş embedding): devre açısından başarılı sayılır
+                    self.breaker.record_success()
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                # Full jitter exponential backoff
+                delay = random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+                if deadline is not None and deadline.remaining() <= delay:
+                    raise DeadlineExceeded("request deadline exceeded during Ollama retries") from e
+                attempt += 1
+                logger.warning(
+                    "Ollama embed failed (%s), retry %s/%s in %.2fs",
+                    type(e).__name__, attempt, self.max_retries, delay
+                )
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return vec
+
+    def health(self) -> dict:
+        """Ollama erişilebilirlik kontrolü (kısa timeout ile)"""
+        started = time.monotonic()
+        try:
+            r = self.session.get(
+                f"{self.base_url}/api/tags",
+                timeout=(settings.OLLAMA_CONNECT_TIMEOUT, 2.0)
+            )
+            r.raise_for_status()
+            models = [m.get("name", "") for m in r.json().get("models", [])]
+            ok = True
+            error = None
+            model_loaded = any(name.split(":")[0] == self.model.split(":")[0] for name in models)
+        except Exception as e:
+            ok = False
+            error = f"{type(e).__name__}: {e}"
+            model_loaded = False
+        return {
+            "ok": ok,
+            "model": self.model,
+            "model_available": model_loaded,
+            "circuit": self.breaker.state,
+            "latency_ms": round((time.monotonic() - started) * 1000, 2),
+            "error": error,
+        }
+
+
+# Global instance
+ollama_client = OllamaClient()
@@ -0,0 +1,360 @@
+"""Canlı sistemde teşhis araçları (sadece /admin üzerinden).
+
+- SamplingProfiler: sys._current_frames() ile tüm thread'lerin (event loop dahil)
+  yığınlarını belirli aralıklarla örnekler; çıktı speedscope JSON veya
+  flamegraph.pl'in okuduğu "folded" formatıdır.
+- Tek istek profili: X-Profile başlığı (geçerli admin token ile) gelen istek
+  süresince örnekleme yapılır, sonuç request_id ile saklanır.
+- AllocationTracker: tracemalloc snapshot'ları ve iki nokta arasındaki fark.
+- LoopLagMonitor: event loop belirli bir süreden uzun bloklanırsa loop thread'inin
+  o anki yığınını ve çalışan task'ı loglar (async route içindeki senkron I/O'yu yakalar).
+
+Çok worker'lı modda her şey süreç başınadır; istek hangi worker'a düşerse onun verisi döner.
+"""
+import asyncio
+import collections
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from typing import Any, Dict, List, Optional, Tuple
+from app.logger import logger
+from app.config import settings
+
+# (fonksiyon, dosya, satır) kökten yaprağa
+Stack = Tuple[Tuple[str, str, int], ...]
+
+# Yaprağı bunlardan biri olan örnekler boşta bekleyen thread'dir (kilit/kuyruk/select)
+IDLE_LEAVES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("selectors.py", "select"), ("connection.py", "_recv"),
+}
+
+
+class ProfilerBusy(Exception):
+    """Aynı anda tek CPU profili alınabilir"""
+
+
+def _frame_key(frame) -> Tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def _is_idle(stack: Stack) -> bool:
+    name, filename, _ = stack[-1]
+    return (filename.rsplit("/", 1)[-1], name) in IDLE_LEAVES
+
+
+class Profile:
+    """Thread başına yığın -> örnek sayısı"""
+
+    def __init__(self, samples: Dict[str, collections.Counter], interval: float, duration: float):
+        self.samples = samples
+        self.interval = interval
+        self.duration = duration
+
+    @property
+    def sample_count(self) -> int:
+        return sum(sum(c.values()) for c in self.samples.values())
+
+    def to_folded(self) -> str:
+        """flamegraph.pl / speedscope'un okuduğu 'thread;f1;f2 N' satırları"""
+        lines = []
+        for thread, counter in self.samples.items():
+            for stack, count in counter.most_common():
+                frames = ";".join(f"{name} ({filename.rsplit('/', 1)[-1]}:{line})" for name, filename, line in stack)
+                lines.append(f"{thread};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name: str = "faq-studio") -> Dict[str, Any]:
+        """speedscope.app 'sampled' formatı, thread başına bir profil"""
+        frame_index: Dict[Tuple[str, str, int], int] = {}
+        frames: List[Dict[str, Any]] = []
+        profiles = []
+        weight = round(self.interval * 1000, 3)
+        for thread, counter in self.samples.items():
+            samples, weights = [], []
+            for stack, count in counter.items():
+                indexes = []
+                for key in stack:
+                    if key not in frame_index:
+                        frame_index[key] = len(frames)
+                        frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                    indexes.append(frame_index[key])
+                samples.append(indexes)
+                weights.append(weight * count)
+            profiles.append({
+                "type": "sampled", "name": thread, "unit": "milliseconds",
+                "startValue": 0, "endValue": round(self.duration * 1000, 3),
+                "samples": samples, "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name, "exporter": "faq-studio",
+            "shared": {"frames": frames}, "profiles": profiles,
+        }
+
+
+class SamplingProfiler:
+    """Ayrı bir thread'den tüm thread'lerin yığınlarını örnekler"""
+
+    def __init__(self, interval: float, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self._samples: Dict[str, collections.Counter] = collections.defaultdict(collections.Counter)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            if not stack:
+                continue
+            stack.reverse()
+            stack = tuple(stack)
+            if not self.include_idle and _is_idle(stack):
+                continue
+            self._samples[names.get(ident, str(ident))][stack] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> "SamplingProfiler":
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="faq-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        return Profile(dict(self._samples), self.interval, time.monotonic() - self._started)
+
+
+class ProfileStore:
+    """CPU profili kilidi ve son istek profilleri"""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._cpu_lock = threading.Lock()
+        self._requests: "collections.OrderedDict[str, Dict[str, Any]]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    async def cpu_profile(self, seconds: float, interval: float, include_idle: bool) -> Profile:
+        """seconds boyunca tüm süreci örnekler (event loop'u bloklamadan bekler)"""
+        if not self._cpu_lock.acquire(blocking=False):
+            raise ProfilerBusy("A CPU profile is already running")
+        try:
+            profiler = SamplingProfiler(interval, include_idle).start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                profile = profiler.stop()
+        finally:
+            self._cpu_lock.release()
+        logger.info("CPU profile taken: %.1fs, %s samples", profile.duration, profile.sample_count)
+        return profile
+
+    def save_request(self, request_id: str, method: str, path: str, profile: Profile):
+        with self._lock:
+            self._requests[request_id] = {
+                "request_id": request_id, "method": method, "path": path,
+                "duration_ms": round(profile.duration * 1000, 1), "samples": profile.sample_count,
+                "profile": profile,
+            }
+            while len(self._requests) > self.keep:
+                self._requests.popitem(last=False)
+
+    def get_request(self, request_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._requests.get(request_id)
+
+    def list_requests(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{k: v for k, v in entry.items() if k != "profile"} for entry in reversed(self._requests.values())]
+
+
+class AllocationTracker:
+    """tracemalloc snapshot'ları; her snapshot bir öncekiyle (veya seçilenle) karşılaştırılır"""
+
+    FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+    def __init__(self, keep: int = 5):
+        self.keep = keep
+        self._snapshots: "collections.OrderedDict[int, tracemalloc.Snapshot]" = collections.OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, frames: int) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            logger.info("tracemalloc started frames=%s", frames)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            self._snapshots.clear()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "snapshots": list(self._snapshots),
+        }
+
+    @staticmethod
+    def _frame(stat) -> Dict[str, Any]:
+        frame = stat.traceback[0]
+        return {"file": frame.filename, "line": frame.lineno}
+
+    def snapshot(self, limit: int, key_type: str = "lineno", compare_to: Optional[int] = None) -> Dict[str, Any]:
+        """Yeni snapshot alır; en çok bellek ayıranlar ve önceki snapshot'a göre fark"""
+        if not tracemalloc.is_tracing():
+            raise ValueError("tracemalloc is not running")
+        snap = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        with self._lock:
+            snap_id = self._next_id
+            self._next_id += 1
+            if compare_to is None and self._snapshots:
+                compare_to = next(reversed(self._snapshots))
+            previous = self._snapshots.get(compare_to) if compare_to is not None else None
+            if compare_to is not None and previous is None:
+                raise ValueError(f"snapshot {compare_to} not found")
+            self._snapshots[snap_id] = snap
+            while len(self._snapshots) > self.keep:
+                self._snapshots.popitem(last=False)
+
+        result = {
+            "id": snap_id,
+            "top": [
+                {**self._frame(s), "size_kb": round(s.size / 1024, 1), "count": s.count}
+                for s in snap.statistics(key_type)[:limit]
+            ],
+        }
+        if previous is not None:
+            result["compared_to"] = compare_to
+            result["diff"] = [
+                {**self._frame(s), "size_diff_kb": round(s.size_diff / 1024, 1), "count_diff": s.count_diff,
+                 "size_kb": round(s.size / 1024, 1)}
+                for s in snap.compare_to(previous, key_type)[:limit]
+            ]
+        return result
+
+
+class LoopLagMonitor:
+    """Event loop bloklanmasını ölçer ve bloklayan kodu yakalar
+
+    Loop üzerinde bir heartbeat coroutine'i düzenli uyur; ayrı bir watchdog thread'i
+    heartbeat gecikirse loop thread'inin yığınını ve çalışan task'ı kaydeder. Blok
+    bitince heartbeat süreyi ve yakalanan yığını loglar.
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.05, keep: int = 20):
+        self.threshold = threshold
+        self.interval = interval
+        self.events: "collections.deque[Dict[str, Any]]" = collections.deque(maxlen=keep)
+        self.stalls = 0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._captured: Optional[Dict[str, Any]] = None
+        self._loop = None
+        self._loop_thread: Optional[int] = None
+        self._task = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Event loop içinden çağrılır"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = self._loop.create_task(self._heartbeat(), name="loop-lag-heartbeat")
+        threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True).start()
+        logger.info("Event loop lag monitor started threshold=%.0fms", self.threshold * 1000)
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._beat = now
+            lag = now - before - self.interval
+            if lag >= self.threshold:
+                self._record(lag)
+            self._captured = None
+
+    def _watchdog(self):
+        while not self._stop.wait(self.threshold / 2):
+            if self._captured is not None:
+                continue
+            if time.monotonic() - self._beat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            task = asyncio.current_task(self._loop)
+            self._captured = {
+                "task": task.get_name() if task is not None else None,
+                "coro": getattr(task.get_coro(), "__qualname__", None) if task is not None else None,
+                "stack": "".join(traceback.format_stack(frame)[-15:]),
+            }
+
+    def _record(self, lag: float):
+        captured = self._captured or {}
+        self.stalls += 1
+        self.max_lag = max(self.max_lag, lag)
+        event = {
+            "at": time.time(),
+            "lag_ms": round(lag * 1000, 1),
+            "task": captured.get("task"),
+            "coro": captured.get("coro"),
+            "stack": captured.get("stack"),
+        }
+        self.events.append(event)
+        logger.warning(
+            "Event loop blocked for %.0fms task=%s coro=%s\n%s",
+            lag * 1000, event["task"], event["coro"], event["stack"] or "(stack not captured)"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "threshold_ms": round(self.threshold * 1000, 1),
+            "stalls": self.stalls,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "recent": list(self.events),
+        }
+
+
+# Global instances
+profile_store = ProfileStore(settings.PROFILE_KEEP_REQUESTS)
+allocation_tracker = AllocationTracker()
+loop_monitor = LoopLagMonitor(settings.LOOP_LAG_THRESHOLD_MS / 1000)
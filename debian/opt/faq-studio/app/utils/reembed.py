@@ -0,0 +1,447 @@
+"""EMBED_MODEL değişince kesintisiz yeniden embedding.
+
+İş sürerken sorgular eski modelle ve eski index'le devam eder. Sorular id
+sırasıyla partiler halinde yeni modelle embed edilir (bulk lane: interaktif
+istekler her zaman önce gelir), vektörler questions.embedding_next gölge
+kolonuna ve gölge Chroma koleksiyonuna yazılır, her partiden sonra kaldığı yer
+(last_id) kaydedilir. Süreç yeniden başlarsa iş kaldığı yerden devam eder.
+
+İş sırasında eklenen veya metni değişen soruların gölge vektörü boştur
+(trigger); son turda bunlar da tamamlanır. Ardından tek transaction'da
+embedding = embedding_next yapılır ve aktif model değişir. Bu transaction'da
+yazmalar kısa süre bekler; kilit altında Ollama veya Chroma çağrısı yapılmaz.
+Commit'ten sonra Chroma gölge koleksiyona geçer, eski index silinir.
+"""
+import asyncio
+from typing import Optional
+import psycopg
+from starlette.concurrency import run_in_threadpool
+from app.db import get_conn
+from app.repository import repository
+from app.logger import logger
+from app.config import settings
+from app.utils.admission import AdmissionRejected, Deadline, DeadlineExceeded, embed_gate
+from app.utils.chroma_service import chroma_service
+from app.utils.embeddings import embed_admitted, embedding_service, embedding_to_vector_str, vector_to_numpy
+from app.utils.http_cache import invalidate_cache
+from app.utils.live_events import live_events
+from app.utils.ollama_client import OllamaUnavailableError
+
+REEMBED_LOCK_KEY = "faq-studio:reembed"
+EMBED_DIM = 1024  # schema.sql: VECTOR(1024)
+# Cutover sonrası gölge koleksiyona tek seferde yazılan satır
+REFRESH_BATCH_SIZE = 1000
+# Kaldığı yerden devam ettirilebilen iş durumları
+RESUMABLE = ("running", "cutover", "failed")
+
+
+class ReembedAlreadyRunning(Exception):
+    """Başka bir yeniden embedding işi (bu veya başka bir worker'da) sürüyor"""
+
+
+def _check_dim(vec, model: str):
+    if len(vec) != EMBED_DIM:
+        raise ValueError(f"{model} produces {len(vec)}-dim vectors, schema expects {EMBED_DIM}")
+
+
+class Reembedder:
+    """Yeniden embedding işini çalıştırır; durum ve checkpoint reembed_jobs tablosundadır"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def ensure_state() -> str:
+        """Aktif modeli döndürür; ilk çalıştırmada kaydeder ve model bilgisi olmayan satırları işaretler"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO embedding_state (active_model) VALUES (%s) ON CONFLICT (id) DO NOTHING",
+                (settings.EMBED_MODEL,)
+            )
+            cur.execute("SELECT active_model FROM embedding_state")
+            active = cur.fetchone()["active_model"]
+            # Model kolonundan önce eklenen satırlar aktif modelle üretilmiştir
+            cur.execute("UPDATE questions SET embed_model = %s WHERE embed_model IS NULL", (active,))
+            conn.commit()
+        return active
+
+    @staticmethod
+    def _latest_job() -> Optional[dict]:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT * FROM reembed_jobs ORDER BY id DESC LIMIT 1")
+            return cur.fetchone()
+
+    @staticmethod
+    def _update_job(job_id: int, finished: bool = False, **fields):
+        sets = "".join(f"{k} = %s, " for k in fields)
+        if finished:
+            sets += "finished_at = NOW(), "
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                f"UPDATE reembed_jobs SET {sets}updated_at = NOW() WHERE id = %s",
+                (*fields.values(), job_id)
+            )
+            conn.commit()
+
+    @staticmethod
+    def _clear_shadow():
+        """Gölge kolonu ve gölge koleksiyonu boşaltır"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("UPDATE questions SET embedding_next = NULL WHERE embedding_next IS NOT NULL")
+            conn.commit()
+        chroma_service.shadow_drop()
+
+    def _acquire_lock(self):
+        """Tüm worker'lar arasında tek iş: kilit alınamazsa ReembedAlreadyRunning"""
+        lock_conn = get_conn()
+        lock_conn.autocommit = True
+        got = lock_conn.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS ok", (REEMBED_LOCK_KEY,)).fetchone()["ok"]
+        if not got:
+            lock_conn.close()
+            raise ReembedAlreadyRunning("A re-embedding job is already running")
+        return lock_conn
+
+    def _prepare_job(self, force: bool) -> int:
+        """Yarım kalmış işi devam ettirir veya yenisini oluşturur"""
+        target = settings.EMBED_MODEL
+        active = self.ensure_state()
+        job = self._latest_job()
+        if job and job["status"] in RESUMABLE:
+            if job["target_model"] == target:
+                if job["status"] == "failed":
+                    self._update_job(job["id"], status="running", error=None)
+                logger.info("Resuming re-embedding job %s -> %s at id>%s (%s/%s)",
+                            job["id"], target, job["last_id"], job["done"], job["total"])
+                return job["id"]
+            # EMBED_MODEL bu arada yine değişmiş: eski hedefin yarım işi geçersiz
+            self._clear_shadow()
+            self._update_job(job["id"], status="cancelled", error=f"superseded by {target}", finished=True)
+        if target == active and not force:
+            raise ValueError(f"{target} is already the active embedding model")
+
+        chroma_service.shadow_reset()
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("UPDATE questions SET embedding_next = NULL WHERE embedding_next IS NOT NULL")
+            cur.execute(
+                "INSERT INTO reembed_jobs (source_model, target_model, total) "
+                "SELECT %s, %s, COUNT(*) FROM questions RETURNING id",
+                (active, target)
+            )
+            job_id = cur.fetchone()["id"]
+            conn.commit()
+        logger.info("Re-embedding job %s started: %s -> %s", job_id, active, target)
+        return job_id
+
+    async def start(self, force: bool = False) -> int:
+        """EMBED_MODEL için işi arka planda başlatır (veya sürdürür), job id döndürür"""
+        lock_conn = await run_in_threadpool(self._acquire_lock)
+        try:
+            job_id = await run_in_threadpool(self._prepare_job, force)
+        except Exception:
+            lock_conn.close()
+            raise
+        self._task = asyncio.create_task(self._locked(lock_conn, job_id), name=f"reembed-{job_id}")
+        return job_id
+
+    async def resume_or_start(self):
+        """Startup'ta: model değiştiyse veya yarım iş varsa arka planda çalıştırır"""
+        active = await run_in_threadpool(self.ensure_state)
+        job = await run_in_threadpool(self._latest_job)
+        resumable = job is not None and job["status"] in RESUMABLE
+        if not resumable and active == settings.EMBED_MODEL:
+            return
+        if not resumable and not settings.REEMBED_AUTO:
+            logger.warning("EMBED_MODEL=%s but the index was built with %s; queries keep using %s "
+                           "until POST /admin/reembed", settings.EMBED_MODEL, active, active)
+            return
+        if resumable and job["target_model"] != settings.EMBED_MODEL and active == settings.EMBED_MODEL:
+            # EMBED_MODEL eski haline döndü: yarım iş gereksiz
+            await run_in_threadpool(self._clear_shadow)
+            await run_in_threadpool(self._update_job, job["id"], status="cancelled",
+                                     error="EMBED_MODEL reverted", finished=True)
+            logger.info("Re-embedding job %s cancelled: EMBED_MODEL reverted to %s", job["id"], active)
+            return
+        try:
+            await self.start()
+        except ReembedAlreadyRunning:
+            logger.info("Re-embedding handled by another worker, skipping")
+
+    async def _locked(self, lock_conn, job_id: int):
+        """Advisory lock tutulurken çalışır, sonunda kilidi bırakır"""
+        try:
+            await self._run(job_id)
+        except Exception as e:
+            logger.error("Re-embedding job %s failed: %s", job_id, e)
+            if await run_in_threadpool(self._job_status, job_id) == "cutover":
+                # Veritabanı geçişi yapıldı; kalan adımlar sonraki başlatmada tamamlanır
+                await run_in_threadpool(self._update_job, job_id, error=str(e)[:1000])
+            else:
+                await run_in_threadpool(self._update_job, job_id, status="failed", error=str(e)[:1000], finished=True)
+        finally:
+            try:
+                lock_conn.execute("SELECT pg_advisory_unlock(hashtext(%s))", (REEMBED_LOCK_KEY,))
+            finally:
+                lock_conn.close()
+                self._task = None
+
+    async def _run(self, job_id: int):
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT * FROM reembed_jobs WHERE id = %s", (job_id,))
+            job = cur.fetchone()
+        while job["status"] == "running":
+            if not await self._fill(job):
+                return  # iptal edildi
+            if await run_in_threadpool(self._cutover, job):
+                job["status"] = "cutover"
+            else:
+                # Doldurma bittikten sonra yeni satır geldi: kilitsiz bir tur daha
+                logger.debug("Re-embedding job %s: late rows before cutover, filling again", job["id"])
+        await self._finish(job)
+
+    async def _embed(self, text: str, model: str, sem: asyncio.Semaphore):
+        """Bulk lane üzerinden embed; yük atılırsa, süre aşılırsa veya Ollama kapalıysa bekleyip tekrar dener"""
+        async with sem:
+            while True:
+                try:
+                    vec = await embed_admitted(text, "bulk", Deadline(settings.REQUEST_TIMEOUT), model=model)
+                except AdmissionRejected as e:
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                except DeadlineExceeded:
+                    # Ollama yanıtı bütçeyi aştı: kısa bir beklemeden sonra yeni bütçeyle dene
+                    await asyncio.sleep(settings.OLLAMA_RETRY_BACKOFF)
+                    continue
+                except OllamaUnavailableError:
+                    await asyncio.sleep(settings.OLLAMA_CIRCUIT_RESET)
+                    continue
+                _check_dim(vec, model)
+                return vec
+
+    async def _fill(self, job: dict) -> bool:
+        """Gölge vektörü boş satırları doldurur; iş iptal edildiyse False"""
+        job_id, target = job["id"], job["target_model"]
+        last_id = job["last_id"]
+        # Bulk lane'in slot sınırı kadar eşzamanlı istek; fazlası lane kuyruğunu doldurmasın
+        sem = asyncio.Semaphore(embed_gate.lanes["bulk"].max_active)
+        loop = asyncio.get_running_loop()
+        while True:
+            status = await run_in_threadpool(self._job_status, job_id)
+            if status == "cancelled":
+                await run_in_threadpool(self._clear_shadow)
+                logger.info("Re-embedding job %s cancelled", job_id)
+                return False
+            rows = await run_in_threadpool(self._next_batch, last_id)
+            if not rows:
+                if last_id == 0:
+                    return True
+                # Checkpoint'in gerisinde eklenen/değişen satırlar için baştan bir tur daha
+                last_id = 0
+                await run_in_threadpool(self._refresh_total, job_id)
+                continue
+            started = loop.time()
+            vectors = await asyncio.gather(*(self._embed(r["question"], target, sem) for r in rows))
+            rate = len(rows) / max(loop.time() - started, 1e-6)
+            await run_in_threadpool(self._store_batch, job_id, rows, vectors, rate)
+            last_id = rows[-1]["id"]
+            if settings.REEMBED_PAUSE:
+                await asyncio.sleep(settings.REEMBED_PAUSE)
+
+    @staticmethod
+    def _job_status(job_id: int) -> str:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT status FROM reembed_jobs WHERE id = %s", (job_id,))
+            return cur.fetchone()["status"]
+
+    @staticmethod
+    def _next_batch(last_id: int) -> list:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, question, answer, keywords, category FROM questions "
+                "WHERE id > %s AND embedding_next IS NULL ORDER BY id LIMIT %s",
+                (last_id, settings.REEMBED_BATCH_SIZE)
+            )
+            return cur.fetchall()
+
+    @staticmethod
+    def _refresh_total(job_id: int):
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE reembed_jobs SET last_id = 0, total = done + "
+                "(SELECT COUNT(*) FROM questions WHERE embedding_next IS NULL) WHERE id = %s",
+                (job_id,)
+            )
+            conn.commit()
+
+    @staticmethod
+    def _store_batch(job_id: int, rows: list, vectors: list, rate: float):
+        """Partiyi gölge koleksiyona ve gölge kolona yazar, checkpoint'i ilerletir"""
+        # Önce Chroma: buradan sonra çökülürse parti baştan yapılır (upsert tekrarlanabilir)
+        chroma_service.shadow_upsert([{**r, "embedding": v.tolist()} for r, v in zip(rows, vectors)])
+        # Metin bu arada değiştiyse yazma: trigger satırı tekrar boşalttı, sonraki turda alınır
+        repository.store_reembed_batch(
+            job_id,
+            [(embedding_to_vector_str(v), r["id"], r["question"]) for r, v in zip(rows, vectors)],
+            rows[-1]["id"],
+            rate,
+        )
+
+    def _cutover(self, job: dict) -> bool:
+        """Yeni vektörlere tek transaction'da geçer; gölge vektörü boş satır kaldıysa False
+
+        Geç kalan satırlar _fill'de kilitsiz embed edilir, burada sadece yeniden kontrol
+        edilir: kilit altında yalnızca SQL çalışır, yazmalar kısa süre bekler.
+        """
+        target = job["target_model"]
+        with get_conn() as conn, conn.cursor() as cur:
+            # Yazmaları durdurur, okumalar devam eder
+            cur.execute("LOCK TABLE questions IN SHARE ROW EXCLUSIVE MODE")
+            cur.execute("SELECT EXISTS (SELECT 1 FROM questions WHERE embedding_next IS NULL) AS late")
+            if cur.fetchone()["late"]:
+                conn.rollback()
+                return False
+
+            # Toplu geçiş updated_at'i değiştirmesin; kategori merkezleri sonda baştan hesaplanır
+            cur.execute("ALTER TABLE questions DISABLE TRIGGER update_questions_modtime")
+            cur.execute("ALTER TABLE questions DISABLE TRIGGER questions_centroids_update")
+            cur.execute(
+                "UPDATE questions SET embedding = embedding_next, embed_model = %s, embedding_next = NULL",
+                (target,)
+            )
+            cur.execute("ALTER TABLE questions ENABLE TRIGGER update_questions_modtime")
+            cur.execute("ALTER TABLE questions ENABLE TRIGGER questions_centroids_update")
+            cur.execute("SELECT category_centroids_rebuild()")
+            cur.execute("UPDATE embedding_state SET active_model = %s, updated_at = NOW()", (target,))
+            cur.execute("UPDATE reembed_jobs SET status = 'cutover', updated_at = NOW() WHERE id = %s", (job["id"],))
+            conn.commit()
+        logger.info("Re-embedding job %s: database switched to %s", job["id"], target)
+        return True
+
+    @staticmethod
+    def _refresh_shadow(job: dict) -> int:
+        """İş sırasında alanları değişen satırların gölge kaydını tazeler (cutover commit'inden sonra)"""
+        if not chroma_service.shadow_exists():
+            return 0  # Chroma geçişi daha önce tamamlanmış
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, question, answer, keywords, category, embedding FROM questions "
+                "WHERE updated_at >= %s AND embed_model = %s",
+                (job["started_at"], job["target_model"])
+            )
+            changed = cur.fetchall()
+        for start in range(0, len(changed), REFRESH_BATCH_SIZE):
+            batch = changed[start:start + REFRESH_BATCH_SIZE]
+            for row in batch:
+                row["embedding"] = vector_to_numpy(row["embedding"]).tolist()
+            chroma_service.shadow_upsert(batch)
+        return len(changed)
+
+    async def _finish(self, job: dict):
+        """Cutover sonrası: Chroma'yı değiştir, worker'ları yeni modele geçir, index'i yeniden kur"""
+        target = job["target_model"]
+        await run_in_threadpool(self._refresh_shadow, job)
+        # Silinen soruların vektörleri geçişte yeni koleksiyondan temizlenir
+        await run_in_threadpool(chroma_service.shadow_cutover)
+        invalidate_cache()
+        # Tüm worker'lar aktif modeli "model" olayıyla yeniden okur (bu worker hemen)
+        await run_in_threadpool(embedding_service.refresh_model)
+        await run_in_threadpool(live_events.publish_model, target)
+        await self._sweep(target)
+
+        # ivfflat listeleri eski vektörlerle eğitildi
+        await run_in_threadpool(self._reindex)
+
+        await run_in_threadpool(self._update_job, job["id"], status="done", finished=True)
+        logger.info("Re-embedding job %s done: active model is now %s", job["id"], target)
+
+    @staticmethod
+    def _reindex():
+        try:
+            with psycopg.connect(settings.DATABASE_URL, autocommit=True) as conn:
+                conn.execute("REINDEX INDEX CONCURRENTLY idx_questions_embedding")
+        except Exception as e:
+            logger.warning("Reindex after re-embedding failed: %s", e)
+
+    async def _sweep(self, target: str):
+        """Geçiş anında eski modelle yazılmış satırları yeni modelle düzeltir (bulk lane üzerinden)"""
+        rows = await run_in_threadpool(self._stale_rows, target)
+        if not rows:
+            return
+        sem = asyncio.Semaphore(embed_gate.lanes["bulk"].max_active)
+        vectors = await asyncio.gather(*(self._embed(r["question"], target, sem) for r in rows))
+        fixed = await run_in_threadpool(self._store_sweep, target, rows, vectors)
+        logger.info("Re-embedding sweep: %s rows written during cutover fixed", fixed)
+
+    @staticmethod
+    def _stale_rows(target: str) -> list:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, question, answer, keywords, category FROM questions "
+                "WHERE embed_model IS DISTINCT FROM %s",
+                (target,)
+            )
+            return cur.fetchall()
+
+    @staticmethod
+    def _store_sweep(target: str, rows: list, vectors: list) -> int:
+        """Metni değişmemiş satırları yazar; Chroma commit'ten sonra güncellenir"""
+        fixed = []
+        with get_conn() as conn, conn.cursor() as cur:
+            for row, vec in zip(rows, vectors):
+                cur.execute(
+                    "UPDATE questions SET embedding = %s::vector, embed_model = %s WHERE id = %s AND question = %s",
+                    (embedding_to_vector_str(vec), target, row["id"], row["question"])
+                )
+                if cur.rowcount:
+                    fixed.append((row, vec))
+            conn.commit()
+        for row, vec in fixed:
+            chroma_service.delete_question(row["id"])
+            chroma_service.add_question(row["id"], row["question"], row["answer"],
+                                        row["keywords"], row["category"], vec.tolist())
+        return len(fixed)
+
+    def cancel(self) -> bool:
+        """Devam eden işi iptal eder; cutover başladıysa iptal edilemez"""
+        job = self._latest_job()
+        if not job or job["status"] not in ("running", "failed"):
+            return False
+        self._update_job(job["id"], status="cancelled", finished=True)
+        try:
+            lock_conn = self._acquire_lock()
+        except ReembedAlreadyRunning:
+            return True  # çalışan iş durumu görüp gölgeyi temizler
+        try:
+            self._clear_shadow()
+        finally:
+            lock_conn.close()
+        logger.info("Re-embedding job %s cancelled", job["id"])
+        return True
+
+    def status(self) -> dict:
+        """Aktif/hedef model ve son işin ilerlemesi (ETA dahil)"""
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT active_model FROM embedding_state")
+            row = cur.fetchone()
+        job = self._latest_job()
+        result = {
+            "active_model": row["active_model"] if row else settings.EMBED_MODEL,
+            "configured_model": settings.EMBED_MODEL,
+            "job": job,
+        }
+        if job:
+            total = job["total"] or 0
+            remaining = max(total - job["done"], 0)
+            result["progress"] = round(min(job["done"] / total, 1.0), 4) if total else 1.0
+            if job["status"] == "running" and job["rate"]:
+                result["eta_seconds"] = round(remaining / job["rate"])
+        return result
+
+
+# Global instance
+reembedder = Reembedder()
+
+
+# Convenience functions
+def reembed_status() -> dict:
+    """Kısa kullanım için wrapper"""
+    return reembedder.status()
@@ -0,0 +1,27 @@
+import decimal
+from typing import Any
+import orjson
+from fastapi.responses import Response
+
+
+def _default(o: Any):
+    """orjson'un doğrudan desteklemediği tipler (Decimal, pgvector/numpy)"""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if hasattr(o, "tolist"):
+        return o.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """dict_row listelerini tek geçişte UTF-8 JSON'a çevirir (datetime -> ISO 8601)"""
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class FastJSONResponse(Response):
+    """jsonable_encoder ve Pydantic doğrulamasını atlayan JSON yanıtı"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,60 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+
+
+class LocalCounter:
+    """Tek süreçlik sayaç"""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def increment(self) -> int:
+        with self._lock:
+            self._value += 1
+            return self._value
+
+
+class SharedCounter:
+    """Tüm worker'ların gördüğü, mmap'lenmiş dosyada tutulan 64-bit sayaç"""
+
+    _FMT = "<Q"
+
+    def __init__(self, path: str):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < 8:
+                os.ftruncate(fd, 8)
+            self._mm = mmap.mmap(fd, 8)
+        finally:
+            os.close(fd)
+        self._lock_path = path + ".lock"
+
+    @property
+    def value(self) -> int:
+        # Hizalı 8 byte okuma: kilitsiz okunabilir
+        return struct.unpack_from(self._FMT, self._mm, 0)[0]
+
+    def increment(self) -> int:
+        """Süreçler arası kilit altında artırır (yazmalar seyrek olduğundan maliyeti önemsiz)"""
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                value = self.value + 1
+                struct.pack_into(self._FMT, self._mm, 0, value)
+                return value
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def make_counter(path: str):
+    """path verilmişse paylaşımlı, yoksa süreç içi sayaç döndürür"""
+    return SharedCounter(path) if path else LocalCounter()
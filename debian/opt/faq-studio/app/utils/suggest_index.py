@@ -0,0 +1,265 @@
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.db import get_conn
+from app.logger import logger
+from app.repository import repository
+from app.utils.http_cache import response_cache
+from app.utils.live_events import live_events
+
+# Canlı olay dinleyicisi bağlı değilken: yazma olmasa da bu sürede bir yenile
+REFRESH_INTERVAL = 60.0
+# Anahtarlar bu uzunlukta kesilir (kelime başına bir anahtar: bellek sınırlı kalsın)
+KEY_MAX_CHARS = 48
+# Tek sorguda, eşleşme türü başına taranacak en fazla anahtar (kısa öneklerde süre sınırlı kalsın)
+SCAN_LIMIT = 256
+
+# Türkçe büyük/küçük harf: I -> ı, İ -> i; sonra aksanlar katlanır ("sifre" "şifre"yi bulur)
+_TR_LOWER = str.maketrans({"I": "ı", "İ": "i"})
+_TR_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_NON_WORD = re.compile(r"[^\w]+")
+
+# Eşleşme türleri: küçük olan önce gelir
+RANK_START, RANK_WORD, RANK_KEYWORD = 0, 1, 2
+RANK_NAMES = ("start", "word", "keyword")
+
+
+def normalize(text: str) -> str:
+    """Türkçe kurallarıyla küçük harf, aksansız, noktalamasız, tek boşluklu metin"""
+    text = text.translate(_TR_LOWER).lower().translate(_TR_FOLD)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def _keys(question: str, keywords: str) -> List[Tuple[str, int]]:
+    """Sorunun her kelimesinden başlayan anahtarlar ve her keyword"""
+    words = normalize(question).split()
+    keys = [(" ".join(words[i:])[:KEY_MAX_CHARS], RANK_START if i == 0 else RANK_WORD) for i in range(len(words))]
+    for keyword in (keywords or "").split(","):
+        key = normalize(keyword)[:KEY_MAX_CHARS]
+        if key:
+            keys.append((key, RANK_KEYWORD))
+    return keys
+
+
+class SuggestIndex:
+    """Yazarken öneri için soru metinleri ve keyword'ler üzerinde önek index'i
+
+    Soru başı anahtarları ve kelime/keyword anahtarları iki ayrı sıralı (anahtar, tür, id)
+    dizisinde tutulur; önek araması bisect ile yapılır, Ollama veya veritabanı çağrısı
+    yoktur. Tarama tür başına SCAN_LIMIT anahtarla sınırlıdır: çok kısa öneklerde soru
+    başı eşleşmeleri bu sınır içinde sıralı ilk anahtarlardan gelir (en kısa sorular
+    değil), ama hiçbir zaman kelime/keyword eşleşmelerinin arkasında kalmaz.
+
+    Açılışta questions tablosundan arka planda kurulur, yazma route'ları artımlı
+    günceller. Diğer worker'ların yazmaları canlı olaylardan (LISTEN) tek satır okunarak
+    uygulanır; tam yeniden kurulum sadece dinleyici (yeniden) bağlanınca ve toplu
+    kategori işlemlerinde yapılır. Dinleyici bağlı değilse response cache sürümü
+    değişince yeniden kurulur. Kurulum sırasında eskisi sunulur.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starts: List[Tuple[str, int, int]] = []
+        self._entries: List[Tuple[str, int, int]] = []
+        self._docs: Dict[int, Tuple[str, str, List[Tuple[str, int]]]] = {}
+        self._generation: Optional[int] = None
+        self._local_generation: Optional[int] = None
+        self._loaded_at = 0.0
+        self._building = False
+        self._rebuild = False
+        # Kurulum sürerken gelen olaylar: yeni index'e geçince yeniden uygulanır
+        self._pending: List[dict] = []
+        self.ready = False
+        self.applied_events = 0
+
+    # --- kurulum ---
+
+    def _load(self):
+        generation = response_cache.generation
+        started = time.perf_counter()
+        starts, entries, docs = [], [], {}
+        # Primary'den okunur: replika gecikmesi kurulum sırasında gelen olayları geride bırakmasın
+        with get_conn() as conn, conn.cursor(name="suggest_index") as cur:
+            cur.itersize = 2000
+            cur.execute("SELECT id, question, keywords, category FROM questions")
+            for row in cur:
+                keys = _keys(row["question"], row["keywords"])
+                docs[row["id"]] = (row["question"], row["category"], keys)
+                for key, rank in keys:
+                    (starts if rank == RANK_START else entries).append((key, rank, row["id"]))
+        starts.sort()
+        entries.sort()
+        with self._lock:
+            self._starts, self._entries, self._docs = starts, entries, docs
+            self._generation, self._loaded_at = generation, time.monotonic()
+            self.ready = True
+        logger.info("Suggest index built: %s questions, %s keys in %.0fms",
+                    len(docs), len(starts) + len(entries), (time.perf_counter() - started) * 1000)
+
+    def start_build(self) -> bool:
+        """Index'i arka planda (yeniden) kurar; kurulum sürüyorsa bittiğinde bir kez daha kurulur"""
+        with self._lock:
+            if self._building:
+                self._rebuild = True
+                return False
+            self._building = True
+
+        def run():
+            while True:
+                try:
+                    self._load()
+                except Exception as e:
+                    logger.error("Suggest index build failed: %s", e)
+                with self._lock:
+                    if self._rebuild:
+                        self._rebuild = False
+                        continue
+                    self._building = False
+                    pending, self._pending = self._pending, []
+                # Kurulum sırasında gelen değişiklikler kopyada olmayabilir: satırlar yeniden okunur
+                for event in pending:
+                    self._apply(event)
+                return
+
+        threading.Thread(target=run, name="suggest-index", daemon=True).start()
+        return True
+
+    # --- diğer worker'ların yazmaları (canlı olaylar) ---
+
+    def on_event(self, payload: Optional[str]):
+        """live_events handler'ı (dinleyici thread'i); None: bağlantı kuruldu, tam yeniden kurulum"""
+        if payload is None:
+            self.start_build()
+            return
+        event = json.loads(payload)
+        with self._lock:
+            if self._building:
+                self._pending.append(event)
+                return
+        # Bu worker'ın yazması route'ta zaten uygulandı
+        if event.get("worker") != os.getpid():
+            self._apply(event)
+
+    def _apply(self, event: dict):
+        op, qid = event.get("op"), event.get("id")
+        if op == "model":
+            return  # anahtarlar embedding modelinden bağımsız
+        if qid is None:
+            # Toplu kategori işlemleri id listesi taşımaz (NOTIFY boyut sınırı); bu worker'ınki
+            # route'ta uygulandı ve kurulumda kaybolmaz (set_category sadece dokümanı değiştirir)
+            if event.get("worker") != os.getpid():
+                self.start_build()
+            return
+        row = None if op == "delete" else repository.get_question(qid, primary=True)
+        with self._lock:
+            self._remove_locked(qid)
+            if row is not None:
+                self._insert_locked(qid, row["question"], row["keywords"], row["category"])
+        self.applied_events += 1
+
+    def _ensure_fresh(self):
+        # Olaylar artımlı uygulanıyor; sürüm kontrolü sadece dinleyici bağlı değilken
+        if live_events.connected:
+            return
+        generation = response_cache.generation
+        if generation == self._generation and time.monotonic() - self._loaded_at < REFRESH_INTERVAL:
+            return
+        # Sürümü bu worker'ın kendi yazması artırdıysa index zaten güncel
+        if generation == self._local_generation and time.monotonic() - self._loaded_at < REFRESH_INTERVAL:
+            self._generation = generation
+            return
+        self.start_build()
+
+    # --- artımlı güncelleme (yazma route'ları) ---
+
+    def _list(self, rank: int) -> List[Tuple[str, int, int]]:
+        return self._starts if rank == RANK_START else self._entries
+
+    def _remove_locked(self, qid: int):
+        doc = self._docs.pop(qid, None)
+        if doc is None:
+            return
+        for key, rank in doc[2]:
+            entries = self._list(rank)
+            i = bisect.bisect_left(entries, (key, rank, qid))
+            if i < len(entries) and entries[i] == (key, rank, qid):
+                del entries[i]
+
+    def _insert_locked(self, qid: int, question: str, keywords: str, category: str):
+        keys = _keys(question, keywords)
+        self._docs[qid] = (question, category, keys)
+        for key, rank in keys:
+            bisect.insort(self._list(rank), (key, rank, qid))
+
+    def upsert(self, qid: int, question: str, keywords: str, category: str):
+        with self._lock:
+            self._remove_locked(qid)
+            self._insert_locked(qid, question, keywords, category)
+            self._note_local_write()
+
+    def remove(self, qid: int):
+        with self._lock:
+            self._remove_locked(qid)
+            self._note_local_write()
+
+    def set_category(self, question_ids: set, category: str):
+        """Toplu kategori değişikliği: anahtarlar kategoriye bağlı değil, sadece dokümanlar güncellenir"""
+        with self._lock:
+            for qid in question_ids:
+                doc = self._docs.get(qid)
+                if doc is not None:
+                    self._docs[qid] = (doc[0], category, doc[2])
+            self._note_local_write()
+
+    def _note_local_write(self):
+        # Route değişiklikten sonra invalidate_cache() çağırır: bir sonraki sürüm bizim
+        if self._generation == response_cache.generation:
+            self._local_generation = self._generation + 1
+
+    # --- arama ---
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Öneke uyan sorular: soru başı eşleşmeleri, sonra kelime, sonra keyword eşleşmeleri"""
+        self._ensure_fresh()
+        key = normalize(prefix)[:KEY_MAX_CHARS]
+        if not key:
+            return []
+        docs = self._docs
+        best: Dict[int, int] = {}
+        # Soru başı eşleşmeleri ayrı taranır: kelime/keyword anahtarları tarama sınırını doldurmasın
+        for entries in (self._starts, self._entries):
+            start = bisect.bisect_left(entries, (key,))
+            for entry_key, rank, qid in entries[start:start + SCAN_LIMIT]:
+                if not entry_key.startswith(key):
+                    break
+                if rank < best.get(qid, RANK_KEYWORD + 1):
+                    best[qid] = rank
+            if len(best) >= limit:
+                break
+        ranked = sorted(best.items(), key=lambda item: (item[1], len(docs[item[0]][0]) if item[0] in docs else 0))
+        results = []
+        for qid, rank in ranked:
+            doc = docs.get(qid)
+            if doc is not None:
+                results.append({"id": qid, "question": doc[0], "category": doc[1], "match": RANK_NAMES[rank]})
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "questions": len(self._docs), "keys": len(self._starts) + len(self._entries),
+                "applied_events": self.applied_events}
+
+
+# Global instance
+suggest_index = SuggestIndex()
+
+
+# Convenience functions
+def suggest_questions(prefix: str, limit: int = 8) -> List[Dict[str, Any]]:
+    """Kısa kullanım için wrapper"""
+    return suggest_index.suggest(prefix, limit)
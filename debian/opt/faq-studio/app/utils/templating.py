@@ -0,0 +1,26 @@
+import pathlib
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from app.config import settings
+from app.utils.assets import asset_url
+
+TPL_DIR = pathlib.Path(__file__).parent.parent / "templates"
+
+
+def _bytecode_cache() -> FileSystemBytecodeCache:
+    """Derlenmiş template'ler diske yazılır; yeniden başlatmada ve diğer worker'larda tekrar derlenmez"""
+    if not settings.TEMPLATE_CACHE_DIR:
+        return FileSystemBytecodeCache()
+    directory = pathlib.Path(settings.TEMPLATE_CACHE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return FileSystemBytecodeCache(str(directory))
+
+
+# Tek, paylaşılan template ortamı (main ve route'lar bunu kullanır)
+# Template dosyaları paketle gelir; DEBUG dışında her render'da mtime kontrolü yapılmaz
+templates = Jinja2Templates(
+    directory=str(TPL_DIR),
+    bytecode_cache=_bytecode_cache(),
+    auto_reload=settings.DEBUG,
+)
+templates.env.globals["asset_url"] = asset_url
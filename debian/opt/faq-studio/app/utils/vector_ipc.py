@@ -0,0 +1,107 @@
+import hashlib
+import os
+import queue
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Any
+from app.logger import logger
+from app.config import settings
+
+
+def _authkey() -> bytes:
+    """Worker'lar ile index sahibi arasında paylaşılan anahtar (aynı env'den türetilir)"""
+    return hashlib.sha256(("faq-studio-vector:" + settings.DATABASE_URL).encode("utf-8")).digest()
+
+
+class VectorIndexServer:
+    """ChromaService'i Unix socket üzerinden diğer worker'lara açan index sahibi"""
+
+    def __init__(self, service, socket_path: str):
+        self.service = service
+        self.socket_path = socket_path
+
+    def _handle(self, conn):
+        """Tek bir worker bağlantısı: (method, args, kwargs) al, sonucu gönder"""
+        try:
+            while True:
+                try:
+                    method, args, kwargs = conn.recv()
+                except EOFError:
+                    return
+                if method.startswith("_") or not callable(getattr(self.service, method, None)):
+                    conn.send(("err", f"Unknown method: {method}"))
+                    continue
+                try:
+                    conn.send(("ok", getattr(self.service, method)(*args, **kwargs)))
+                except Exception as e:
+                    logger.error("Vector index call %s failed: %s", method, e)
+                    conn.send(("err", f"{type(e).__name__}: {e}"))
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        listener = Listener(self.socket_path, family="AF_UNIX", authkey=_authkey())
+        os.chmod(self.socket_path, 0o600)
+        logger.info("Vector index owner listening on %s (pid=%s)", self.socket_path, os.getpid())
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning("Vector index accept failed: %s", e)
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+
+class RemoteChromaService:
+    """ChromaService ile aynı arayüz; çağrıları index sahibi sürece iletir"""
+
+    def __init__(self, socket_path: str, pool_size: int = 16):
+        self.socket_path = socket_path
+        # Bağlantılar thread-safe değil: her çağrı havuzdan bir bağlantı ödünç alır
+        self._pool: "queue.LifoQueue" = queue.LifoQueue(maxsize=pool_size)
+
+    def initialize_embeddings(self, embedding_function):
+        """Index sahibi süreç embedding üretmez; uyumluluk için boş"""
+        logger.info("Remote vector index at %s, embedding function stays local", self.socket_path)
+
+    def _call(self, method: str, *args, **kwargs) -> Any:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = Client(self.socket_path, family="AF_UNIX", authkey=_authkey())
+        try:
+            conn.send((method, args, kwargs))
+            status, result = conn.recv()
+        except (EOFError, OSError):
+            # Sahip süreç yeniden başladıysa bağlantıyı at, hata üst katmana gitsin
+            conn.close()
+            raise
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        if status != "ok":
+            raise RuntimeError(f"Vector index error: {result}")
+        return result
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+
+def run_owner(socket_path: str = None):
+    """Index sahibi süreç giriş noktası (launcher veya `python -m app.utils.vector_ipc`)"""
+    # Bu süreç index'i kendisi açar; global servis yerel ChromaService olmalı
+    settings.VECTOR_MODE = "local"
+    from app.utils.chroma_service import chroma_service
+    VectorIndexServer(chroma_service, socket_path or settings.VECTOR_SOCKET_PATH).serve_forever()
+
+
+if __name__ == "__main__":
+    run_owner()